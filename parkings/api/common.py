@@ -2,6 +2,8 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import exceptions
 from rest_framework_gis.filters import InBBoxFilter
 
+from ..models.mixins import GEOMETRY_DETAIL_TOLERANCES
+
 
 class ParkingException(exceptions.APIException):
     status_code = 403
@@ -19,3 +21,33 @@ class WGS84InBBoxFilter(InBBoxFilter):
         bbox.srid = 4326
         bbox.transform(3879)
         return bbox
+
+
+def get_geometry_detail(request):
+    """
+    Get the geometry detail level requested with geometry_detail param.
+
+    :returns: Key of GEOMETRY_DETAIL_TOLERANCES or None for full detail
+    """
+    detail = request.query_params.get('geometry_detail') if request else None
+    if not detail or detail == 'full':
+        return None
+    if detail not in GEOMETRY_DETAIL_TOLERANCES:
+        raise exceptions.ValidationError({'geometry_detail': _(
+            "Invalid detail level. Valid levels are: {}").format(
+                ", ".join(['full'] + sorted(GEOMETRY_DETAIL_TOLERANCES)))})
+    return detail
+
+
+class WGS84GeometryViewSetMixin:
+    """
+    Mixin for viewsets of models with stored WGS84 geometries.
+
+    Defers loading the WGS84 geometries of the other detail levels than
+    the requested one.
+    """
+    def get_queryset(self):
+        model = self.queryset.model
+        needed = model.get_wgs84_field_name(get_geometry_detail(self.request))
+        return super().get_queryset().defer(*[
+            x for x in model.get_wgs84_field_names() if x != needed])
@@ -3,12 +3,15 @@ import datetime
 from django.conf import settings
 from django.contrib.gis.gdal.error import GDALException
 from django.contrib.gis.geos import Point
+from django.db import connections, router
 from django.utils import timezone
 from rest_framework import generics, serializers
 from rest_framework.response import Response
 
+from ... import parking_check_buffer, spatial_index
 from ...models import (
-    Parking, ParkingCheck, PaymentZone, PermitArea, PermitLookupItem)
+    Parking, ParkingCheck, PaymentZone, Permit, PermitArea, PermitLookupItem,
+    PermitSeries)
 from ...models.constants import GK25FIN_SRID, WGS84_SRID
 from .permissions import IsEnforcer
 
@@ -36,6 +39,19 @@ class CheckParkingSerializer(serializers.Serializer):
     time = AwareDateTimeField(required=False)
 
 
+class CheckParkingBatchSerializer(serializers.Serializer):
+    checks = serializers.ListField(
+        child=CheckParkingSerializer(), allow_empty=False)
+
+    def validate_checks(self, value):
+        max_size = get_batch_max_size()
+        if len(value) > max_size:
+            raise serializers.ValidationError(
+                "Ensure this field has no more than {} elements.".format(
+                    max_size))
+        return value
+
+
 class CheckParking(generics.GenericAPIView):
     """
     Check if parking is valid for given registration number and location.
@@ -50,51 +66,96 @@ class CheckParking(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         params = serializer.validated_data
 
-        # Read input parameters to variables
-        time = params.get("time") or timezone.now()
-        registration_number = params.get("registration_number")
-        (wgs84_location, gk25_location) = get_location(params)
+        domain = request.user.enforcer.enforced_domain
+
+        (result, parking_check) = run_parking_checks(
+            [params], request.user, domain)[0]
+
+        parking_check_buffer.record(parking_check)
+
+        return Response(result)
+
+
+class CheckParkingBatch(generics.GenericAPIView):
+    """
+    Check validity of parkings for a list of registration numbers.
+
+    The results are returned in the same order as the checks.
+    """
+    permission_classes = [IsEnforcer]
+    serializer_class = CheckParkingBatchSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checks = serializer.validated_data["checks"]
 
         domain = request.user.enforcer.enforced_domain
 
-        zone = get_payment_zone(gk25_location, domain)
-        area = get_permit_area(gk25_location, domain)
+        results_and_checks = run_parking_checks(checks, request.user, domain)
+
+        parking_check_buffer.record_many([x[1] for x in results_and_checks])
 
-        (allowed_by, parking, end_time) = check_parking(
-            registration_number, zone, area, time, domain)
+        return Response({"results": [x[0] for x in results_and_checks]})
 
-        allowed = bool(allowed_by)
 
-        if not allowed:
-            # If no matching parking or permit was found, try to find
-            # one that has just expired, i.e. was valid a few minutes
-            # ago (where "a few minutes" is the grace duration)
-            past_time = time - get_grace_duration()
-            (_allowed_by, parking, end_time) = check_parking(
-                registration_number, zone, area, past_time, domain)
+def run_parking_checks(checks, performer, domain):
+    """
+    Run given parking checks.
+
+    :param checks: List of validated CheckParkingSerializer data
+    :type performer: django.contrib.auth.models.User
+    :type domain: parkings.models.EnforcementDomain
+    :returns:
+      List of (result, parking_check) pairs in the same order as the
+      checks, where the parking_check is an unsaved ParkingCheck
+    """
+    now = timezone.now()
+    inputs = []
+    for params in checks:
+        # Read input parameters to variables
+        time = params.get("time") or now
+        registration_number = params.get("registration_number")
+        (wgs84_location, gk25_location) = get_location(params)
+        inputs.append((registration_number, wgs84_location, gk25_location, time))
+
+    if use_single_query():
+        evaluations = evaluate_parking_checks(
+            [(reg_num, gk25_loc, time)
+             for (reg_num, _wgs84_loc, gk25_loc, time) in inputs],
+            domain)
+    else:
+        evaluations = [
+            evaluate_parking_check_stepwise(reg_num, gk25_loc, time, domain)
+            for (reg_num, _wgs84_loc, gk25_loc, time) in inputs]
+
+    results_and_checks = []
+    for (params, input_values, evaluation) in zip(checks, inputs, evaluations):
+        (registration_number, wgs84_location, _gk25_location, time) = input_values
+        (zone, area_identifier, allowed, parking_id, end_time) = evaluation
 
         result = {
             "allowed": allowed,
             "end_time": end_time,
             "location": {
                 "payment_zone": zone,
-                "permit_area": area.identifier if area else None,
+                "permit_area": area_identifier,
             },
             "time": time,
         }
 
-        ParkingCheck.objects.create(
-            performer=request.user,
+        parking_check = ParkingCheck(
+            performer=performer,
             time=time,
             time_overridden=bool(params.get("time")),
             registration_number=registration_number,
             location=wgs84_location,
             result=result,
             allowed=allowed,
-            found_parking=parking,
+            found_parking_id=parking_id,
         )
-
-        return Response(result)
+        results_and_checks.append((result, parking_check))
+    return results_and_checks
 
 
 def get_location(params):
@@ -111,9 +172,247 @@ def get_location(params):
     return (wgs84_location, gk25_location)
 
 
+def use_single_query():
+    return getattr(settings, "PARKKIHUBI_CHECK_PARKING_SINGLE_QUERY", True)
+
+
+def use_spatial_index():
+    return getattr(settings, "PARKKIHUBI_CHECK_PARKING_SPATIAL_INDEX", False)
+
+
+def get_batch_max_size():
+    return getattr(settings, "PARKKIHUBI_CHECK_PARKING_BATCH_MAX_SIZE", 100)
+
+
+def evaluate_parking_check(registration_number, location, time, domain):
+    """
+    Evaluate a parking check with a single database query.
+
+    Resolves the payment zone, the permit area, the active parking and
+    the permit end time for both the requested time and the start of the
+    grace period in one round trip.  The result is the same as what
+    `evaluate_parking_check_stepwise` would return.
+
+    :type registration_number: str
+    :type location: django.contrib.gis.geos.Point|None
+    :type time: datetime.datetime
+    :type domain: parkings.models.EnforcementDomain
+    :rtype: (int|None, str|None, bool, uuid.UUID|None,
+             datetime.datetime|None)
+    :returns: Tuple (zone, area_identifier, allowed, parking_id, end_time)
+    """
+    checks = [(registration_number, location, time)]
+    return evaluate_parking_checks(checks, domain)[0]
+
+
+def evaluate_parking_checks(checks, domain):
+    """
+    Evaluate several parking checks with a single database query.
+
+    If the spatial index is in use, the zones and the areas are resolved
+    from it and only the parking and permit lookups are left to the
+    query.
+
+    :param checks:
+      List of (registration_number, location, time) tuples, where the
+      location is a GK25FIN point or None
+    :type domain: parkings.models.EnforcementDomain
+    :returns:
+      List of (zone, area_identifier, allowed, parking_id, end_time)
+      tuples in the same order as the checks
+    """
+    if not checks:
+        return []
+
+    db = router.db_for_read(Parking)
+    connection = connections[db]
+    quote = connection.ops.quote_name
+    grace_duration = get_grace_duration()
+    with_index = use_spatial_index()
+
+    params = []
+    for (idx, (registration_number, location, time)) in enumerate(checks):
+        if with_index:
+            zone = spatial_index.find_payment_zone(location, domain)
+            area = spatial_index.find_permit_area(location, domain)
+        else:
+            (zone, area) = (None, None)
+        params.extend([
+            idx,
+            Parking.normalize_reg_num(registration_number),
+            time,
+            time - grace_duration,
+            location.x if location else None,
+            location.y if location else None,
+            zone,
+            area.pk if area else None,
+            area.identifier if area else None,
+        ])
+    params.extend([domain.pk, GK25FIN_SRID])
+
+    sql = _EVALUATE_PARKING_CHECKS_SQL.format(
+        check_rows=", ".join([_CHECK_ROW_SQL] * len(checks)),
+        located_checks=(
+            _LOCATED_CHECKS_FROM_PARAMS_SQL if with_index
+            else _LOCATED_CHECKS_FROM_LOCATION_SQL),
+        parking_table=quote(Parking._meta.db_table),
+        zone_table=quote(PaymentZone._meta.db_table),
+        area_table=quote(PermitArea._meta.db_table),
+        lookup_item_table=quote(PermitLookupItem._meta.db_table),
+        permit_table=quote(Permit._meta.db_table),
+        series_table=quote(PermitSeries._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    # There are two rows for each check: one for the requested time and
+    # one for the start of the grace period, in that order
+    results = []
+    for (row, past_row) in zip(rows[0::2], rows[1::2]):
+        (zone, area_identifier) = row[:2]
+        (allowed_by, parking_id, end_time) = _get_allowance(*row[2:])
+        if not allowed_by:
+            (_allowed_by, parking_id, end_time) = _get_allowance(*past_row[2:])
+        results.append(
+            (zone, area_identifier, bool(allowed_by), parking_id, end_time))
+    return results
+
+
+def _get_allowance(parking_id, parking_time_end, permit_end_time):
+    if parking_id:
+        return ("parking", parking_id, parking_time_end)
+    if permit_end_time:
+        return ("permit", None, permit_end_time)
+    return (None, None, None)
+
+
+_CHECK_ROW_SQL = (
+    "(%s::integer, %s::text, %s::timestamptz, %s::timestamptz,"
+    " %s::float8, %s::float8, %s::integer, %s::integer, %s::text)")
+
+_LOCATED_CHECKS_FROM_LOCATION_SQL = """
+SELECT
+    located.idx, located.reg_num, located.check_time, located.past_time,
+    (SELECT z.number FROM {zone_table} z
+     WHERE z.domain_id = check_params.domain_id
+       AND ST_Contains(z.geom, located.point)
+     ORDER BY z.number DESC
+     LIMIT 1) AS zone_number,
+    found_area.id AS area_id,
+    found_area.identifier AS area_identifier
+FROM (
+    SELECT
+        checks.*,
+        ST_SetSRID(ST_MakePoint(checks.x, checks.y), check_params.srid)
+        AS point
+    FROM checks, check_params
+) located
+CROSS JOIN check_params
+LEFT JOIN LATERAL (
+    SELECT a.id, a.identifier FROM {area_table} a
+    WHERE a.domain_id = check_params.domain_id
+      AND ST_Contains(a.geom, located.point)
+    ORDER BY a.identifier
+    LIMIT 1
+) found_area ON true
+"""
+
+_LOCATED_CHECKS_FROM_PARAMS_SQL = """
+SELECT
+    idx, reg_num, check_time, past_time,
+    zone_number, area_id, area_identifier
+FROM checks
+"""
+
+_EVALUATE_PARKING_CHECKS_SQL = """
+WITH
+checks (
+    idx, reg_num, check_time, past_time,
+    x, y, zone_number, area_id, area_identifier
+) AS (
+    VALUES {check_rows}
+),
+check_params (domain_id, srid) AS (
+    VALUES (%s::integer, %s::integer)
+),
+located_checks AS (
+{located_checks}
+)
+SELECT
+    located_checks.zone_number,
+    located_checks.area_identifier,
+    parking.id,
+    parking.time_end,
+    permit_item.end_time
+FROM located_checks
+CROSS JOIN check_params
+CROSS JOIN LATERAL (
+    VALUES (0, located_checks.check_time), (1, located_checks.past_time)
+) check_times (time_idx, check_time)
+LEFT JOIN LATERAL (
+    SELECT p.id, p.time_end FROM {parking_table} p
+    LEFT JOIN {zone_table} pz ON pz.id = p.zone_id
+    WHERE p.normalized_reg_num = located_checks.reg_num
+      AND p.domain_id = check_params.domain_id
+      AND p.time_start <= check_times.check_time
+      AND (p.time_end >= check_times.check_time OR p.time_end IS NULL)
+      AND (
+        located_checks.zone_number IS NULL
+        OR pz.number <= located_checks.zone_number)
+    LIMIT 1
+) parking ON true
+LEFT JOIN LATERAL (
+    SELECT i.end_time FROM {lookup_item_table} i
+    JOIN {permit_table} permit ON permit.id = i.permit_id
+    JOIN {series_table} series ON series.id = permit.series_id
+    WHERE series.active
+      AND permit.domain_id = check_params.domain_id
+      AND i.registration_number = located_checks.reg_num
+      AND i.area_id = located_checks.area_id
+      AND i.start_time <= check_times.check_time
+      AND i.end_time >= check_times.check_time
+    ORDER BY i.registration_number, i.start_time, i.end_time
+    LIMIT 1
+) permit_item ON true
+ORDER BY located_checks.idx, check_times.time_idx
+"""
+
+
+def evaluate_parking_check_stepwise(registration_number, location, time,
+                                    domain):
+    """
+    Evaluate a parking check with separate queries for each step.
+
+    This is the fallback of `evaluate_parking_check` and can be enabled
+    by setting PARKKIHUBI_CHECK_PARKING_SINGLE_QUERY to False.
+    """
+    zone = get_payment_zone(location, domain)
+    area = get_permit_area(location, domain)
+
+    (allowed_by, parking, end_time) = check_parking(
+        registration_number, zone, area, time, domain)
+
+    allowed = bool(allowed_by)
+
+    if not allowed:
+        # If no matching parking or permit was found, try to find
+        # one that has just expired, i.e. was valid a few minutes
+        # ago (where "a few minutes" is the grace duration)
+        past_time = time - get_grace_duration()
+        (_allowed_by, parking, end_time) = check_parking(
+            registration_number, zone, area, past_time, domain)
+
+    area_identifier = area.identifier if area else None
+    parking_id = parking.id if parking else None
+    return (zone, area_identifier, allowed, parking_id, end_time)
+
+
 def get_payment_zone(location, domain):
     if location is None:
         return None
+    if use_spatial_index():
+        return spatial_index.find_payment_zone(location, domain)
     zone = (
         PaymentZone.objects
         .filter(geom__contains=location, domain=domain)
@@ -125,6 +424,8 @@ def get_payment_zone(location, domain):
 def get_permit_area(location, domain):
     if location is None:
         return None
+    if use_spatial_index():
+        return spatial_index.find_permit_area(location, domain)
     area = PermitArea.objects.filter(geom__contains=location, domain=domain).first()
     return area if area else None
 
@@ -2,11 +2,14 @@ import datetime
 
 import django_filters
 from django.conf import settings
+from django.db.models import Exists, Q, Subquery
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from django_filters.utils import translate_validation
 from rest_framework import serializers, viewsets
 
 from ...models import Parking
+from ...pagination import ParkingPagination
 from .permissions import IsEnforcer
 
 
@@ -101,8 +104,10 @@ class ValidParkingFilter(django_filters.rest_framework.FilterSet):
 
 class ValidParkingViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsEnforcer]
-    queryset = Parking.objects.order_by('-time_end')
+    queryset = Parking.objects.select_related('operator', 'zone').order_by('-time_end')
     serializer_class = ValidParkingSerializer
+    pagination_class = ParkingPagination
+    keyset_ordering = ('-time_end', '-id')
     filterset_class = ValidParkingFilter
 
     def filter_queryset(self, queryset):
@@ -116,35 +121,30 @@ class ValidParkingViewSet(viewsets.ReadOnlyModelViewSet):
 
         The grace duration G defaults to 15 minutes, but is configurable
         with the PARKKIHUBI_TIME_OLD_PARKINGS_VISIBLE setting.
-        """
-        filtered_queryset = super().filter_queryset(queryset)
-
-        if filtered_queryset:
-            return filtered_queryset
 
-        return self._filter_last_valid_if_within_grace_duration(queryset)
-
-    def _filter_last_valid_if_within_grace_duration(self, queryset):
-        """
-        Filter to last valid parking if it ends within grace duration.
+        The fallback to the grace duration is done in the same database
+        query as the filtering, so the returned queryset is not
+        evaluated here.
         """
-        filter_params = self._get_filter_params(queryset)
-        reg_num = filter_params['reg_num']
-        time = filter_params.get('time') or timezone.now()
-        some_time_ago = time - get_grace_duration()
+        filterset = self._get_filterset(queryset)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        valid_parkings = filterset.qs
+        reg_num = filterset.form.cleaned_data.get('reg_num')
+        if not reg_num:
+            return valid_parkings
+
+        time = filterset.form.cleaned_data.get('time') or timezone.now()
         valid_some_time_ago = (
             queryset
             .registration_number_like(reg_num)
-            .ends_after(some_time_ago)
+            .ends_after(time - get_grace_duration())
             .starts_before(time))
-
-        return valid_some_time_ago.order_by('-time_end')[:1]
-
-    def _get_filter_params(self, queryset):
-        filterset = self._get_filterset(queryset)
-        is_valid = filterset.is_valid()
-        assert is_valid
-        return filterset.form.cleaned_data
+        last_valid_some_time_ago = (
+            valid_some_time_ago.order_by('-time_end').values('pk')[:1])
+        return valid_some_time_ago.filter(
+            Q(pk__in=valid_parkings.order_by().values('pk')) |
+            (~Exists(valid_parkings) & Q(pk=Subquery(last_valid_some_time_ago))))
 
     def _get_filterset(self, queryset):
         filter_backend = self.filter_backends[0]()
@@ -3,11 +3,10 @@ import rest_framework_gis.serializers as gis_serializers
 from rest_framework import serializers, viewsets
 
 from ...models import ParkingArea, Region
-from ..common import WGS84InBBoxFilter
+from ..common import (
+    WGS84GeometryViewSetMixin, WGS84InBBoxFilter, get_geometry_detail)
 from .permissions import IsMonitor
 
-WGS84_SRID = 4326
-
 # Square meters in square kilometer
 M2_PER_KM2 = 1000000.0
 
@@ -19,7 +18,8 @@ class RegionSerializer(gis_serializers.GeoFeatureModelSerializer):
     parking_areas = serializers.SerializerMethodField()
 
     def get_wgs84_geometry(self, instance):
-        return instance.geom.transform(WGS84_SRID, clone=True)
+        detail = get_geometry_detail(self.context.get('request'))
+        return instance.get_wgs84_geometry(detail)
 
     def get_area_km2(self, instance):
         return instance.geom.area / M2_PER_KM2
@@ -28,8 +28,10 @@ class RegionSerializer(gis_serializers.GeoFeatureModelSerializer):
         return M2_PER_KM2 * instance.capacity_estimate / instance.geom.area
 
     def get_parking_areas(self, instance):
+        if hasattr(instance, 'parking_area_ids'):
+            return instance.parking_area_ids
         parking_areas = ParkingArea.objects.intersecting_region(instance)
-        return [x.pk for x in parking_areas]
+        return [x.pk for x in parking_areas.order_by('pk')]
 
     class Meta:
         model = Region
@@ -44,7 +46,7 @@ class RegionSerializer(gis_serializers.GeoFeatureModelSerializer):
         ]
 
 
-class RegionViewSet(viewsets.ReadOnlyModelViewSet):
+class RegionViewSet(WGS84GeometryViewSetMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsMonitor]
     queryset = Region.objects.all().order_by('id')
     serializer_class = RegionSerializer
@@ -54,4 +56,7 @@ class RegionViewSet(viewsets.ReadOnlyModelViewSet):
     bbox_filter_include_overlapping = True
 
     def get_queryset(self):
-        return super().get_queryset().filter(domain=self.request.user.monitor.domain)
+        return (
+            super().get_queryset()
+            .filter(domain=self.request.user.monitor.domain)
+            .with_parking_area_ids())
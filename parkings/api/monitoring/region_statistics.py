@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers, viewsets
 
 from ...models import Region
@@ -7,6 +8,18 @@ from ..utils import parse_timestamp_or_now
 from .permissions import IsMonitor
 
 
+def with_parking_count(regions, time):
+    """
+    Annotate the number of parkings valid at given time to the regions.
+
+    The counts are taken from the precomputed region occupancy, if
+    PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY is enabled.
+    """
+    if getattr(settings, 'PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY', False):
+        return regions.with_occupancy_count(time)
+    return regions.with_parking_count(time)
+
+
 class RegionStatisticsSerializer(serializers.ModelSerializer):
     parking_count = serializers.IntegerField(read_only=True)
 
@@ -30,8 +43,7 @@ class RegionStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         time = parse_timestamp_or_now(self.request.query_params.get('time'))
         return (
-            super().get_queryset()
-            .with_parking_count(time)
+            with_parking_count(super().get_queryset(), time)
             .values('id', 'parking_count')
             .order_by('id')
             .filter(parking_count__gt=0, domain=self.request.user.monitor.domain))
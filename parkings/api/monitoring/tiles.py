@@ -0,0 +1,186 @@
+"""
+Mapbox vector tiles of regions, parking areas and valid parkings.
+
+The tiles are generated with the ST_AsMVT function of PostGIS from a
+Django queryset, which is filtered to the objects overlapping with the
+tile in Web Mercator coordinates.  The attributes of the features are selected from the
+fields and annotations of the queryset.
+"""
+import abc
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import views
+from rest_framework.exceptions import NotFound
+
+from ...models import Parking, ParkingArea, Region
+from ..utils import parse_timestamp_or_now
+from .permissions import IsMonitor
+from .region_statistics import with_parking_count
+
+WEB_MERCATOR_SRID = 3857
+MAX_ZOOM = 22
+
+# Extent and buffer of the tile geometries in tile coordinate units,
+# i.e. the defaults of ST_AsMVTGeom
+TILE_EXTENT = 4096
+TILE_BUFFER = 256
+
+CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+
+_TILE_SQL = """
+SELECT ST_AsMVT(tile, %s, {extent}, 'geom')
+FROM (
+    SELECT
+        ST_AsMVTGeom(
+            ST_Transform(features.{geom}::geometry, {srid}),
+            ST_TileEnvelope(%s, %s, %s), {extent}, {buffer}) AS geom,
+        {attributes}
+    FROM ({features}) AS features
+    WHERE ST_Transform(features.{geom}::geometry, {srid})
+        && ST_TileEnvelope(%s, %s, %s, margin => %s)
+) AS tile
+WHERE tile.geom IS NOT NULL
+"""
+
+# Prefix of the column names of the features query, which keeps them
+# from clashing with the field names of the model
+_COLUMN_PREFIX = 'tile_'
+
+
+def check_tile(zoom, x, y):
+    """
+    Check that given tile coordinates are valid.
+
+    :raises NotFound: if the tile doesn't exist
+    """
+    if not (0 <= zoom <= MAX_ZOOM and 0 <= x < 2**zoom and 0 <= y < 2**zoom):
+        raise NotFound()
+
+
+def render_tile(queryset, layer_name, geom_field, attributes, zoom, x, y):
+    """
+    Render features of given queryset as a vector tile.
+
+    :param queryset: Queryset of the features
+    :param layer_name: Name of the layer in the tile
+    :param geom_field: Name of the geometry field of the queryset
+    :param attributes:
+      Attributes of the features as a list of (name, lookup) pairs,
+      where lookup is a field or annotation of the queryset
+    :rtype: bytes
+    """
+    check_tile(zoom, x, y)
+    geom_column = _COLUMN_PREFIX + 'geom'
+    columns = {
+        name: _COLUMN_PREFIX + name for (name, _lookup) in attributes}
+    # The geometry is selected as EWKB with psycopg2, hence the cast in
+    # the tile query
+    features = (
+        queryset
+        .order_by()
+        .values(**{geom_column: F(geom_field)}, **{
+            columns[name]: F(lookup) for (name, lookup) in attributes}))
+
+    db = router.db_for_read(queryset.model)
+    connection = connections[db]
+    quote = connection.ops.quote_name
+    (features_sql, features_params) = features.query.sql_with_params()
+    sql = _TILE_SQL.format(
+        extent=TILE_EXTENT,
+        buffer=TILE_BUFFER,
+        srid=WEB_MERCATOR_SRID,
+        geom=quote(geom_column),
+        attributes=", ".join(
+            'features.{} AS {}'.format(quote(columns[name]), quote(name))
+            for (name, _lookup) in attributes),
+        features=features_sql)
+    # The features are filtered after transforming them to Web Mercator,
+    # since the tile envelope may extend far outside of the area where
+    # the coordinate system of the geometry field is usable.  Features
+    # in the buffer zone are included too, so that features crossing
+    # tile edges are rendered the same way in both tiles.
+    params = (
+        [layer_name, zoom, x, y] + list(features_params)
+        + [zoom, x, y, TILE_BUFFER / TILE_EXTENT])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return bytes(cursor.fetchone()[0] or b'')
+
+
+class TileView(views.APIView, metaclass=abc.ABCMeta):
+    """
+    Base class for the vector tile views.
+
+    The tiles can be cached by the clients for
+    PARKKIHUBI_MONITORING_TILE_MAX_AGE seconds.
+    """
+    permission_classes = [IsMonitor]
+    layer_name = None
+    geom_field = 'geom'
+    attributes = []
+
+    @abc.abstractmethod
+    def get_queryset(self, time):
+        """
+        Get the queryset of the features valid at given time.
+        """
+
+    def get(self, request, z, x, y, format=None):
+        time = parse_timestamp_or_now(request.query_params.get('time'))
+        queryset = self.get_queryset(time)
+        tile = render_tile(
+            queryset, self.layer_name, self.geom_field, self.attributes,
+            z, x, y)
+        response = HttpResponse(tile, content_type=CONTENT_TYPE)
+        max_age = getattr(settings, 'PARKKIHUBI_MONITORING_TILE_MAX_AGE', 60)
+        patch_cache_control(response, private=True, max_age=max_age)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class RegionTileView(TileView):
+    layer_name = 'region'
+    attributes = [
+        ('id', 'id'),
+        ('name', 'name'),
+        ('capacity_estimate', 'capacity_estimate'),
+        ('parking_count', 'parking_count'),
+    ]
+
+    def get_queryset(self, time):
+        regions = Region.objects.filter(domain=self.request.user.monitor.domain)
+        return with_parking_count(regions, time)
+
+
+class ParkingAreaTileView(TileView):
+    layer_name = 'parking_area'
+    attributes = [
+        ('id', 'id'),
+        ('capacity_estimate', 'capacity_estimate'),
+        ('parking_count', 'parking_count'),
+    ]
+
+    def get_queryset(self, time):
+        areas = ParkingArea.objects.filter(
+            domain=self.request.user.monitor.domain)
+        return areas.with_parking_count(time)
+
+
+class ValidParkingTileView(TileView):
+    layer_name = 'valid_parking'
+    geom_field = 'location'
+    attributes = [
+        ('id', 'id'),
+        ('region', 'region'),
+        ('zone', 'zone__code'),
+        ('time_start', 'time_start'),
+        ('time_end', 'time_end'),
+    ]
+
+    def get_queryset(self, time):
+        return Parking.objects.filter(
+            domain=self.request.user.monitor.domain).valid_at(time)
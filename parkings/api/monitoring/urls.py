@@ -1,8 +1,10 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from ..url_utils import versioned_url
 from .region import RegionViewSet
 from .region_statistics import RegionStatisticsViewSet
+from .tiles import ParkingAreaTileView, RegionTileView, ValidParkingTileView
 from .valid_parking import ValidParkingViewSet
 
 router = DefaultRouter()
@@ -12,7 +14,16 @@ router.register(r'region_statistics', RegionStatisticsViewSet,
 router.register(r'valid_parking', ValidParkingViewSet,
                 basename='valid_parking')
 
+tile_urls = [
+    path('region/tiles/<int:z>/<int:x>/<int:y>.mvt',
+         RegionTileView.as_view(), name='region-tile'),
+    path('parking_area/tiles/<int:z>/<int:x>/<int:y>.mvt',
+         ParkingAreaTileView.as_view(), name='parkingarea-tile'),
+    path('valid_parking/tiles/<int:z>/<int:x>/<int:y>.mvt',
+         ValidParkingTileView.as_view(), name='valid_parking-tile'),
+]
+
 app_name = 'monitoring'
 urlpatterns = [
-    versioned_url('v1', router.urls),
+    versioned_url('v1', tile_urls + router.urls),
 ]
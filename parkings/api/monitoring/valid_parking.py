@@ -1,11 +1,12 @@
 import django_filters
-import rest_framework_gis.pagination as gis_pagination
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
 
 from ...models import Parking
+from ...pagination import GeoJsonParkingPagination
 from ..common import WGS84InBBoxFilter
+from ..streaming import StreamingExportMixin
 from .permissions import IsMonitor
 from .serializers import ParkingSerializer
 
@@ -26,14 +27,22 @@ class ValidParkingFilter(django_filters.rest_framework.FilterSet):
         return queryset.valid_at(value)
 
 
-class ValidParkingViewSet(viewsets.ReadOnlyModelViewSet):
+class ValidParkingViewSet(
+        StreamingExportMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Parkings valid at given time.
+
+    The list can be exported without pagination with format=ndjson or
+    format=csv.  See GeoJsonParkingPagination for the pagination modes.
+    """
     permission_classes = [IsMonitor]
     queryset = (
         Parking.objects
         .order_by('time_start')
-        .select_related('operator'))
+        .select_related('operator', 'zone'))
     serializer_class = ParkingSerializer
-    pagination_class = gis_pagination.GeoJsonPagination
+    pagination_class = GeoJsonParkingPagination
+    keyset_ordering = ('time_start', 'id')
     filterset_class = ValidParkingFilter
     bbox_filter_field = 'location'
     filter_backends = [DjangoFilterBackend, WGS84InBBoxFilter]
@@ -2,7 +2,8 @@ import pytz
 from django.conf import settings
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
-from rest_framework import mixins, serializers, viewsets
+from rest_framework import mixins, serializers, status, viewsets
+from rest_framework.response import Response
 
 from parkings.models import EnforcementDomain, Parking, PaymentZone
 
@@ -12,16 +13,100 @@ from .permissions import IsOperator
 DEFAULT_DOMAIN_CODE = EnforcementDomain.get_default_domain_code()
 
 
+class EnforcementDomainCodeField(serializers.SlugRelatedField):
+    """
+    Enforcement domain field which is looked up from the domain cache.
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'code')
+        kwargs.setdefault('queryset', EnforcementDomain.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, (dict, list)):
+            self.fail('invalid')
+        try:
+            return EnforcementDomain.get_by_code(str(data))
+        except EnforcementDomain.DoesNotExist:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=data)
+
+
+class PaymentZoneCodeField(serializers.SlugRelatedField):
+    """
+    Payment zone field which can use zones preloaded to the context.
+
+    If the context has "payment_zones", it should be a dict of payment
+    zones keyed by (domain code, zone code) and the zone is looked up
+    from there rather than from the database.
+    """
+    domain_code = None
+
+    def to_internal_value(self, data):
+        zones = self.context.get('payment_zones')
+        if zones is None:
+            return super().to_internal_value(data)
+        zone = zones.get((self.domain_code, str(data)))
+        if zone is None:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=data)
+        return zone
+
+
+class OperatorAPIParkingListSerializer(serializers.ListSerializer):
+    """
+    Serializer for creating parkings in bulk.
+
+    Each item is validated with its own OperatorAPIParkingSerializer,
+    since the validation depends on the item data, but the payment
+    zones of all items are loaded with a single query and the parkings
+    are created with `Parking.create_in_bulk`.
+    """
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({
+                'non_field_errors': [_('Expected a list of items.')]})
+        if not data:
+            raise serializers.ValidationError({
+                'non_field_errors': [_('This list may not be empty.')]})
+        max_size = get_batch_max_size()
+        if len(data) > max_size:
+            raise serializers.ValidationError({
+                'non_field_errors': [
+                    _('Ensure this list has no more than {} items.').format(
+                        max_size)]})
+
+        context = dict(self.context, payment_zones=get_payment_zones(data))
+        result = []
+        errors = []
+        for item in data:
+            if not isinstance(item, dict):
+                errors.append({'non_field_errors': [
+                    _('Invalid data. Expected a dictionary.')]})
+                continue
+            serializer = self.child.__class__(data=item, context=context)
+            if serializer.is_valid():
+                result.append(serializer.validated_data)
+                errors.append({})
+            else:
+                errors.append(serializer.errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return result
+
+    def create(self, validated_data):
+        parkings = [Parking(**attrs) for attrs in validated_data]
+        return Parking.create_in_bulk(parkings)
+
+
 class OperatorAPIParkingSerializer(serializers.ModelSerializer):
     status = serializers.ReadOnlyField(source='get_state')
-    domain = serializers.SlugRelatedField(
-        slug_field='code', queryset=EnforcementDomain.objects.all(),
+    domain = EnforcementDomainCodeField(
         default=EnforcementDomain.get_default_domain)
-    zone = serializers.SlugRelatedField(
+    zone = PaymentZoneCodeField(
         slug_field='code', queryset=PaymentZone.objects.all())
 
     class Meta:
         model = Parking
+        list_serializer_class = OperatorAPIParkingListSerializer
         fields = (
             'id', 'created_at', 'modified_at',
             'location', 'terminal_number',
@@ -55,9 +140,9 @@ class OperatorAPIParkingSerializer(serializers.ModelSerializer):
             self.fields['zone'].required = False
 
         if initial_data:
-            domain = initial_data.get('domain', DEFAULT_DOMAIN_CODE)
-            self.fields['zone'].queryset = (
-                PaymentZone.objects.filter(domain__code=domain))
+            domain_code = initial_data.get('domain', DEFAULT_DOMAIN_CODE)
+            self.fields['zone'].queryset = get_zones_of_domain(domain_code)
+            self.fields['zone'].domain_code = str(domain_code)
 
     def validate(self, data):
         if self.instance and (now() - self.instance.created_at) > settings.PARKKIHUBI_TIME_PARKINGS_EDITABLE:
@@ -90,6 +175,34 @@ class OperatorAPIParkingSerializer(serializers.ModelSerializer):
         return representation
 
 
+def get_zones_of_domain(domain_code):
+    if isinstance(domain_code, (dict, list)):
+        return PaymentZone.objects.none()
+    try:
+        domain = EnforcementDomain.get_by_code(str(domain_code))
+    except EnforcementDomain.DoesNotExist:
+        return PaymentZone.objects.none()
+    return PaymentZone.objects.filter(domain=domain)
+
+
+def get_payment_zones(items):
+    """
+    Get payment zones of the domains used in given parking data items.
+
+    :returns: dict of payment zones keyed by (domain code, zone code)
+    """
+    domain_codes = {
+        str(item.get('domain', DEFAULT_DOMAIN_CODE))
+        for item in items if isinstance(item, dict)}
+    zones = PaymentZone.objects.filter(
+        domain__code__in=domain_codes).select_related('domain')
+    return {(zone.domain.code, zone.code): zone for zone in zones}
+
+
+def get_batch_max_size():
+    return getattr(settings, 'PARKKIHUBI_OPERATOR_PARKING_BATCH_MAX_SIZE', 1000)
+
+
 class OperatorAPIParkingPermission(IsOperator):
     def has_object_permission(self, request, view, obj):
         """
@@ -104,6 +217,14 @@ class OperatorAPIParkingViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin
     queryset = Parking.objects.order_by('time_start')
     serializer_class = OperatorAPIParkingSerializer
 
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     def perform_create(self, serializer):
         serializer.save(operator=self.request.user.operator)
 
@@ -5,14 +5,16 @@ from rest_framework_gis.serializers import (
 
 from parkings.models import ParkingArea
 
-from ..common import WGS84InBBoxFilter
+from ..common import (
+    WGS84GeometryViewSetMixin, WGS84InBBoxFilter, get_geometry_detail)
 
 
 class ParkingAreaSerializer(GeoFeatureModelSerializer):
     wgs84_areas = GeometrySerializerMethodField()
 
     def get_wgs84_areas(self, area):
-        return area.geom.transform(4326, clone=True)
+        detail = get_geometry_detail(self.context.get('request'))
+        return area.get_wgs84_geometry(detail)
 
     class Meta:
         model = ParkingArea
@@ -23,7 +25,8 @@ class ParkingAreaSerializer(GeoFeatureModelSerializer):
         )
 
 
-class PublicAPIParkingAreaViewSet(viewsets.ReadOnlyModelViewSet):
+class PublicAPIParkingAreaViewSet(
+        WGS84GeometryViewSetMixin, viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = ParkingArea.objects.order_by('origin_id')
     serializer_class = ParkingAreaSerializer
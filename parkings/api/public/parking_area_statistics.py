@@ -1,12 +1,20 @@
-from django.db.models import Case, Count, Q, When
+import datetime
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Envelope
+from django.core.cache import cache
+from django.http import Http404
 from django.utils import timezone
 from rest_framework import permissions, serializers, viewsets
+from rest_framework.response import Response
 
 from parkings.models import ParkingArea
 from parkings.pagination import Pagination
 
 from ..common import WGS84InBBoxFilter
 
+SNAPSHOT_CACHE_KEY = "parkings:public:parking_area_statistics"
+
 
 class ParkingAreaStatisticsSerializer(serializers.ModelSerializer):
     current_parking_count = serializers.SerializerMethodField()
@@ -32,7 +40,59 @@ class ParkingAreaStatisticsSerializer(serializers.ModelSerializer):
         )
 
 
+def get_statistics_snapshot():
+    """
+    Get the current parking counts of all parking areas.
+
+    The counts are computed at most once per
+    PARKKIHUBI_PUBLIC_STATISTICS_SNAPSHOT_INTERVAL and stored to the
+    configured cache backend in between.
+
+    :returns:
+      Dictionary with the time of the snapshot in "timestamp" and a
+      list of (area, extent) pairs ordered by the origin id of the
+      areas in "areas", where each area is a dictionary with "id" and
+      "current_parking_count" and extent is the bounding box of the
+      area as (xmin, ymin, xmax, ymax) tuple
+    """
+    snapshot = cache.get(SNAPSHOT_CACHE_KEY)
+    if snapshot is None:
+        snapshot = compute_statistics_snapshot()
+        interval = getattr(
+            settings, 'PARKKIHUBI_PUBLIC_STATISTICS_SNAPSHOT_INTERVAL',
+            datetime.timedelta(minutes=1))
+        cache.set(
+            SNAPSHOT_CACHE_KEY, snapshot, timeout=interval.total_seconds())
+    return snapshot
+
+
+def compute_statistics_snapshot():
+    now = timezone.now()
+    areas = (
+        ParkingArea.objects
+        .with_parking_count(now)
+        .annotate(envelope=Envelope('geom'))
+        .values_list('id', 'parking_count', 'envelope')
+        .order_by('origin_id'))
+    return {
+        'timestamp': now,
+        'areas': [
+            ({'id': area_id, 'current_parking_count': count}, envelope.extent)
+            for (area_id, count, envelope) in areas
+        ],
+    }
+
+
 class PublicAPIParkingAreaStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Parking area statistics served from a periodic snapshot.
+
+    The counts are not computed per request, since this endpoint is
+    public.  Instead all requests are served from the snapshot returned
+    by `get_statistics_snapshot`, including the bounding box filtering,
+    which compares the bounding boxes of the areas like the database
+    filter would.
+    """
     permission_classes = [permissions.AllowAny]
     queryset = ParkingArea.objects.all()
     serializer_class = ParkingAreaStatisticsSerializer
@@ -41,17 +101,29 @@ class PublicAPIParkingAreaStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (WGS84InBBoxFilter,)
     bbox_filter_include_overlapping = True
 
-    def get_queryset(self):
-        now = timezone.now()
-
-        return ParkingArea.objects.annotate(
-            current_parking_count=Count(
-                Case(
-                    When(
-                        Q(parkings__time_start__lte=now) &
-                        (Q(parkings__time_end__gte=now) | Q(parkings__time_end__isnull=True)),
-                        then=1,
-                    )
-                )
-            )
-        ).values('id', 'current_parking_count').order_by('origin_id')
+    def list(self, request, *args, **kwargs):
+        snapshot = get_statistics_snapshot()
+        bbox = WGS84InBBoxFilter().get_filter_bbox(request)
+        if bbox is not None:
+            (xmin, ymin, xmax, ymax) = bbox.extent
+            areas = [
+                area for (area, (a_xmin, a_ymin, a_xmax, a_ymax))
+                in snapshot['areas']
+                if (a_xmin <= xmax and xmin <= a_xmax and
+                    a_ymin <= ymax and ymin <= a_ymax)]
+        else:
+            areas = [area for (area, _extent) in snapshot['areas']]
+
+        page = self.paginate_queryset(areas)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['timestamp'] = snapshot['timestamp']
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        snapshot = get_statistics_snapshot()
+        pk = str(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        for (area, _extent) in snapshot['areas']:
+            if str(area['id']) == pk:
+                return Response(self.get_serializer(area).data)
+        raise Http404
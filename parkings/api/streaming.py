@@ -0,0 +1,115 @@
+"""
+Streaming export of list endpoints as NDJSON or CSV.
+
+Viewsets using StreamingExportMixin return the whole filtered list
+without pagination when the format query parameter is "ndjson" or
+"csv".  The objects are read with a server-side cursor and serialized
+one at a time while the response is being sent, so the memory usage
+doesn't depend on the number of objects.
+"""
+import csv
+import io
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """
+    Renderer of newline delimited JSON.
+
+    Used for the responses which are not streamed, e.g. errors.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return render_ndjson_line(data).encode(self.charset)
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """
+    Renderer of CSV.
+
+    Used for the responses which are not streamed, e.g. errors, which
+    are rendered as a header row of the keys and a row of the values.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        return (
+            render_csv_row(list(data.keys())) +
+            render_csv_row([_to_csv_value(x) for x in data.values()])
+        ).encode(self.charset)
+
+
+def render_ndjson_line(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def render_csv_row(values):
+    output = io.StringIO()
+    csv.writer(output).writerow(values)
+    return output.getvalue()
+
+
+def _to_csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=JSONEncoder, ensure_ascii=False)
+    return value
+
+
+class StreamingExportMixin:
+    """
+    Mixin for list viewsets of GeoJSON features to add streaming export.
+
+    In NDJSON each line is a GeoJSON feature.  In CSV the point
+    geometry is exported as longitude and latitude columns and the
+    properties as the rest of the columns.
+    """
+    streaming_chunk_size = 2000
+    streaming_formats = {
+        'ndjson': NDJSONRenderer.media_type,
+        'csv': CSVRenderer.media_type,
+    }
+
+    def get_renderers(self):
+        return super().get_renderers() + [NDJSONRenderer(), CSVRenderer()]
+
+    def list(self, request, *args, **kwargs):
+        export_format = request.accepted_renderer.format
+        if export_format not in self.streaming_formats:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        features = (
+            self.get_serializer(instance).data
+            for instance in queryset.iterator(
+                chunk_size=self.streaming_chunk_size))
+        if export_format == 'csv':
+            rows = self._generate_csv(features)
+        else:
+            rows = (render_ndjson_line(feature) for feature in features)
+        return StreamingHttpResponse(
+            rows, content_type=self.streaming_formats[export_format])
+
+    def _generate_csv(self, features):
+        serializer_meta = self.get_serializer_class().Meta
+        property_names = [
+            x for x in serializer_meta.fields
+            if x not in ('id', serializer_meta.geo_field)]
+        yield render_csv_row(['id', 'longitude', 'latitude'] + property_names)
+        for feature in features:
+            coordinates = (feature['geometry'] or {}).get('coordinates')
+            (longitude, latitude) = coordinates or (None, None)
+            properties = feature['properties']
+            yield render_csv_row(
+                [feature['id'], longitude, latitude] +
+                [_to_csv_value(properties[x]) for x in property_names])
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ParkingsAppConfig(AppConfig):
     name = 'parkings'
+
+    def ready(self):
+        from . import spatial_index  # noqa: F401 (registers signals)
@@ -0,0 +1,165 @@
+"""
+Reassignment of parking regions and areas after geometry changes.
+
+The region and parking area of a parking are resolved from its location
+when the parking is saved.  When the geometries of the regions or
+parking areas are changed, e.g. by the importers, only the parkings
+located in the changed parts of the geometries can get a different
+region or area.  The changes are recorded with GeometryChangeTracker
+and the changed part of each geometry is the symmetric difference of
+its old and new geometry.  Then only the parkings within the changed
+parts are re-resolved, instead of scanning the whole parking table.
+"""
+import collections
+import functools
+
+from django.db.models import Q
+
+from .models import Parking
+
+GeometryChange = collections.namedtuple(
+    "GeometryChange", ["domain_id", "old_geom", "new_geom"])
+
+
+class GeometryChangeTracker:
+    """
+    Context manager for recording geometry changes of a model.
+
+    The geometries of the model are read when entering the context and
+    compared to the geometries when exiting it.  Usage::
+
+        with GeometryChangeTracker(Region) as tracker:
+            import_regions()
+        reassign_regions(tracker.changes)
+
+    :type model: type[parkings.models.Region|parkings.models.ParkingArea]
+    """
+    def __init__(self, model):
+        self.model = model
+        self.changes = []
+        self._old_geometries = {}
+
+    def __enter__(self):
+        self._old_geometries = self._get_geometries()
+        self.changes = []
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.changes = get_geometry_changes(
+                self._old_geometries, self._get_geometries())
+        self._old_geometries = {}
+        return False
+
+    def _get_geometries(self):
+        return {
+            pk: (domain_id, geom)
+            for (pk, domain_id, geom) in self.model.objects.values_list(
+                "pk", "domain_id", "geom")}
+
+
+def get_geometry_changes(old_geometries, new_geometries):
+    """
+    Get the changes between two sets of geometries.
+
+    A geometry which was moved to another domain is a removal from the
+    old domain and an addition to the new domain.
+
+    :param old_geometries: Mapping of pk to (domain_id, geom) pairs
+    :param new_geometries: Mapping of pk to (domain_id, geom) pairs
+    :rtype: list[GeometryChange]
+    """
+    changes = []
+    for pk in sorted(set(old_geometries) | set(new_geometries), key=str):
+        (old_domain, old_geom) = old_geometries.get(pk, (None, None))
+        (new_domain, new_geom) = new_geometries.get(pk, (None, None))
+        if old_domain != new_domain:
+            if old_geom is not None:
+                changes.append(GeometryChange(old_domain, old_geom, None))
+            if new_geom is not None:
+                changes.append(GeometryChange(new_domain, None, new_geom))
+        elif old_geom is None or new_geom is None:
+            if old_geom is not None or new_geom is not None:
+                changes.append(GeometryChange(new_domain, old_geom, new_geom))
+        elif old_geom.ewkb != new_geom.ewkb:
+            changes.append(GeometryChange(new_domain, old_geom, new_geom))
+    return changes
+
+
+def get_changed_areas(changes, buffer_distance=0):
+    """
+    Get the changed areas of given geometry changes per domain.
+
+    The changed area of a modified geometry is the symmetric difference
+    of the old and new geometry, and of an added or removed geometry
+    the geometry itself.
+
+    :type changes: Iterable[GeometryChange]
+    :param buffer_distance:
+      Distance to grow the changed areas by, in units of the SRID of
+      the geometries
+    :returns: Mapping of domain_id to the union of the changed areas
+    """
+    parts = collections.defaultdict(list)
+    for change in changes:
+        if change.new_geom is None:
+            changed = change.old_geom
+        elif change.old_geom is None:
+            changed = change.new_geom
+        else:
+            changed = change.old_geom.sym_difference(change.new_geom)
+        if not changed.empty:
+            parts[change.domain_id].append(changed)
+
+    result = {}
+    for (domain_id, geometries) in parts.items():
+        area = functools.reduce((lambda a, b: a.union(b)), geometries)
+        if buffer_distance:
+            area = area.buffer(buffer_distance)
+        area.srid = geometries[0].srid
+        result[domain_id] = area
+    return result
+
+
+def get_parkings_in_changed_areas(changes, buffer_distance=0):
+    """
+    Get the parkings located in the changed areas of given changes.
+
+    :type changes: Iterable[GeometryChange]
+    :rtype: parkings.models.ParkingQuerySet
+    """
+    changed_areas = get_changed_areas(changes, buffer_distance)
+    if not changed_areas:
+        return Parking.objects.none()
+    condition = Q()
+    for (domain_id, area) in changed_areas.items():
+        condition |= Q(domain=domain_id, location__intersects=area)
+    return Parking.objects.filter(condition)
+
+
+def reassign_regions(changes):
+    """
+    Re-resolve the regions of the parkings in the changed areas.
+
+    The region occupancy is updated for the reassigned parkings.
+
+    :type changes: Iterable[GeometryChange]
+    :returns: Number of parkings whose region changed
+    """
+    parkings = get_parkings_in_changed_areas(changes)
+    return parkings.assign_regions(update_occupancy=True)
+
+
+def reassign_parking_areas(changes, max_distance=50):
+    """
+    Re-resolve the parking areas of the parkings near the changed areas.
+
+    A parking may get a different closest area if an area changed
+    within the maximum distance from it, so the changed areas are
+    grown by the maximum distance.
+
+    :type changes: Iterable[GeometryChange]
+    :returns: Number of parkings whose parking area changed
+    """
+    parkings = get_parkings_in_changed_areas(changes, max_distance)
+    return parkings.assign_parking_areas(max_distance=max_distance)
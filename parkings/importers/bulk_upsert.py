@@ -0,0 +1,224 @@
+import collections
+import hashlib
+
+from django.contrib.gis.db.models import GeometryField
+from django.contrib.gis.db.models.functions import AsWKB
+from django.db import router, transaction
+from django.db.models.functions import MD5
+from django.utils import timezone
+
+from .. import spatial_index
+
+CREATED = 'created'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+
+UpsertResult = collections.namedtuple(
+    'UpsertResult', ['created', 'updated', 'unchanged'])
+
+
+class BulkUpsert:
+    """
+    Create or update model instances by a unique key in bulk.
+
+    The existing rows are prefetched with a single query into a dict by
+    their key.  Geometries are not fetched, but compared by a hash of
+    their WKB computed in the database.  The added values are compared
+    to the existing rows and only the new and changed instances are
+    written, with bulk_create using update_conflicts on the key.
+
+    Usage::
+
+        upsert = BulkUpsert(PaymentZone, ['domain_id', 'code'],
+                            ['number', 'name', 'geom'])
+        for values in parsed_values:
+            upsert.add(values)
+        result = upsert.save()
+
+    :param model: The model class
+    :param key_fields:
+      Names of the fields which identify an instance.  The model must
+      have a unique constraint on these fields.
+    :param update_fields:
+      Names of the fields which are compared and updated for existing
+      instances.  The added values must have the key and update fields.
+      Other fields in the added values are only set for the created
+      instances.
+    :param queryset:
+      Queryset of the existing instances to prefetch, defaults to all
+      instances of the model
+    """
+    def __init__(self, model, key_fields, update_fields,
+                 queryset=None, batch_size=1000):
+        self.model = model
+        self.key_fields = [model._meta.get_field(x) for x in key_fields]
+        self.update_fields = [model._meta.get_field(x) for x in update_fields]
+        self.batch_size = batch_size
+        self._queryset = (
+            queryset if queryset is not None else model.objects.all())
+        self._existing = None
+        self._to_create = {}
+        self._to_update = {}
+        self._counts = collections.Counter()
+        self._keys = set()
+
+    def diff(self, values):
+        """
+        Compare given values to the existing instance with the same key.
+
+        :rtype: str
+        :returns: CREATED, UPDATED or UNCHANGED
+        """
+        return self._diff(self._normalize_values(values))
+
+    def add(self, values):
+        """
+        Add values of an instance to be created or updated.
+
+        :param values: Mapping of field attribute names to values
+        :rtype: str
+        :returns: CREATED, UPDATED or UNCHANGED
+        """
+        values = self._normalize_values(values)
+        key = self._get_key(values)
+        status = self._diff(values)
+        self._keys.add(key)
+        self._counts[status] += 1
+        if status == CREATED:
+            self._to_create[key] = self.model(**values)
+        elif status == UPDATED:
+            instance = self.model(**values)
+            instance.pk = self._get_existing()[key][0]
+            self._to_update[key] = instance
+        return status
+
+    def _normalize_values(self, values):
+        return {
+            name: _normalize(self.model._meta.get_field(name), value)
+            for (name, value) in values.items()}
+
+    def _get_key(self, values):
+        return tuple(values[field.attname] for field in self.key_fields)
+
+    def _diff(self, values):
+        existing = self._get_existing().get(self._get_key(values))
+        if existing is None:
+            return CREATED
+        for (field, old_value) in zip(self.update_fields, existing[1:]):
+            new_value = values[field.attname]
+            if isinstance(field, GeometryField):
+                new_value = _hash_geometry(new_value)
+            if new_value != old_value:
+                return UPDATED
+        return UNCHANGED
+
+    def save(self):
+        """
+        Write the added instances to the database.
+
+        :rtype: UpsertResult
+        """
+        if self._to_create or self._to_update:
+            self._write(
+                list(self._to_create.values()),
+                list(self._to_update.values()))
+        self._to_create = {}
+        self._to_update = {}
+        self._existing = None
+        return UpsertResult(
+            self._counts[CREATED], self._counts[UPDATED],
+            self._counts[UNCHANGED])
+
+    def get_pks(self):
+        """
+        Get the primary keys of the added instances by their keys.
+
+        Should be called after save.
+
+        :rtype: dict
+        """
+        return {
+            key: pk for (key, pk) in self._get_key_pk_pairs()
+            if key in self._keys}
+
+    def _write(self, created, updated):
+        instances = created + updated
+        update_fields = [x.name for x in self.update_fields]
+        if any(x.name == 'modified_at' for x in self.model._meta.fields):
+            # bulk_update doesn't set the auto_now fields
+            now = timezone.now()
+            for instance in instances:
+                instance.modified_at = now
+            update_fields.append('modified_at')
+        db = router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            # The conflicts are updated too, so that rows created after
+            # the prefetch don't fail the import
+            self.model.objects.using(db).bulk_create(
+                created,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=[x.name for x in self.key_fields],
+                update_fields=update_fields)
+            self.model.objects.using(db).bulk_update(
+                updated, update_fields, batch_size=self.batch_size)
+            # Bulk writes don't send the post_save signals
+            if self.model in spatial_index.INDEXED_MODELS:
+                transaction.on_commit(spatial_index.invalidate, using=db)
+
+    def _get_existing(self):
+        if self._existing is None:
+            self._existing = self._fetch_existing()
+        return self._existing
+
+    def _fetch_existing(self):
+        hashes = {
+            '_hash_{}'.format(field.attname): MD5(AsWKB(field.name))
+            for field in self.update_fields
+            if isinstance(field, GeometryField)}
+        columns = [
+            ('_hash_{}'.format(field.attname)
+             if isinstance(field, GeometryField) else field.attname)
+            for field in self.update_fields]
+        key_columns = [field.attname for field in self.key_fields]
+        rows = self._queryset.order_by().annotate(**hashes).values_list(
+            'pk', *(key_columns + columns))
+        key_length = len(key_columns)
+        return {
+            tuple(row[1:1 + key_length]): (row[0],) + row[1 + key_length:]
+            for row in rows}
+
+    def _get_key_pk_pairs(self):
+        key_columns = [field.attname for field in self.key_fields]
+        for row in self._queryset.order_by().values_list('pk', *key_columns):
+            yield (tuple(row[1:]), row[0])
+
+
+def _normalize(field, value):
+    if isinstance(field, GeometryField):
+        return _normalize_geometry(field, value)
+    if value is None or not hasattr(field, 'to_python'):
+        return value
+    return field.to_python(value)
+
+
+def _normalize_geometry(field, geom):
+    """
+    Get given geometry in the SRID of given field.
+
+    A geometry without a SRID is saved with the SRID of the field.
+    """
+    if geom is None:
+        return None
+    if geom.srid is None:
+        geom = geom.clone()
+        geom.srid = field.srid
+    elif geom.srid != field.srid:
+        geom = geom.transform(field.srid, clone=True)
+    return geom
+
+
+def _hash_geometry(geom):
+    if geom is None:
+        return None
+    return hashlib.md5(bytes(geom.wkb)).hexdigest()
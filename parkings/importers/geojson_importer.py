@@ -1,9 +1,9 @@
 import abc
-import json
 
-from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
+from django.contrib.gis.geos import MultiPolygon, Polygon
 
 from ..models import EnforcementDomain
+from ..utils.geojson import iter_features, make_geometry
 
 
 class GeoJsonImporter(metaclass=abc.ABCMeta):
@@ -12,9 +12,8 @@ class GeoJsonImporter(metaclass=abc.ABCMeta):
         self.default_domain_code = default_domain_code
 
     def read_and_parse(self, geojson_file_path):
-        with open(geojson_file_path, "rt") as file:
-            root = json.load(file)
-            for member in root['features']:
+        with open(geojson_file_path, "rt", encoding="utf-8") as file:
+            for member in iter_features(file):
                 yield self._parse_member(member)
 
     def _parse_member(self, member):
@@ -22,7 +21,7 @@ class GeoJsonImporter(metaclass=abc.ABCMeta):
         return dict(props, geom=self.get_polygons(member['geometry']))
 
     def get_polygons(self, geom):
-        result = GEOSGeometry(json.dumps(geom))
+        result = make_geometry(geom)
 
         if isinstance(result, Polygon):
             result = MultiPolygon(result)
@@ -34,5 +33,5 @@ class GeoJsonImporter(metaclass=abc.ABCMeta):
 
     def get_default_domain(self):
         if self.default_domain_code:
-            return EnforcementDomain.objects.get(code=self.default_domain_code)
+            return EnforcementDomain.get_by_code(self.default_domain_code)
         return EnforcementDomain.get_default_domain()
@@ -3,8 +3,11 @@ import time
 
 from django.db import transaction
 
+from parkings.geometry_changes import (
+    GeometryChangeTracker, reassign_parking_areas)
 from parkings.models import EnforcementDomain, ParkingArea
 
+from .bulk_upsert import UPDATED, BulkUpsert
 from .geojson_importer import GeoJsonImporter
 
 LOG = logging.getLogger(__name__)
@@ -17,6 +20,7 @@ class ParkingAreaImporter(GeoJsonImporter):
         self.refusals = 0
         self.overwrites = 0
         self.created = 0
+        self.unchanged = 0
         self.srid = None
 
     def import_areas(self):
@@ -24,7 +28,9 @@ class ParkingAreaImporter(GeoJsonImporter):
 
         area_dicts = self.read_and_parse(self.file_path)
 
-        self._save_areas(area_dicts)
+        with GeometryChangeTracker(ParkingArea) as tracker:
+            self._save_areas(area_dicts)
+        reassigned = reassign_parking_areas(tracker.changes)
 
         if self.refusals:
             LOG.warning(
@@ -34,6 +40,10 @@ class ParkingAreaImporter(GeoJsonImporter):
             LOG.info('Overwrote data for %s parking areas.', self.overwrites)
         if self.created:
             LOG.info('Created %s new parking areas.', self.created)
+        if self.unchanged:
+            LOG.info('%s parking areas were unchanged.', self.unchanged)
+        if reassigned:
+            LOG.info('Reassigned parking areas of %s parkings.', reassigned)
         if (self.created + self.refusals + self.overwrites) == 0:
             LOG.info('Nothing to do.')
 
@@ -47,45 +57,26 @@ class ParkingAreaImporter(GeoJsonImporter):
     @transaction.atomic
     def _save_areas(self, area_dicts):
         LOG.info('Saving areas.')
+        domains = {}
+        upsert = BulkUpsert(
+            ParkingArea, ['origin_id'], ['geom', 'capacity_estimate'])
         for area_dict in area_dicts:
-            try:
-                parking_area = ParkingArea.objects.get(
-                    origin_id=area_dict["id"],
-                )
-                self._update_parking_area(area_dict, parking_area)
-            except ParkingArea.DoesNotExist:
-                parking_area = self._create_parking_area(area_dict)
-
-            parking_area.save()
-
-    def _create_parking_area(self, area_dict):
-        domain = EnforcementDomain.objects.get(code=area_dict["domain"])
-
-        parking_area = ParkingArea(
-            origin_id=area_dict["id"],
-            domain=domain,
-            geom=area_dict["geom"],
-            capacity_estimate=area_dict["capacity_estimate"],
-            name=area_dict["name"]
-        )
-
-        self.created += 1
-
-        return parking_area
-
-    def _update_parking_area(self, area_dict, parking_area):
-        new_area = area_dict['geom']
-        new_capacity = area_dict['capacity_estimate']
-
-        capacity_differs = parking_area.capacity_estimate != new_capacity
-        area_differs = parking_area.geom.wkt != new_area.wkt
-
-        if area_differs or capacity_differs:
-            if self.overwrite:
-                parking_area.geom = new_area
-                parking_area.capacity_estimate = new_capacity
-                self.overwrites += 1
-            else:
+            domain_code = area_dict["domain"]
+            if domain_code not in domains:
+                domains[domain_code] = EnforcementDomain.get_by_code(
+                    domain_code)
+            values = {
+                "origin_id": area_dict["id"],
+                "domain_id": domains[domain_code].pk,
+                "geom": area_dict["geom"],
+                "capacity_estimate": area_dict["capacity_estimate"],
+                "name": area_dict["name"],
+            }
+            if not self.overwrite and upsert.diff(values) == UPDATED:
                 self.refusals += 1
-
-        return parking_area
+                continue
+            upsert.add(values)
+        result = upsert.save()
+        self.created += result.created
+        self.overwrites += result.updated
+        self.unchanged += result.unchanged
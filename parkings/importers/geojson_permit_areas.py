@@ -5,6 +5,7 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 
 from ..models import PermitArea
+from .bulk_upsert import BulkUpsert
 from .geojson_importer import GeoJsonImporter
 
 logger = logging.getLogger(__name__)
@@ -18,8 +19,10 @@ class PermitAreaImporter(GeoJsonImporter):
 
     def import_permit_areas(self, geojson_file_path, allowed_user=None):
         permit_area_dicts = self.read_and_parse(geojson_file_path)
-        count = self._save_permit_areas(permit_area_dicts, allowed_user)
-        logger.info('Created or updated {} permit areas'.format(count))
+        result = self._save_permit_areas(permit_area_dicts, allowed_user)
+        logger.info(
+            'Created {}, updated {} and left unchanged {} permit areas'
+            .format(*result))
 
     @transaction.atomic
     def _save_permit_areas(self, permit_areas_dict, allowed_user=None):
@@ -29,16 +32,12 @@ class PermitAreaImporter(GeoJsonImporter):
         else:
             user = None
         default_domain = self.get_default_domain()
-        count = 0
-        permit_area_ids = []
+        upsert = BulkUpsert(
+            PermitArea, ['domain_id', 'identifier'], ['name', 'geom'])
         for area_dict in permit_areas_dict:
             domain = area_dict.pop('domain', default_domain)
-            permit_area, _ = PermitArea.objects.update_or_create(
-                identifier=area_dict['identifier'],
-                domain=domain,
-                defaults=area_dict)
-            if user is not None:
-                permit_area.allowed_users.add(user)
-            permit_area_ids.append(permit_area.pk)
-            count += 1
-        return count
+            upsert.add(dict(area_dict, domain_id=domain.pk))
+        result = upsert.save()
+        if user is not None:
+            user.allowed_permit_areas.add(*upsert.get_pks().values())
+        return result
@@ -1,10 +1,16 @@
+import datetime
+import functools
+import multiprocessing
+
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from django.db.models import Count, Max, Min
 from django.utils import timezone
 
-from parkings.models import ArchivedParking, Parking
+from parkings.models import ArchivedParking, Parking, ParkingArchiveSlice
+from parkings.partitioning import archive_partitions
 
 
 class Command(BaseCommand):
@@ -27,11 +33,11 @@ class Command(BaseCommand):
             "--keep-months",
             "-m",
             type=int,
-            required=True,
             metavar="N",
             help=(
                 "Number of months to keep untouched. This will archive "
-                "all parkings that are older than N months."
+                "all parkings that are older than N months. Required "
+                "unless resuming."
             ),
         )
         parser.add_argument(
@@ -47,6 +53,42 @@ class Command(BaseCommand):
             default=10000,
             help="Batch size: How many parkings to process at a time",
         )
+        parser.add_argument(
+            "--workers",
+            "-w",
+            type=int,
+            metavar="N",
+            help=(
+                "Split the parkings to slices by their end time and "
+                "archive the slices with N parallel worker processes. "
+                "The progress is recorded so that the run can be resumed."
+            ),
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help=(
+                "Resume the previous run of --workers mode by archiving "
+                "its slices which were not completed."
+            ),
+        )
+        parser.add_argument(
+            "--partitions",
+            "-p",
+            action="store_true",
+            help=(
+                "First archive the whole monthly partitions of parkings "
+                "which all are older than the kept months by moving the "
+                "partitions to the archive, and then the rest row by row."
+            ),
+        )
+        parser.add_argument(
+            "--slice-days",
+            type=float,
+            default=7,
+            metavar="N",
+            help="Length of the end time range of a slice in days",
+        )
 
     def handle(
         self,
@@ -55,11 +97,36 @@ class Command(BaseCommand):
         batch_size=50000,
         dry_run=False,
         verbosity=1,
+        workers=None,
+        resume=False,
+        slice_days=7,
+        partitions=False,
         **kwargs
     ):
         self._init_timezone()
         self.verbosity = verbosity
 
+        if partitions:
+            if limit is not None or resume or keep_months is None:
+                raise CommandError(
+                    "--partitions requires --keep-months and cannot be"
+                    " used with --limit or --resume")
+            self._archive_partitions(keep_months, dry_run)
+
+        if workers is not None or resume:
+            if limit is not None or dry_run:
+                raise CommandError(
+                    "--limit and --dry-run cannot be used with"
+                    " --workers or --resume")
+            if not resume and keep_months is None:
+                raise CommandError("--keep-months is required")
+            return self._archive_in_slices(
+                keep_months, batch_size, workers or 1, resume,
+                datetime.timedelta(days=slice_days))
+
+        if keep_months is None:
+            raise CommandError("--keep-months is required")
+
         all_parkings = Parking.objects.order_by("time_end", "pk")
         end_time = timezone.now() - relativedelta(months=keep_months)
         to_archive = all_parkings.ends_before(end_time)
@@ -95,6 +162,62 @@ class Command(BaseCommand):
             )
         self._show_stats()
 
+    def _archive_partitions(self, keep_months, dry_run):
+        end_time = timezone.now() - relativedelta(months=keep_months)
+        archived = archive_partitions(end_time, dry_run=dry_run)
+        for (name, count) in archived:
+            self.stdout.write("{} partition {} of {} parkings".format(
+                "Would have archived" if dry_run else "Archived", name, count))
+
+    def _archive_in_slices(
+            self, keep_months, batch_size, workers, resume, slice_length):
+        if resume:
+            slices = ParkingArchiveSlice.objects.last_run().incomplete()
+            if not slices.exists():
+                self.stdout.write("Nothing to resume")
+                return
+        else:
+            end_time = timezone.now() - relativedelta(months=keep_months)
+            slices = ParkingArchiveSlice.objects.create_run(
+                end_time, slice_length)
+            if not slices.exists():
+                self.stdout.write("Nothing to archive")
+                return
+
+        slice_ids = list(slices.values_list("pk", flat=True))
+        self._info(
+            "{} {} slices with {} workers...\n",
+            "Resuming" if resume else "Archiving",
+            len(slice_ids), workers)
+        self._show_stats()
+
+        self.start_time = timezone.now()
+        archived = 0
+        try:
+            slice_results = _archive_slices(slice_ids, batch_size, workers)
+            for (slices_done, count) in enumerate(slice_results, 1):
+                archived += count
+                self._show_slice_progress(
+                    slices_done, len(slice_ids), archived)
+        except KeyboardInterrupt:
+            self._info("\n  -> Interrupted! Continue with --resume\n")
+        else:
+            self.stdout.write("Archived {} parkings".format(archived))
+        self._show_stats()
+
+    def _show_slice_progress(self, slices_done, slice_count, archived):
+        if self.verbosity < 1:
+            return
+
+        elapsed = timezone.now() - self.start_time
+        items_per_second = archived / (elapsed.total_seconds() or 1)
+        time_left = (slice_count - slices_done) * elapsed / slices_done
+        eta = _format_ts(timezone.now() + time_left)
+        self._info(
+            " Slice {:5d} / {:5d} {:11d} archived {:11.1f} items/s ETA: {}",
+            slices_done, slice_count, archived, items_per_second, eta)
+        self._info("\r" if time_left else "\n")
+
     def _init_timezone(self):
         admin_tz = getattr(settings, "ADMIN_TIME_ZONE", None)
         if admin_tz:
@@ -172,6 +295,40 @@ class Command(BaseCommand):
         self.stdout._out.flush()
 
 
+def _archive_slices(slice_ids, batch_size, workers):
+    """
+    Archive given slices with given number of worker processes.
+
+    :returns: Iterator of the archived counts of the slices in the
+              order they are completed
+    """
+    if workers <= 1:
+        for slice_id in slice_ids:
+            yield _archive_slice(slice_id, batch_size)
+        return
+
+    # Close the connections before forking, so that each worker opens
+    # its own database connection
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes=workers) as pool:
+        yield from pool.imap_unordered(
+            functools.partial(_archive_slice_in_worker, batch_size=batch_size),
+            slice_ids)
+
+
+def _archive_slice(slice_id, batch_size):
+    archive_slice = ParkingArchiveSlice.objects.get(pk=slice_id)
+    return archive_slice.archive(batch_size=batch_size)
+
+
+def _archive_slice_in_worker(slice_id, batch_size):
+    try:
+        return _archive_slice(slice_id, batch_size)
+    finally:
+        connections.close_all()
+
+
 def _format_ts(timestamp):
     if not timestamp:
         return "....-..-.. ..:..:.. ..:.."
@@ -0,0 +1,26 @@
+"""
+Create the monthly partitions of the parking table in advance.
+"""
+from django.core.management.base import BaseCommand
+
+from ...partitioning import create_month_partitions
+
+
+class Command(BaseCommand):
+    help = __doc__.strip().splitlines()[0]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months", "-m", type=int, default=3, metavar="N",
+            help=(
+                "Number of months to create the partitions for after "
+                "the current month (default: 3)"))
+
+    def handle(self, *args, **options):
+        verbosity = int(options['verbosity'])
+        created = create_month_partitions(options['months'])
+        if verbosity > 0:
+            for name in created:
+                self.stdout.write("Created partition {}".format(name))
+            if not created:
+                self.stdout.write("All partitions already exist")
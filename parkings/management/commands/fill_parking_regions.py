@@ -3,11 +3,14 @@
 Fill regions to Parking objects.
 """
 import datetime
+import functools
+import multiprocessing
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Q
 
-from ...models import Parking, Region
+from ...models import EnforcementDomain, Parking
 
 
 class Command(BaseCommand):
@@ -19,18 +22,32 @@ class Command(BaseCommand):
             help=(
                 "Block size target, "
                 "i.e. the number of parkings to process at time"))
+        parser.add_argument(
+            '--domain', type=str, metavar='CODE',
+            help="Fill only the parkings of the given enforcement domain")
+        parser.add_argument(
+            '--parking-areas', action='store_true',
+            help="Fill also the parking areas of the parkings")
+        parser.add_argument(
+            '--workers', '-w', type=int, default=1, metavar='N',
+            help="Process the blocks with N parallel worker processes")
 
     def handle(self, block_size_target, *args, **options):
         verbosity = int(options['verbosity'])
         silent = (verbosity == 0)
         show_info = (self._print_and_flush if not silent else self._null_print)
 
-        regions = Region.objects.all()
-        parkings = (
-            Parking.objects
-            .exclude(location=None)
-            .filter(region=None)
-            .order_by('created_at'))
+        domain_id = None
+        if options['domain']:
+            domain = EnforcementDomain.objects.filter(
+                code=options['domain']).first()
+            if not domain:
+                raise CommandError(
+                    "Unknown domain: {}".format(options['domain']))
+            domain_id = domain.id
+        parking_areas = options['parking_areas']
+
+        parkings = _get_parkings_to_fill(domain_id, parking_areas)
         count = parkings.count()
 
         if not count:
@@ -42,30 +59,83 @@ class Command(BaseCommand):
         end = parkings.last().created_at
         block_seconds = int((end - start).total_seconds() / block_count) + 1
         block_span = datetime.timedelta(seconds=block_seconds)
+        blocks = [
+            (block_num,
+             start + (block_num * block_span),
+             start + ((block_num + 1) * block_span))
+            for block_num in range(block_count)]
 
-        for block_num in range(block_count):
-            block_start = start + (block_num * block_span)
-            block_end = start + ((block_num + 1) * block_span)
-            block = parkings.filter(
-                created_at__gte=block_start,
-                created_at__lt=block_end)
-            block_size = block.count()
-
+        fill_block = functools.partial(
+            _fill_block, domain_id=domain_id, parking_areas=parking_areas)
+        results = _process_blocks(fill_block, blocks, options['workers'])
+        for (block_num, region_count, area_count) in results:
+            (_num, block_start, block_end) = blocks[block_num]
             show_info(
-                "Processing block {:5d}/{:5d}, size {:6d}, {}--{}".format(
-                    block_num + 1, block_count, block_size,
-                    block_start, block_end), ending='')
-
-            with transaction.atomic():
-                for (n, region) in enumerate(regions):
-                    if n % 10 == 0:
-                        show_info('.', ending='')
-                    in_region = block.filter(location__intersects=region.geom)
-                    in_region.update(region=region)
-                show_info('', ending='\n')  # Print end of line
+                "Processed block {:5d}/{:5d}, {}--{}: {} regions{}".format(
+                    block_num + 1, block_count, block_start, block_end,
+                    region_count,
+                    ", {} parking areas".format(area_count)
+                    if parking_areas else ""))
 
     def _print_and_flush(self, *args, ending='\n'):
         self.stdout.write(*args, ending=ending)
 
     def _null_print(self, *args, ending='\n'):
         pass
+
+
+def _get_parkings_to_fill(domain_id, parking_areas):
+    parkings = Parking.objects.exclude(location=None)
+    if domain_id is not None:
+        parkings = parkings.filter(domain=domain_id)
+    missing = Q(region=None)
+    if parking_areas:
+        missing |= Q(parking_area=None)
+    return parkings.filter(missing).order_by('created_at')
+
+
+def _fill_block(block, domain_id, parking_areas):
+    """
+    Fill the regions and parking areas of the parkings of given block.
+
+    :returns: Tuple (block_num, filled region count, filled area count)
+    """
+    (block_num, block_start, block_end) = block
+    parkings = _get_parkings_to_fill(domain_id, parking_areas).filter(
+        created_at__gte=block_start,
+        created_at__lt=block_end)
+    area_count = 0
+    with transaction.atomic():
+        region_count = parkings.filter(region=None).assign_regions(
+            update_occupancy=True)
+        if parking_areas:
+            area_count = parkings.filter(
+                parking_area=None).assign_parking_areas()
+    return (block_num, region_count, area_count)
+
+
+def _fill_block_in_worker(fill_block, block):
+    try:
+        return fill_block(block)
+    finally:
+        connections.close_all()
+
+
+def _process_blocks(fill_block, blocks, workers):
+    """
+    Process the blocks with given number of worker processes.
+
+    :returns: Iterator of the results in the order they are completed
+    """
+    if workers <= 1:
+        for block in blocks:
+            yield fill_block(block)
+        return
+
+    # Close the connections before forking, so that each worker opens
+    # its own database connection
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes=workers) as pool:
+        yield from pool.imap_unordered(
+            functools.partial(_fill_block_in_worker, fill_block), blocks)
@@ -40,7 +40,7 @@ class Command(BaseCommand):
         model = django_apps.get_model(model_full_name)
         geometry_fields = [
             field for field in model._meta.get_fields()
-            if isinstance(field, MultiPolygonField)]
+            if isinstance(field, MultiPolygonField) and field.editable]
 
         if len(geometry_fields) != 1:
             sys.exit("Model should have exactly one MultiPolygon field")
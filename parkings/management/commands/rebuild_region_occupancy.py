@@ -0,0 +1,17 @@
+"""
+Rebuild the region occupancy from parkings and archived parkings.
+"""
+from django.core.management.base import BaseCommand
+
+from ...models import RegionOccupancy
+
+
+class Command(BaseCommand):
+    help = __doc__.strip().splitlines()[0]
+
+    def handle(self, *args, **options):
+        verbosity = int(options['verbosity'])
+        row_count = RegionOccupancy.objects.rebuild()
+        if verbosity > 0:
+            self.stdout.write(
+                "Created {} region occupancy rows".format(row_count))
@@ -1,9 +1,12 @@
+import multiprocessing
+
 from dateutil.relativedelta import relativedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from parkings.models import ArchivedParking
-from parkings.utils.sanitizing import reset_sanitizing_session
+from parkings.utils.sanitizing import (
+    get_sanitizing_secret, reset_sanitizing_session)
 
 
 class Command(BaseCommand):
@@ -12,10 +15,17 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("months", type=int, nargs='?')
         parser.add_argument('--confirm', action='store_true',)
+        parser.add_argument(
+            '--batch-size', '-b', type=int, default=10000, metavar='N',
+            help="Number of parkings to sanitize with a single query")
+        parser.add_argument(
+            '--workers', '-w', type=int, metavar='N',
+            help="Compute the sanitized values with N worker processes")
 
     def handle(self, *args, **options):
         months = options["months"]
         confirm = options["confirm"]
+        self.verbosity = options["verbosity"]
 
         parkings_to_sanitize = ArchivedParking.objects.filter(sanitized_at__isnull=True)
 
@@ -23,14 +33,36 @@ class Command(BaseCommand):
             end_time = timezone.now() - relativedelta(months=months)
             parkings_to_sanitize = parkings_to_sanitize.ends_before(end_time)
 
+        self.count = parkings_to_sanitize.count()
         if confirm:
-            choice = input("Do you want to sanitize %s parkings? [Yes/no] " % parkings_to_sanitize.count()).lower()
+            choice = input("Do you want to sanitize %s parkings? [Yes/no] " % self.count).lower()
             if choice != "yes":
                 return
 
         reset_sanitizing_session()  # Make sure the secret is new when starting the sanitizing
 
-        for parking in parkings_to_sanitize:
-            parking.sanitize()
+        workers = options["workers"]
+        if workers and workers > 1:
+            # The workers use the same secret to get the same results
+            context = multiprocessing.get_context("fork")
+            with context.Pool(
+                    processes=workers,
+                    initializer=reset_sanitizing_session,
+                    initargs=(get_sanitizing_secret(),)) as pool:
+                sanitized = self._sanitize(
+                    parkings_to_sanitize, options["batch_size"], pool.map)
+        else:
+            sanitized = self._sanitize(
+                parkings_to_sanitize, options["batch_size"], map)
+
+        self.stdout.write("Sanitized %s parkings." % sanitized)
+
+    def _sanitize(self, parkings, batch_size, map_func):
+        return ArchivedParking.sanitize_in_bulk(
+            parkings, batch_size=batch_size, map_func=map_func,
+            post_batch_callback=self._show_progress)
 
-        self.stdout.write("Sanitized %s parkings." % parkings_to_sanitize.count())
+    def _show_progress(self, batch_count, total):
+        if self.verbosity < 1 or total >= self.count:
+            return
+        self.stdout.write("  ...sanitized %s / %s parkings" % (total, self.count))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:59
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Create the index concurrently to avoid locking the parking table
+    atomic = False
+
+    dependencies = [
+        ('parkings', '0048_remove_permitarea_permitted_user'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='parking',
+            index=django.contrib.postgres.indexes.GistIndex(models.Case(models.When(then=django.db.models.functions.comparison.Cast(models.Value('empty'), django.contrib.postgres.fields.ranges.DateTimeRangeField()), time_end__lt=models.F('time_start')), default=models.Func(models.F('time_start'), models.F('time_end'), models.Value('[]'), function='TSTZRANGE', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), name='parking_valid_time_range_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:00
+
+import django.contrib.postgres.operations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Create the index concurrently to avoid locking the parking table
+    atomic = False
+
+    dependencies = [
+        ('parkings', '0049_parking_valid_time_range_idx'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.AddIndexConcurrently(
+            model_name='parking',
+            index=models.Index(fields=['domain', 'normalized_reg_num', 'time_end'], include=('id', 'zone', 'time_start'), name='parking_domain_reg_num_end_idx'),
+        ),
+    ]
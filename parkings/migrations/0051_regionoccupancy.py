@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkings', '0050_parking_domain_reg_num_end_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionOccupancy',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('time', models.DateTimeField(verbose_name='time')),
+                ('parking_count', models.IntegerField(verbose_name='parking count')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancies', to='parkings.region', verbose_name='region')),
+            ],
+            options={
+                'verbose_name': 'region occupancy',
+                'verbose_name_plural': 'region occupancies',
+                'constraints': [models.UniqueConstraint(fields=('region', 'time'), name='unique_region_occupancy_time')],
+            },
+        ),
+    ]
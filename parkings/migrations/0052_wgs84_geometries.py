@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:06
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+# Fill the WGS84 geometries of the existing rows like
+# WGS84GeometryMixin.update_wgs84_geometries does
+FILL_WGS84_GEOMETRIES_SQL = """
+UPDATE {table} SET
+    geom_wgs84 = ST_Transform(geom, 4326),
+    geom_wgs84_medium = ST_Transform(ST_Multi(
+        ST_SimplifyPreserveTopology(geom, 1.0)), 4326),
+    geom_wgs84_low = ST_Transform(ST_Multi(
+        ST_SimplifyPreserveTopology(geom, 5.0)), 4326)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkings', '0051_regionoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingarea',
+            name='geom_wgs84',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, editable=False, null=True, srid=4326, verbose_name='WGS84 geometry'),
+        ),
+        migrations.AddField(
+            model_name='parkingarea',
+            name='geom_wgs84_low',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, editable=False, null=True, srid=4326, verbose_name='WGS84 geometry (low detail)'),
+        ),
+        migrations.AddField(
+            model_name='parkingarea',
+            name='geom_wgs84_medium',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, editable=False, null=True, srid=4326, verbose_name='WGS84 geometry (medium detail)'),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='geom_wgs84',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, editable=False, null=True, srid=4326, verbose_name='WGS84 geometry'),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='geom_wgs84_low',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, editable=False, null=True, srid=4326, verbose_name='WGS84 geometry (low detail)'),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='geom_wgs84_medium',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, editable=False, null=True, srid=4326, verbose_name='WGS84 geometry (medium detail)'),
+        ),
+        migrations.RunSQL(
+            FILL_WGS84_GEOMETRIES_SQL.format(table='parkings_parkingarea'),
+            migrations.RunSQL.noop),
+        migrations.RunSQL(
+            FILL_WGS84_GEOMETRIES_SQL.format(table='parkings_region'),
+            migrations.RunSQL.noop),
+    ]
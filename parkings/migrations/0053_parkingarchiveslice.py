@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkings', '0052_wgs84_geometries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParkingArchiveSlice',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('run_started_at', models.DateTimeField(db_index=True, verbose_name='run started at')),
+                ('ends_before', models.DateTimeField(verbose_name='ends before')),
+                ('time_end_min', models.DateTimeField(verbose_name='minimum end time')),
+                ('time_end_max', models.DateTimeField(help_text='Exclusive', verbose_name='maximum end time')),
+                ('archived_count', models.IntegerField(blank=True, null=True, verbose_name='archived count')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='time completed')),
+            ],
+            options={
+                'verbose_name': 'parking archive slice',
+                'verbose_name_plural': 'parking archive slices',
+                'ordering': ('run_started_at', 'time_end_min'),
+            },
+        ),
+    ]
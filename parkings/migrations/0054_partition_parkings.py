@@ -0,0 +1,163 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Converts the parking and archived parking tables to tables
+# partitioned by range of time_start.  The existing table is attached
+# as a "legacy" partition of all the rows starting before the next
+# month, so that its rows need not be copied, and an empty default
+# partition is created for the rows outside of the other partitions.
+# The monthly partitions are created by the create_parking_partitions
+# management command.
+#
+# The primary key of a partitioned table must include the partition
+# key, so the primary key is (id, time_start) in the database.
+PARTITION_TABLES_SQL = """
+DO $$
+DECLARE
+    tbl text;
+    legacy text;
+    bound timestamptz := date_trunc('month', now()) + interval '1 month';
+    index_defs text[];
+    index_def text;
+    idx record;
+    con record;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['parkings_parking', 'parkings_archivedparking']
+    LOOP
+        legacy := tbl || '_legacy';
+
+        SELECT array_agg(pg_get_indexdef(indexrelid)) INTO index_defs
+        FROM pg_index WHERE indrelid = tbl::regclass AND NOT indisprimary;
+
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, legacy);
+        EXECUTE format(
+            'ALTER TABLE %I RENAME CONSTRAINT %I TO %I',
+            legacy, tbl || '_pkey', legacy || '_pkey');
+        FOR idx IN
+            SELECT indexrelid::regclass::text AS name FROM pg_index
+            WHERE indrelid = legacy::regclass AND NOT indisprimary
+        LOOP
+            EXECUTE format(
+                'ALTER INDEX %I RENAME TO %I',
+                idx.name, left(idx.name, 56) || '_legacy');
+        END LOOP;
+
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+            ' PARTITION BY RANGE (time_start)', tbl, legacy);
+        EXECUTE format(
+            'ALTER TABLE %I ADD CONSTRAINT %I PRIMARY KEY (id, time_start)',
+            tbl, tbl || '_pkey');
+        FOR con IN
+            SELECT conname, pg_get_constraintdef(oid) AS def
+            FROM pg_constraint
+            WHERE conrelid = legacy::regclass AND contype = 'f'
+        LOOP
+            EXECUTE format(
+                'ALTER TABLE %I ADD CONSTRAINT %I %s', tbl, con.conname, con.def);
+        END LOOP;
+
+        -- With a valid check constraint the attaching doesn't scan the table
+        EXECUTE format(
+            'ALTER TABLE %I ADD CONSTRAINT %I'
+            ' CHECK (time_start IS NOT NULL AND time_start < %L) NOT VALID',
+            legacy, legacy || '_bound', bound);
+        EXECUTE format(
+            'ALTER TABLE %I VALIDATE CONSTRAINT %I', legacy, legacy || '_bound');
+        EXECUTE format(
+            'ALTER TABLE %I ATTACH PARTITION %I'
+            ' FOR VALUES FROM (MINVALUE) TO (%L)', tbl, legacy, bound);
+        EXECUTE format(
+            'ALTER TABLE %I DROP CONSTRAINT %I', legacy, legacy || '_bound');
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF %I DEFAULT', tbl || '_default', tbl);
+
+        -- Equivalent indexes of the legacy partition are attached to
+        -- the indexes of the partitioned table rather than rebuilt
+        FOREACH index_def IN ARRAY coalesce(index_defs, ARRAY[]::text[])
+        LOOP
+            EXECUTE index_def;
+        END LOOP;
+    END LOOP;
+END
+$$;
+"""
+
+# Converts the partitioned tables back to plain tables with the id as
+# the primary key.  The rows of all partitions are copied to the new
+# tables.
+UNPARTITION_TABLES_SQL = """
+DO $$
+DECLARE
+    tbl text;
+    old text;
+    index_defs text[];
+    index_def text;
+    idx record;
+    con record;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['parkings_parking', 'parkings_archivedparking']
+    LOOP
+        old := tbl || '_partitioned';
+
+        SELECT array_agg(pg_get_indexdef(indexrelid)) INTO index_defs
+        FROM pg_index WHERE indrelid = tbl::regclass AND NOT indisprimary;
+
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, old);
+        EXECUTE format(
+            'ALTER TABLE %I RENAME CONSTRAINT %I TO %I',
+            old, tbl || '_pkey', old || '_pkey');
+        FOR idx IN
+            SELECT indexrelid::regclass::text AS name FROM pg_index
+            WHERE indrelid = old::regclass AND NOT indisprimary
+        LOOP
+            EXECUTE format(
+                'ALTER INDEX %I RENAME TO %I',
+                idx.name, left(idx.name, 51) || '_partitioned');
+        END LOOP;
+
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+            tbl, old);
+        EXECUTE format('INSERT INTO %I SELECT * FROM %I', tbl, old);
+        EXECUTE format(
+            'ALTER TABLE %I ADD CONSTRAINT %I PRIMARY KEY (id)',
+            tbl, tbl || '_pkey');
+        FOR con IN
+            SELECT conname, pg_get_constraintdef(oid) AS def
+            FROM pg_constraint
+            WHERE conrelid = old::regclass AND contype = 'f'
+        LOOP
+            EXECUTE format(
+                'ALTER TABLE %I ADD CONSTRAINT %I %s', tbl, con.conname, con.def);
+        END LOOP;
+
+        -- Drops the partitions too
+        EXECUTE format('DROP TABLE %I', old);
+
+        FOREACH index_def IN ARRAY coalesce(index_defs, ARRAY[]::text[])
+        LOOP
+            EXECUTE replace(index_def, ' ON ONLY ', ' ON ');
+        END LOOP;
+    END LOOP;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkings', '0053_parkingarchiveslice'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='parkingcheck',
+            name='found_parking',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='parkings.parking', verbose_name='found parking'),
+        ),
+        migrations.RunSQL(PARTITION_TABLES_SQL, UNPARTITION_TABLES_SQL),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkings', '0054_partition_parkings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='parkingcheck',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='time created'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkings', '0055_parkingcheck_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedparking',
+            name='region',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='parkings.region', verbose_name='region'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:08
+
+import django.contrib.gis.db.models.fields
+import django.contrib.gis.db.models.functions
+import parkings.models.mixins
+from django.db import migrations, models
+
+
+# Generated columns can't be made of existing columns, so the copies are
+# removed and added back as generated columns, which PostgreSQL fills
+# from the geom column of the existing rows.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parkings', '0056_archivedparking_region_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='parkingarea',
+            name='geom_wgs84',
+        ),
+        migrations.RemoveField(
+            model_name='parkingarea',
+            name='geom_wgs84_low',
+        ),
+        migrations.RemoveField(
+            model_name='parkingarea',
+            name='geom_wgs84_medium',
+        ),
+        migrations.RemoveField(
+            model_name='region',
+            name='geom_wgs84',
+        ),
+        migrations.RemoveField(
+            model_name='region',
+            name='geom_wgs84_low',
+        ),
+        migrations.RemoveField(
+            model_name='region',
+            name='geom_wgs84_medium',
+        ),
+        migrations.AddField(
+            model_name='parkingarea',
+            name='geom_wgs84',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(models.F('geom'), 4326), null=True, output_field=django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326), verbose_name='WGS84 geometry'),
+        ),
+        migrations.AddField(
+            model_name='parkingarea',
+            name='geom_wgs84_low',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(parkings.models.mixins.Multi(parkings.models.mixins.SimplifyPreserveTopology(models.F('geom'), 5.0)), 4326), null=True, output_field=django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326), verbose_name='WGS84 geometry (low detail)'),
+        ),
+        migrations.AddField(
+            model_name='parkingarea',
+            name='geom_wgs84_medium',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(parkings.models.mixins.Multi(parkings.models.mixins.SimplifyPreserveTopology(models.F('geom'), 1.0)), 4326), null=True, output_field=django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326), verbose_name='WGS84 geometry (medium detail)'),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='geom_wgs84',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(models.F('geom'), 4326), null=True, output_field=django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326), verbose_name='WGS84 geometry'),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='geom_wgs84_low',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(parkings.models.mixins.Multi(parkings.models.mixins.SimplifyPreserveTopology(models.F('geom'), 5.0)), 4326), null=True, output_field=django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326), verbose_name='WGS84 geometry (low detail)'),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='geom_wgs84_medium',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.gis.db.models.functions.Transform(parkings.models.mixins.Multi(parkings.models.mixins.SimplifyPreserveTopology(models.F('geom'), 1.0)), 4326), null=True, output_field=django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326), verbose_name='WGS84 geometry (medium detail)'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from .enforcement_domain import EnforcementDomain, Enforcer
 from .monitor import Monitor
 from .operator import Operator
 from .parking import ArchivedParking, Parking, ParkingQuerySet
+from .parking_archive_slice import ParkingArchiveSlice
 from .parking_area import ParkingArea
 from .parking_check import ParkingCheck
 from .parking_terminal import ParkingTerminal
@@ -9,6 +10,7 @@ from .permit import (
     Permit, PermitArea, PermitAreaItem, PermitLookupItem, PermitSeries,
     PermitSubjectItem)
 from .region import Region
+from .region_occupancy import RegionOccupancy
 from .zone import PaymentZone
 
 __all__ = [
@@ -18,6 +20,7 @@ __all__ = [
     'Monitor',
     'Operator',
     'Parking',
+    'ParkingArchiveSlice',
     'ParkingArea',
     'ParkingCheck',
     'ParkingTerminal',
@@ -30,4 +33,5 @@ __all__ = [
     'PermitSeries',
     'PermitSubjectItem',
     'Region',
+    'RegionOccupancy',
 ]
@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.contrib.gis.db import models as gis_models
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
 from .constants import GK25FIN_SRID
@@ -23,15 +25,58 @@ class EnforcementDomain(TimestampedModelMixin):
 
     @classmethod
     def get_default_domain(cls):
+        """
+        Get the default domain, creating it if it doesn't exist.
+
+        The domain is cached in the process, see `get_by_code`.
+        """
         (name, code) = settings.DEFAULT_ENFORCEMENT_DOMAIN
-        return cls.objects.get_or_create(
-            code=code, defaults={"name": name})[0]
+        domain = _domains_by_code.get(code)
+        if domain is None:
+            domain = cls.objects.get_or_create(
+                code=code, defaults={"name": name})[0]
+            _add_to_cache(domain)
+        return domain
+
+    @classmethod
+    def get_by_code(cls, code):
+        """
+        Get domain by its code.
+
+        The found domains are cached in the process until a domain is
+        saved or deleted.  Note that the cache of other processes is not
+        invalidated, but since the domains are practically never
+        changed, that is accepted.
+
+        :raises EnforcementDomain.DoesNotExist: if there is no such domain
+        """
+        domain = _domains_by_code.get(code)
+        if domain is None:
+            domain = cls.objects.get(code=code)
+            _add_to_cache(domain)
+        return domain
 
     @classmethod
     def get_default_domain_code(cls):
         return settings.DEFAULT_ENFORCEMENT_DOMAIN[1]
 
 
+_domains_by_code = {}
+
+
+def _add_to_cache(domain):
+    # Cache only committed domains, so that a domain which was created
+    # in a rolled back transaction is never returned from the cache
+    transaction.on_commit(lambda: _domains_by_code.setdefault(domain.code, domain))
+
+
+@receiver(post_save, sender=EnforcementDomain)
+@receiver(post_delete, sender=EnforcementDomain)
+@receiver(post_migrate)
+def _clear_cache(**kwargs):
+    _domains_by_code.clear()
+
+
 class Enforcer(TimestampedModelMixin, UUIDPrimaryKeyMixin):
     name = models.CharField(verbose_name=_("name"), max_length=80)
     user = models.OneToOneField(
@@ -1,8 +1,19 @@
 import uuid
 
 from django.contrib.gis.db import models
+from django.contrib.gis.db.models.functions import GeomOutputGeoFunc, Transform
+from django.contrib.gis.geos import MultiPolygon
 from django.utils.translation import gettext_lazy as _
 
+from .constants import WGS84_SRID
+
+# Simplification tolerances of the geometry detail levels, in the units
+# of the source geometry (i.e. in meters)
+GEOMETRY_DETAIL_TOLERANCES = {
+    'medium': 1.0,
+    'low': 5.0,
+}
+
 
 class AnonymizableRegNumQuerySet(models.QuerySet):
     def anonymize(self):
@@ -25,3 +36,105 @@ class UUIDPrimaryKeyMixin(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Multi(GeomOutputGeoFunc):
+    function = 'ST_Multi'
+
+
+class SimplifyPreserveTopology(GeomOutputGeoFunc):
+    function = 'ST_SimplifyPreserveTopology'
+
+    def __init__(self, expression, tolerance, **extra):
+        super().__init__(
+            expression, self._handle_param(tolerance, 'tolerance', float),
+            **extra)
+
+
+def _wgs84_geometry_field(tolerance=None, **kwargs):
+    geom = models.F('geom')
+    if tolerance:
+        geom = Multi(SimplifyPreserveTopology(geom, tolerance))
+    return models.GeneratedField(
+        expression=Transform(geom, WGS84_SRID),
+        output_field=models.MultiPolygonField(srid=WGS84_SRID),
+        db_persist=True, null=True, **kwargs)
+
+
+class WGS84GeometryMixin(models.Model):
+    """
+    Mixin for models with stored WGS84 copies of their geom field.
+
+    The copies are generated columns computed by the database from the
+    geom column: a full resolution copy and a simplified copy for each
+    level in GEOMETRY_DETAIL_TOLERANCES.  This way the APIs can serve
+    WGS84 geometries without transforming them on every request, and
+    the copies can't get out of sync with the geometry, not even when
+    it is updated with a queryset update or with raw SQL.
+    """
+    geom_wgs84 = _wgs84_geometry_field(
+        verbose_name=_("WGS84 geometry"))
+    geom_wgs84_medium = _wgs84_geometry_field(
+        GEOMETRY_DETAIL_TOLERANCES['medium'],
+        verbose_name=_("WGS84 geometry (medium detail)"))
+    geom_wgs84_low = _wgs84_geometry_field(
+        GEOMETRY_DETAIL_TOLERANCES['low'],
+        verbose_name=_("WGS84 geometry (low detail)"))
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_wgs84_field_name(cls, detail=None):
+        """
+        Get name of the WGS84 geometry field of given detail level.
+
+        :param detail: Key of GEOMETRY_DETAIL_TOLERANCES or None for
+                       the full resolution geometry
+        """
+        return 'geom_wgs84' + ('_' + detail if detail else '')
+
+    @classmethod
+    def get_wgs84_field_names(cls):
+        return [cls.get_wgs84_field_name()] + [
+            cls.get_wgs84_field_name(x) for x in GEOMETRY_DETAIL_TOLERANCES]
+
+    def get_wgs84_geometry(self, detail=None):
+        """
+        Get the geometry in WGS84 with given detail level.
+
+        Uses the stored copy, if it has been loaded from the database,
+        and otherwise transforms the geometry.  The stored copy is the
+        one computed from the saved geometry, so changes of the geom
+        attribute are not reflected in it until the object is saved.
+        """
+        stored = self.__dict__.get(self.get_wgs84_field_name(detail))
+        if stored is not None:
+            return stored
+        return self._make_wgs84_geometry(
+            GEOMETRY_DETAIL_TOLERANCES.get(detail) if detail else None)
+
+    def _make_wgs84_geometry(self, tolerance=None):
+        geom = self.geom
+        if geom is None:
+            return None
+        if geom.srid is None:  # Saved with the SRID of the field
+            geom = geom.clone()
+            geom.srid = self._meta.get_field('geom').srid
+        if tolerance:
+            simplified = geom.simplify(tolerance, preserve_topology=True)
+            if simplified.geom_type == 'Polygon':
+                simplified = MultiPolygon(simplified, srid=geom.srid)
+            if simplified.geom_type == 'MultiPolygon' and not simplified.empty:
+                geom = simplified
+        return geom.transform(WGS84_SRID, clone=True)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding and (update_fields is None or 'geom' in update_fields):
+            # The copies are returned by inserts but not by updates, so
+            # forget the old ones to load them again when needed
+            for name in self.get_wgs84_field_names():
+                self.__dict__.pop(name, None)
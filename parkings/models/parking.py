@@ -1,6 +1,10 @@
 from django.contrib.gis.db import models
 from django.contrib.gis.db.models.functions import Distance
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.contrib.postgres.indexes import GistIndex
+from django.core.exceptions import EmptyResultSet
 from django.db import connections, router, transaction
+from django.db.models.functions import Cast
 from django.utils import timezone
 from django.utils.timezone import localtime, now
 from django.utils.translation import gettext_lazy as _
@@ -17,19 +21,45 @@ from .enforcement_domain import EnforcementDomain
 from .mixins import AnonymizableRegNumQuerySet
 from .parking_terminal import ParkingTerminal
 from .region import Region
+from .region_occupancy import (
+    RegionOccupancy, get_occupancy_change, is_occupancy_maintained)
 
 Q = models.Q
 
 
+def get_valid_time_range():
+    """
+    Get expression for the time range when a parking is valid.
+
+    The range is [time_start, time_end] or unbounded from above if
+    time_end is NULL.  If the parking ends before it starts, the range
+    is empty.  There is a GiST index on this expression, so that the
+    parkings valid at given time can be found with a single index scan
+    rather than by combining the time_start and time_end indexes.
+    """
+    return models.Case(
+        models.When(
+            time_end__lt=models.F('time_start'),
+            then=Cast(models.Value('empty'), DateTimeRangeField())),
+        default=models.Func(
+            models.F('time_start'), models.F('time_end'), models.Value('[]'),
+            function='TSTZRANGE', output_field=DateTimeRangeField()),
+        output_field=DateTimeRangeField())
+
+
 class ParkingQuerySet(AnonymizableRegNumQuerySet, models.QuerySet):
     def valid_at(self, time):
         """
         Filter to parkings which are valid at given time.
 
+        This is the same as ``self.starts_before(time).ends_after(time)``
+        but uses the valid time range index.
+
         :type time: datetime.datetime
         :rtype: ParkingQuerySet
         """
-        return self.starts_before(time).ends_after(time)
+        return self.alias(valid_time_range=get_valid_time_range()).filter(
+            valid_time_range__contains=time)
 
     def starts_before(self, time):
         return self.filter(time_start__lte=time)
@@ -81,6 +111,75 @@ class ParkingQuerySet(AnonymizableRegNumQuerySet, models.QuerySet):
         normalized_reg_num = Parking.normalize_reg_num(registration_number)
         return self.filter(normalized_reg_num=normalized_reg_num)
 
+    def assign_regions(self, update_occupancy=False):
+        """
+        Set the regions of the parkings by their locations.
+
+        The region of each parking is set to the same region as
+        Parking.get_region would return, with a single UPDATE query.
+        Only the parkings whose region changes are written.  The region
+        occupancy is updated only if update_occupancy is set and the
+        occupancy is maintained, so otherwise it should be rebuilt
+        afterwards if it is used.
+
+        :returns: Number of updated parkings
+        """
+        region_srid = Region._meta.get_field('geom').srid
+        if not (update_occupancy and is_occupancy_maintained()):
+            return self._update_by_location(
+                _ASSIGN_REGIONS_SQL, 'region_id', Region, [region_srid])
+
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            updated = self._update_by_location(
+                _ASSIGN_REGIONS_SQL + _RETURNING_OCCUPANCY_SQL,
+                'region_id', Region, [region_srid], fetch=True)
+            changes = []
+            for (old_region, new_region, time_start, time_end) in updated:
+                old_occupancy = get_occupancy_change(
+                    old_region, time_start, time_end)
+                new_occupancy = get_occupancy_change(
+                    new_region, time_start, time_end)
+                if old_occupancy:
+                    changes.append(old_occupancy + (-1,))
+                if new_occupancy:
+                    changes.append(new_occupancy + (1,))
+            RegionOccupancy.objects.apply_changes(changes)
+        return len(updated)
+
+    def assign_parking_areas(self, max_distance=50):
+        """
+        Set the parking areas of the parkings by their locations.
+
+        The parking area of each parking is set to the same area as
+        Parking.get_closest_area would return, with a single UPDATE
+        query.  Only the parkings whose area changes are written.
+
+        :returns: Number of updated parkings
+        """
+        area_srid = ParkingArea._meta.get_field('geom').srid
+        return self._update_by_location(
+            _ASSIGN_PARKING_AREAS_SQL, 'parking_area_id', ParkingArea,
+            [area_srid, max_distance, area_srid])
+
+    def _update_by_location(
+            self, sql_template, column, target_model, params, fetch=False):
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        ids_queryset = self.order_by().values('pk')
+        try:
+            (ids_sql, ids_params) = ids_queryset.query.sql_with_params()
+        except EmptyResultSet:  # E.g. for an empty queryset from none()
+            return [] if fetch else 0
+        sql = sql_template.format(
+            table=quote(self.model._meta.db_table),
+            target_table=quote(target_model._meta.db_table),
+            column=quote(column),
+            parkings=ids_sql)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + list(ids_params))
+            return cursor.fetchall() if fetch else cursor.rowcount
+
 
 class AbstractParking(TimestampedModelMixin, UUIDPrimaryKeyMixin):
     VALID = 'valid'
@@ -150,12 +249,24 @@ class Parking(AbstractParking):
         verbose_name = _("parking")
         verbose_name_plural = _("parkings")
         default_related_name = "parkings"
+        indexes = [
+            GistIndex(
+                get_valid_time_range(), name="parking_valid_time_range_idx"),
+            # Covers the registration number lookups of check_parking
+            # and the enforcement API with index-only scans
+            models.Index(
+                fields=["domain", "normalized_reg_num", "time_end"],
+                include=["id", "zone", "time_start"],
+                name="parking_domain_reg_num_end_idx"),
+        ]
 
     def archive(self):
         archived_parking = self.make_archived_parking()
         with transaction.atomic():
             archived_parking.save()
-            self.delete()
+            # Archived parkings are still counted to the region
+            # occupancy, so bypass the occupancy update of delete
+            super().delete()
             return archived_parking
 
     def make_archived_parking(self):
@@ -215,7 +326,144 @@ class Parking(AbstractParking):
             self.normalized_reg_num = (
                 self.normalize_reg_num(self.registration_number))
 
-        super().save(update_fields=update_fields, *args, **kwargs)
+        if update_fields is not None and not (
+                {'region', 'time_start', 'time_end'} & set(update_fields)):
+            super().save(update_fields=update_fields, *args, **kwargs)
+            return
+
+        if not is_occupancy_maintained():
+            super().save(update_fields=update_fields, *args, **kwargs)
+            self.__dict__.pop('_saved_occupancy', None)
+            return
+
+        old_occupancy = self._get_saved_occupancy()
+        new_occupancy = get_occupancy_change(
+            self.region_id, self.time_start, self.time_end)
+        with transaction.atomic():
+            super().save(update_fields=update_fields, *args, **kwargs)
+            if new_occupancy != old_occupancy:
+                self._update_occupancy(old_occupancy, new_occupancy)
+        self._saved_occupancy = new_occupancy
+
+    def delete(self, *args, **kwargs):
+        if not is_occupancy_maintained():
+            return super().delete(*args, **kwargs)
+        old_occupancy = self._get_saved_occupancy()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._update_occupancy(old_occupancy, None)
+        return result
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__
+        if all(x in loaded for x in ['region_id', 'time_start', 'time_end']):
+            instance._saved_occupancy = get_occupancy_change(
+                instance.region_id, instance.time_start, instance.time_end)
+        return instance
+
+    def _get_saved_occupancy(self):
+        if self._state.adding:
+            return None
+        if not hasattr(self, '_saved_occupancy'):
+            saved = type(self).objects.filter(pk=self.pk).values_list(
+                'region_id', 'time_start', 'time_end').first()
+            return get_occupancy_change(*saved) if saved else None
+        return self._saved_occupancy
+
+    @staticmethod
+    def _update_occupancy(old_occupancy, new_occupancy):
+        changes = []
+        if old_occupancy:
+            changes.append(old_occupancy + (-1,))
+        if new_occupancy:
+            changes.append(new_occupancy + (1,))
+        RegionOccupancy.objects.apply_changes(changes)
+
+    @classmethod
+    def create_in_bulk(cls, parkings):
+        """
+        Create given unsaved parkings in bulk.
+
+        Fills in the same fields as `save` does, but the terminals,
+        regions and parking areas of all parkings are resolved with one
+        query each and the parkings are inserted with a single bulk
+        insert.  The region occupancy, if maintained, is updated for all
+        of the parkings at once too.
+
+        :type parkings: list[Parking]
+        :returns: The created parkings
+        """
+        for parking in parkings:
+            if not parking.domain_id:
+                parking.domain = EnforcementDomain.get_default_domain()
+            parking.normalized_reg_num = (
+                cls.normalize_reg_num(parking.registration_number))
+        cls._set_terminals_in_bulk(parkings)
+        cls._set_regions_and_areas_in_bulk(parkings)
+        occupancy_changes = []
+        for parking in parkings:
+            parking._saved_occupancy = get_occupancy_change(
+                parking.region_id, parking.time_start, parking.time_end)
+            if parking._saved_occupancy and is_occupancy_maintained():
+                occupancy_changes.append(parking._saved_occupancy + (1,))
+        with transaction.atomic():
+            created = cls.objects.bulk_create(parkings)
+            RegionOccupancy.objects.apply_changes(occupancy_changes)
+        return created
+
+    @classmethod
+    def _set_terminals_in_bulk(cls, parkings):
+        without_terminal = [
+            x for x in parkings if not x.terminal_id and x.terminal_number]
+        if without_terminal:
+            numbers = {x.terminal_number for x in without_terminal}
+            terminals = ParkingTerminal.objects.filter(number__in=numbers)
+            terminals_by_key = {(x.domain_id, x.number): x for x in terminals}
+            for parking in without_terminal:
+                parking.terminal = terminals_by_key.get(
+                    (parking.domain_id, str(parking.terminal_number)))
+
+        for parking in parkings:
+            if parking.terminal and not parking.location:
+                parking.location = parking.terminal.location
+
+    @classmethod
+    def _set_regions_and_areas_in_bulk(cls, parkings, max_area_distance=50):
+        located = [x for x in parkings if x.location]
+        for parking in parkings:
+            parking.region = None
+            parking.parking_area = None
+        if not located:
+            return
+
+        db = router.db_for_read(cls)
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        row_sql = (
+            "(%s::integer, %s::integer,"
+            " ST_SetSRID(ST_MakePoint(%s::float8, %s::float8), %s::integer))")
+        sql = _REGIONS_AND_AREAS_SQL.format(
+            location_rows=", ".join([row_sql] * len(located)),
+            region_table=quote(Region._meta.db_table),
+            area_table=quote(ParkingArea._meta.db_table),
+        )
+        region_srid = Region._meta.get_field('geom').srid
+        area_srid = ParkingArea._meta.get_field('geom').srid
+        params = [region_srid, area_srid, max_area_distance, area_srid]
+        for (idx, parking) in enumerate(located):
+            location = parking.location
+            params.extend([
+                idx, parking.domain_id, location.x, location.y, location.srid])
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        for (parking, (region_id, area_id)) in zip(located, rows):
+            parking.region_id = region_id
+            parking.parking_area_id = area_id
 
     @classmethod
     def normalize_reg_num(cls, registration_number):
@@ -224,6 +472,74 @@ class Parking(AbstractParking):
         return registration_number.upper().replace('-', '').replace(' ', '')
 
 
+# Finds the same region and parking area for each location as
+# Parking.get_region and Parking.get_closest_area would.  Parameters
+# are region SRID, area SRID, maximum area distance and area SRID
+# followed by the location rows.
+_REGIONS_AND_AREAS_SQL = """
+SELECT
+    (SELECT r.id FROM {region_table} r
+     WHERE r.domain_id = locations.domain_id
+       AND ST_Intersects(r.geom, ST_Transform(locations.point, %s))
+     ORDER BY r.id
+     LIMIT 1),
+    (SELECT a.id FROM {area_table} a
+     WHERE a.domain_id = locations.domain_id
+       AND ST_DWithin(a.geom, ST_Transform(locations.point, %s), %s)
+     ORDER BY ST_Distance(a.geom, ST_Transform(locations.point, %s))
+     LIMIT 1)
+FROM (VALUES {location_rows}) AS locations (idx, domain_id, point)
+ORDER BY locations.idx
+"""
+
+
+_UPDATE_BY_LOCATION_SQL = """
+UPDATE {{table}} SET {{column}} = matched.target_id
+FROM (
+    SELECT p.id, p.time_start, p.{{column}} AS old_target_id,
+        target.id AS target_id
+    FROM {{table}} p
+    LEFT JOIN LATERAL ({target_sql}) AS target ON true
+    WHERE p.id IN ({{parkings}})
+) AS matched
+WHERE {{table}}.id = matched.id
+  AND {{table}}.time_start = matched.time_start
+  AND {{table}}.{{column}} IS DISTINCT FROM matched.target_id
+"""
+
+# Parameter is the region SRID
+_ASSIGN_REGIONS_SQL = _UPDATE_BY_LOCATION_SQL.format(target_sql="""
+        SELECT r.id FROM {target_table} r
+        WHERE r.domain_id = p.domain_id
+          AND ST_Intersects(r.geom, ST_Transform(p.location, %s))
+        ORDER BY r.id
+        LIMIT 1""")
+
+_RETURNING_OCCUPANCY_SQL = """
+RETURNING matched.old_target_id, matched.target_id,
+    {table}.time_start, {table}.time_end
+"""
+
+# Parameters are area SRID, maximum distance and area SRID
+_ASSIGN_PARKING_AREAS_SQL = _UPDATE_BY_LOCATION_SQL.format(target_sql="""
+        SELECT a.id FROM {target_table} a
+        WHERE a.domain_id = p.domain_id
+          AND ST_DWithin(a.geom, ST_Transform(p.location, %s), %s)
+        ORDER BY ST_Distance(a.geom, ST_Transform(p.location, %s))
+        LIMIT 1""")
+
+
+_SANITIZE_SQL = """
+UPDATE {table} SET
+    registration_number = sanitized.registration_number,
+    normalized_reg_num = sanitized.normalized_reg_num,
+    sanitized_at = %s
+FROM (VALUES {values})
+    AS sanitized (id, time_start, registration_number, normalized_reg_num)
+WHERE {table}.id = sanitized.id AND {table}.time_start = sanitized.time_start
+"""
+
+
 @with_model_field_modifications(
     created_at={"auto_now_add": False},
     modified_at={"auto_now": False},
@@ -235,7 +551,6 @@ class Parking(AbstractParking):
     location={"db_index": False},
     operator={"db_index": False},
     parking_area={"db_index": False},
-    region={"db_index": False},
     terminal={"db_index": False},
     zone={"db_index": False},
 )
@@ -327,3 +642,53 @@ class ArchivedParking(AbstractParking):
         self.normalized_reg_num = sanitize_registration_number(self.normalized_reg_num)
         self.sanitized_at = timezone.now()
         self.save(update_fields=['registration_number', 'normalized_reg_num', 'sanitized_at'])
+
+    @classmethod
+    def sanitize_in_bulk(
+        cls,
+        parkings,
+        batch_size=10000,
+        map_func=map,
+        post_batch_callback=(lambda batch_count, total: None),
+    ):
+        """
+        Sanitize given archived parkings in batches.
+
+        The registration numbers of each batch are fetched with a single
+        query, the distinct values are sanitized with given map
+        function, and the batch is updated with a single UPDATE query.
+        This gives the same result as calling sanitize for each parking.
+
+        :param parkings: QuerySet of ArchivedParking objects to sanitize
+        :param map_func:
+          Function used to map sanitize_registration_number over the
+          values, e.g. the map method of a process pool
+        :returns: Number of sanitized parkings
+        """
+        db = router.db_for_write(cls)
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        ordered = parkings.order_by("pk").values_list(
+            "pk", "time_start", "registration_number", "normalized_reg_num")
+        total = 0
+        last_pk = None
+        while True:
+            batch_qs = ordered.filter(pk__gt=last_pk) if last_pk else ordered
+            batch = list(batch_qs[:batch_size])
+            if not batch:
+                break
+            values = sorted({x for row in batch for x in row[2:4]})
+            sanitized = dict(zip(values, map_func(
+                sanitize_registration_number, values)))
+            sql = _SANITIZE_SQL.format(
+                table=quote(cls._meta.db_table),
+                values=", ".join(["(%s::uuid, %s::timestamptz, %s, %s)"] * len(batch)))
+            params = [timezone.now()] + [
+                x for (pk, time_start, reg_num, normalized) in batch
+                for x in [pk, time_start, sanitized[reg_num], sanitized[normalized]]]
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+            total += len(batch)
+            last_pk = batch[-1][0]
+            post_batch_callback(len(batch), total)
+        return total
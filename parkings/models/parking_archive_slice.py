@@ -0,0 +1,109 @@
+from django.db import models
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class ParkingArchiveSliceQuerySet(models.QuerySet):
+    def create_run(self, ends_before, slice_length):
+        """
+        Plan an archiving run by splitting it to slices.
+
+        The time_end range of the parkings ending before given time is
+        split to disjoint slices of given length.  The slices are stored
+        so that an interrupted run can be resumed.
+
+        :type ends_before: datetime.datetime
+        :type slice_length: datetime.timedelta
+        :returns: The created slices of the run
+        """
+        from .parking import Parking
+
+        first_end = Parking.objects.ends_before(ends_before).aggregate(
+            a=Min("time_end"))["a"]
+        if first_end is None:
+            return self.none()
+        run_started_at = timezone.now()
+        slices = []
+        slice_start = first_end
+        while slice_start < ends_before:
+            slice_end = min(slice_start + slice_length, ends_before)
+            slices.append(self.model(
+                run_started_at=run_started_at,
+                ends_before=ends_before,
+                time_end_min=slice_start,
+                time_end_max=slice_end))
+            slice_start = slice_end
+        self.bulk_create(slices)
+        return self.filter(run_started_at=run_started_at)
+
+    def last_run(self):
+        """
+        Get the slices of the latest archiving run.
+        """
+        last_started_at = self.aggregate(a=Max("run_started_at"))["a"]
+        return self.filter(run_started_at=last_started_at)
+
+    def incomplete(self):
+        return self.filter(completed_at=None)
+
+
+class ParkingArchiveSlice(models.Model):
+    """
+    Checkpoint of archiving a time_end range of parkings.
+
+    The archive_parkings management command splits the parkings to
+    archive into slices by their end time and records the completion of
+    each slice, so that the slices can be archived in parallel and an
+    interrupted run can be resumed from the incomplete slices.
+    """
+    id = models.BigAutoField(primary_key=True)
+    run_started_at = models.DateTimeField(
+        db_index=True, verbose_name=_("run started at"))
+    ends_before = models.DateTimeField(verbose_name=_("ends before"))
+    time_end_min = models.DateTimeField(verbose_name=_("minimum end time"))
+    time_end_max = models.DateTimeField(
+        verbose_name=_("maximum end time"),
+        help_text=_("Exclusive"))
+    archived_count = models.IntegerField(
+        null=True, blank=True, verbose_name=_("archived count"))
+    completed_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("time completed"))
+
+    objects = ParkingArchiveSliceQuerySet.as_manager()
+
+    class Meta:
+        ordering = ("run_started_at", "time_end_min")
+        verbose_name = _("parking archive slice")
+        verbose_name_plural = _("parking archive slices")
+
+    def __str__(self):
+        return "{} -- {}".format(self.time_end_min, self.time_end_max)
+
+    def get_parkings(self):
+        """
+        Get the parkings of this slice which are not yet archived.
+
+        :rtype: parkings.models.ParkingQuerySet
+        """
+        from .parking import Parking
+
+        return Parking.objects.filter(
+            time_end__gte=self.time_end_min,
+            time_end__lt=self.time_end_max)
+
+    def archive(self, batch_size=1000):
+        """
+        Archive the parkings of this slice and mark it completed.
+
+        Archiving an already completed or partially archived slice is
+        safe, since the archived parkings are not in the Parking table
+        anymore.
+
+        :returns: Number of archived parkings
+        """
+        archived = self.get_parkings().archive(batch_size=batch_size)
+        self.archived_count = (self.archived_count or 0) + archived
+        self.completed_at = timezone.now()
+        self.save(update_fields=["archived_count", "completed_at"])
+        return archived
@@ -1,9 +1,11 @@
 from django.contrib.gis.db import models
 from django.contrib.gis.db.models.functions import Area
-from django.db.models import Func, Sum
+from django.db.models import Case, Count, Func, Q, Sum, When
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from parkings.models.mixins import TimestampedModelMixin, UUIDPrimaryKeyMixin
+from parkings.models.mixins import (
+    TimestampedModelMixin, UUIDPrimaryKeyMixin, WGS84GeometryMixin)
 
 from .enforcement_domain import EnforcementDomain
 
@@ -37,6 +39,14 @@ class ParkingAreaQuerySet(models.QuerySet):
         """
         return self.filter(geom__intersects=region.geom)
 
+    def with_parking_count(self, at_time=None):
+        time = at_time if at_time else timezone.now()
+        valid_parkings_q = (
+            Q(parkings__time_start__lte=time) &
+            (Q(parkings__time_end__gte=time) | Q(parkings__time_end=None)))
+        return self.annotate(
+            parking_count=Count(Case(When(valid_parkings_q, then=1))))
+
     @property
     def total_estimated_capacity(self):
         """
@@ -66,7 +76,8 @@ class ParkingAreaQuerySet(models.QuerySet):
         return int(spots.sq_m) if spots else 0
 
 
-class ParkingArea(TimestampedModelMixin, UUIDPrimaryKeyMixin):
+class ParkingArea(
+        TimestampedModelMixin, UUIDPrimaryKeyMixin, WGS84GeometryMixin):
     domain = models.ForeignKey(EnforcementDomain, on_delete=models.PROTECT,
                                related_name='parking_areas')
 
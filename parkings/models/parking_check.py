@@ -3,6 +3,7 @@ from django.contrib.gis.db import models as gis_models
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.db.models import JSONField
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from .constants import WGS84_SRID
@@ -24,8 +25,11 @@ class ParkingCheck(models.Model):
     and the results of the check.
     """
     # Metadata
+    # Not auto_now_add, so that a buffered check keeps the time when it
+    # was recorded (see parkings.parking_check_buffer)
     created_at = models.DateTimeField(
-        auto_now_add=True, db_index=True, verbose_name=_("time created"))
+        default=timezone.now, editable=False, db_index=True,
+        verbose_name=_("time created"))
     performer = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.PROTECT, editable=False,
         verbose_name=_("performer"),
@@ -44,8 +48,11 @@ class ParkingCheck(models.Model):
     result = JSONField(
         blank=True, encoder=DjangoJSONEncoder, verbose_name=_("result"))
     allowed = models.BooleanField(verbose_name=_("parking was allowed"))
+    # No foreign key constraint, since the parking table is partitioned
+    # and the primary key of a partitioned table must include the
+    # partition key.  See parkings.partitioning.
     found_parking = models.ForeignKey(
-        Parking, on_delete=models.SET_NULL,
+        Parking, on_delete=models.SET_NULL, db_constraint=False,
         null=True, blank=True, verbose_name=_("found parking"))
 
     objects = ParkingCheckQuerySet.as_manager()
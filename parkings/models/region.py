@@ -1,13 +1,16 @@
 from django.contrib.gis.db import models as gis_models
 from django.contrib.gis.db.models.functions import Intersection
+from django.contrib.postgres.expressions import ArraySubquery
 from django.db import models
-from django.db.models import Case, Count, Q, When
+from django.db.models import Case, Count, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from parkings.models import EnforcementDomain
 
-from .mixins import TimestampedModelMixin, UUIDPrimaryKeyMixin
+from .mixins import (
+    TimestampedModelMixin, UUIDPrimaryKeyMixin, WGS84GeometryMixin)
 from .parking_area import ParkingArea
 
 
@@ -20,8 +23,42 @@ class RegionQuerySet(models.QuerySet):
         return self.annotate(
             parking_count=Count(Case(When(valid_parkings_q, then=1))))
 
+    def with_parking_area_ids(self):
+        """
+        Annotate IDs of the parking areas intersecting with each region.
+
+        The IDs are fetched with the same query as the regions, which
+        is a lot faster than querying them separately for each region.
+        """
+        intersecting_areas = (
+            ParkingArea.objects
+            .filter(geom__intersects=OuterRef('geom'))
+            .order_by('pk')
+            .values('pk'))
+        return self.annotate(parking_area_ids=ArraySubquery(intersecting_areas))
+
+    def with_occupancy_count(self, at_time=None):
+        """
+        Annotate parking count from the precomputed region occupancy.
+
+        Gives the same counts as `with_parking_count`, except that
+        archived parkings are counted too, but with a single index
+        lookup per region rather than by scanning the parkings.
+        """
+        from .region_occupancy import RegionOccupancy
+
+        time = at_time if at_time else timezone.now()
+        latest_occupancy = (
+            RegionOccupancy.objects
+            .filter(region=OuterRef('pk'), time__lte=time)
+            .order_by('-time')
+            .values('parking_count')[:1])
+        return self.annotate(
+            parking_count=Coalesce(Subquery(latest_occupancy), 0))
+
 
-class Region(TimestampedModelMixin, UUIDPrimaryKeyMixin):
+class Region(
+        TimestampedModelMixin, UUIDPrimaryKeyMixin, WGS84GeometryMixin):
     name = models.CharField(max_length=200, blank=True, verbose_name=_("name"))
     geom = gis_models.MultiPolygonField(srid=3879, verbose_name=_("geometry"))
     capacity_estimate = models.PositiveIntegerField(
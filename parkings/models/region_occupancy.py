@@ -0,0 +1,211 @@
+import datetime
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.utils.translation import gettext_lazy as _
+
+from .region import Region
+
+# Namespace of the advisory locks which serialize the updates of a
+# single region's occupancy (an arbitrary 32-bit integer)
+_LOCK_NAMESPACE = 0x6F636375
+
+_ONE_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def is_occupancy_maintained():
+    """
+    Check if the region occupancy is updated on parking changes.
+
+    The occupancy is only used when
+    PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY is enabled, so the
+    parking writes don't pay for its upkeep otherwise.
+    """
+    return getattr(
+        settings, "PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY", False)
+
+
+def get_occupancy_change(region_id, time_start, time_end):
+    """
+    Get the occupancy change caused by a parking.
+
+    :returns:
+      Tuple (region_id, time_start, time_end) or None if the parking
+      doesn't affect occupancy of any region
+    """
+    if region_id is None:
+        return None
+    if time_end is not None and time_end < time_start:
+        return None  # Never valid
+    return (region_id, time_start, time_end)
+
+
+class RegionOccupancyQuerySet(models.QuerySet):
+    def apply_changes(self, changes):
+        """
+        Apply given occupancy changes.
+
+        :param changes:
+          Iterable of (region_id, time_start, time_end, delta) tuples,
+          where delta is the change to the parking count of the region
+          during the time range [time_start, time_end].  Unbounded from
+          above if time_end is None.
+        """
+        changes = [
+            (str(region_id), time_start,
+             (time_end + _ONE_MICROSECOND) if time_end else None, delta)
+            for (region_id, time_start, time_end, delta) in changes]
+        if not changes:
+            return
+
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        region_ids = sorted({x[0] for x in changes})
+        points = sorted({
+            (region_id, time)
+            for (region_id, time_start, end_after, _delta) in changes
+            for time in [time_start, end_after] if time is not None})
+
+        with transaction.atomic(using=db), connection.cursor() as cursor:
+            # Lock the regions in a fixed order to avoid deadlocks
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s, hashtext(region_id))"
+                " FROM unnest(%s::text[]) AS region_id",
+                [_LOCK_NAMESPACE, region_ids])
+
+            # Add change points at the start and after the end of each
+            # range.  A new point gets the count that was in effect at
+            # its time, so the counts stay the same until updated.
+            cursor.execute(_INSERT_CHANGE_POINTS_SQL.format(
+                table=table,
+                points=", ".join(["(%s::uuid, %s::timestamptz)"] * len(points)),
+            ), [x for point in points for x in point])
+
+            cursor.execute(_UPDATE_COUNTS_SQL.format(
+                table=table,
+                changes=", ".join(
+                    ["(%s::uuid, %s::timestamptz, %s::timestamptz, %s::integer)"]
+                    * len(changes)),
+            ), [x for change in changes for x in change])
+
+    def rebuild(self):
+        """
+        Rebuild the occupancy from Parking and ArchivedParking tables.
+
+        The regions are rebuilt one at a time, each in its own
+        transaction under the same lock as the incremental updates of
+        the region, so that only the parking writes to the region being
+        rebuilt have to wait.
+
+        :returns: Number of created occupancy rows
+        """
+        from .parking import ArchivedParking, Parking
+
+        db = router.db_for_write(self.model)
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        events_sqls = []
+        for model in [Parking, ArchivedParking]:
+            events_sqls.append(_PARKING_EVENTS_SQL.format(
+                table=quote(model._meta.db_table)))
+        sql = _REBUILD_SQL.format(
+            table=table, events=" UNION ALL ".join(events_sqls))
+        region_ids = list(Region.objects.using(db).order_by("pk").values_list(
+            "pk", flat=True))
+        row_count = 0
+        for region_id in region_ids:
+            with transaction.atomic(using=db), connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(%s, hashtext(%s))",
+                    [_LOCK_NAMESPACE, str(region_id)])
+                cursor.execute(
+                    "DELETE FROM {} WHERE region_id = %s".format(table),
+                    [region_id])
+                cursor.execute(sql, [region_id] * (2 * len(events_sqls)))
+                row_count += cursor.rowcount
+        return row_count
+
+
+class RegionOccupancy(models.Model):
+    """
+    Number of valid parkings in a region from given time onwards.
+
+    The parking counts of each region are stored as a step function:
+    the count of a region at time T is the parking_count of its row
+    with the latest time <= T, or zero if there is no such row.  The
+    rows are updated incrementally when parkings are saved or deleted,
+    if PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY is enabled, and can
+    be rebuilt with the rebuild_region_occupancy management command.
+
+    Archived parkings are counted too, i.e. archiving a parking doesn't
+    change the occupancy.
+    """
+    id = models.BigAutoField(primary_key=True)
+    region = models.ForeignKey(
+        Region, on_delete=models.CASCADE, related_name="occupancies",
+        verbose_name=_("region"))
+    time = models.DateTimeField(verbose_name=_("time"))
+    parking_count = models.IntegerField(verbose_name=_("parking count"))
+
+    objects = RegionOccupancyQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("region occupancy")
+        verbose_name_plural = _("region occupancies")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["region", "time"], name="unique_region_occupancy_time"),
+        ]
+
+    def __str__(self):
+        return "{}: {} ({})".format(self.time, self.parking_count, self.region)
+
+
+_INSERT_CHANGE_POINTS_SQL = """
+INSERT INTO {table} (region_id, time, parking_count)
+SELECT
+    points.region_id,
+    points.time,
+    COALESCE((
+        SELECT o.parking_count FROM {table} o
+        WHERE o.region_id = points.region_id AND o.time < points.time
+        ORDER BY o.time DESC
+        LIMIT 1), 0)
+FROM (VALUES {points}) AS points (region_id, time)
+ON CONFLICT (region_id, time) DO NOTHING
+"""
+
+_UPDATE_COUNTS_SQL = """
+UPDATE {table} SET parking_count = {table}.parking_count + totals.delta
+FROM (
+    SELECT o.id, SUM(changes.delta) AS delta
+    FROM {table} o
+    JOIN (VALUES {changes}) AS changes (region_id, time_start, end_after, delta)
+      ON o.region_id = changes.region_id
+     AND o.time >= changes.time_start
+     AND (changes.end_after IS NULL OR o.time < changes.end_after)
+    GROUP BY o.id
+) totals
+WHERE {table}.id = totals.id
+"""
+
+_PARKING_EVENTS_SQL = """
+SELECT region_id, time_start AS time, 1 AS delta FROM {table}
+WHERE region_id = %s AND (time_end IS NULL OR time_end >= time_start)
+UNION ALL
+SELECT region_id, time_end + interval '1 microsecond', -1 FROM {table}
+WHERE region_id = %s AND time_end >= time_start
+"""
+
+_REBUILD_SQL = """
+INSERT INTO {table} (region_id, time, parking_count)
+SELECT
+    region_id,
+    time,
+    SUM(SUM(delta)) OVER (PARTITION BY region_id ORDER BY time)
+FROM ({events}) AS events
+GROUP BY region_id, time
+"""
@@ -1,4 +1,17 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_gis.pagination import GeoJsonPagination
 
 
 class Pagination(pagination.PageNumberPagination):
@@ -10,3 +23,255 @@ class CursorPagination(pagination.CursorPagination):
     page_size = 200
     page_size_query_param = 'page_size'
     max_page_size = 1000
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Pagination by the ordering values of the last item of the page.
+
+    Unlike the offset based cursor pagination of DRF, the next page is
+    found with a WHERE condition on the ordering values, which the
+    database can resolve with an index regardless of the page depth.
+    The ordering is taken from the keyset_ordering attribute of the
+    view and it should end with a unique field, e.g. "id", to make it
+    stable.  NULL values are ordered as PostgreSQL orders them by
+    default, i.e. last for ascending and first for descending keys, so
+    that the ordering matches the indexes.  Only forward pagination is
+    supported.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.next_position = None
+        page_size = self.get_page_size(request)
+
+        if queryset.query.is_sliced:  # Already limited, e.g. to one item
+            return list(queryset[:page_size])
+
+        (queryset, keys) = self._order_by_keys(
+            queryset, getattr(view, 'keyset_ordering', self.ordering))
+        position = self.decode_cursor(request)
+        if position is not None:
+            position = self._convert_position(keys, position)
+            queryset = queryset.filter(_get_after_q(keys, position))
+
+        items = list(queryset[:page_size + 1])
+        if len(items) > page_size:
+            items = items[:page_size]
+            self.next_position = [
+                _to_cursor_value(getattr(items[-1], field.attname))
+                for (field, _descending) in keys]
+        return items
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        encoded = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(encoded).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(
+                encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _convert_position(self, keys, position):
+        """
+        Convert the values of a decoded cursor to the key field types.
+
+        :raises NotFound: if the values don't match the keys
+        """
+        if len(position) != len(keys):
+            raise NotFound(self.invalid_cursor_message)
+        converted = []
+        for ((field, _descending), value) in zip(keys, position):
+            if value is None and not field.null:
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                converted.append(field.to_python(value))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return converted
+
+    def _order_by_keys(self, queryset, ordering):
+        keys = []
+        for item in ordering:
+            descending = item.startswith('-')
+            field = queryset.model._meta.get_field(item.lstrip('-'))
+            keys.append((field, descending))
+        return (
+            queryset.order_by(*[
+                ('-' if desc else '') + field.attname
+                for (field, desc) in keys]),
+            keys)
+
+
+def _get_after_q(keys, position):
+    """
+    Get condition for items after given position in given ordering.
+
+    PostgreSQL orders NULLs last for ascending keys and first for
+    descending keys.  The NULL checks of the nullable keys are
+    explicit, so that the condition can be resolved with an index on
+    the keys.
+    """
+    condition = Q()
+    equal_so_far = Q()
+    for ((field, descending), value) in zip(keys, position):
+        (key, nullable) = (field.attname, field.null)
+        isnull = '{}__isnull'.format(key)
+        if value is None:
+            if descending:
+                condition |= equal_so_far & Q(**{isnull: False})
+            equal_so_far &= Q(**{isnull: True})
+            continue
+        after = Q(**{'{}__{}'.format(key, 'lt' if descending else 'gt'): value})
+        if nullable and not descending:
+            after |= Q(**{isnull: True})
+        condition |= equal_so_far & after
+        equal_so_far &= Q(**{key: value})
+    return condition
+
+
+def _to_cursor_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, (int, float, str)) or value is None:
+        return value
+    return str(value)
+
+
+class GeoJsonKeysetPagination(KeysetPagination):
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('type', 'FeatureCollection'),
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('features', data['features']),
+        ]))
+
+
+class _UncountedPaginator:
+    count = None
+
+
+class _UncountedPage:
+    """
+    Page of a paginator which doesn't know the total count of items.
+    """
+    paginator = _UncountedPaginator()
+
+    def __init__(self, object_list, number, has_next):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class SwitchablePaginationMixin:
+    """
+    Mixin for page number paginations to add keyset and uncounted modes.
+
+    The page number pagination is used by default.  With the cursor
+    query parameter or "pagination=cursor" the keyset pagination is
+    used instead.  With "count=false" the page number pagination
+    doesn't count the total number of items, which saves a query, and
+    the count of the response is null.
+    """
+    keyset_pagination_class = KeysetPagination
+    pagination_mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_paginator = None
+        if (request.query_params.get(self.pagination_mode_query_param) == 'cursor'
+                or self.keyset_pagination_class.cursor_query_param in request.query_params):
+            self.keyset_paginator = self.keyset_pagination_class()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view)
+        if request.query_params.get(self.count_query_param) == 'false':
+            return self._paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def _paginate_without_count(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=number, message="Invalid page."))
+        offset = (number - 1) * page_size
+        items = list(queryset[offset:offset + page_size + 1])
+        if not items and number > 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=number, message="That page contains no results"))
+        self.page = _UncountedPage(
+            items[:page_size], number, has_next=(len(items) > page_size))
+        return list(self.page)
+
+
+class ParkingPagination(SwitchablePaginationMixin, Pagination):
+    pass
+
+
+class GeoJsonParkingPagination(SwitchablePaginationMixin, GeoJsonPagination):
+    keyset_pagination_class = GeoJsonKeysetPagination
@@ -0,0 +1,285 @@
+"""
+Buffered writing of ParkingCheck records.
+
+Every check done via the check_parking endpoint is recorded as a
+ParkingCheck.  By default the record is inserted before the response is
+returned, but when PARKKIHUBI_PARKING_CHECK_BUFFERING is enabled the
+records are collected to a per-process buffer and written with a single
+bulk insert by a background thread instead.
+
+The buffer is flushed by the background thread when it has
+PARKKIHUBI_PARKING_CHECK_BUFFER_SIZE records or when its oldest record
+has waited for PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_DELAY, and when the
+process exits normally.  Therefore if the process is killed, at most
+the records of the last BUFFER_SIZE checks or of about the last
+MAX_DELAY are lost.  The lag of the flushes is logged and collected to
+the stats of the buffer.
+
+If writing the records fails, they are put back to the buffer and the
+write is retried with an exponential backoff.  While the database is
+unavailable, the buffer keeps at most
+PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_RETAINED records, and the oldest
+records beyond that are dropped and counted as lost.  If the write
+fails because of the data, e.g. an integrity error, the records are
+written one by one instead, and only the failing ones are dropped.
+
+The created_at timestamp of a buffered record is the time when it was
+recorded, not when it was written to the database.  Note: Uwsgi must
+be run with threads enabled for the background flushing to work.
+"""
+import atexit
+import datetime
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, DataError, IntegrityError, connections
+
+from .models import ParkingCheck
+
+LOG = logging.getLogger(__name__)
+
+
+def is_enabled():
+    return getattr(settings, "PARKKIHUBI_PARKING_CHECK_BUFFERING", False)
+
+
+def record(parking_check):
+    """
+    Record given (unsaved) parking check.
+
+    The check is saved immediately, unless buffering is enabled.
+
+    :type parking_check: parkings.models.ParkingCheck
+    """
+    if is_enabled():
+        default_buffer.add(parking_check)
+    else:
+        parking_check.save()
+
+
+def record_many(parking_checks):
+    """
+    Record given (unsaved) parking checks.
+
+    The checks are saved immediately with a single bulk insert, unless
+    buffering is enabled.
+
+    :type parking_checks: list[parkings.models.ParkingCheck]
+    """
+    if is_enabled():
+        for parking_check in parking_checks:
+            default_buffer.add(parking_check)
+    else:
+        ParkingCheck.objects.bulk_create(parking_checks)
+
+
+class ParkingCheckBuffer:
+    min_retry_delay = 1.0
+    max_retry_delay = 60.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._items = []
+        self._oldest_added_at = None
+        self._failures = 0
+        self._retry_at = None
+        self._flusher = None
+        self.stats = {
+            "flushes": 0,
+            "written": 0,
+            "lost": 0,
+            "last_flush_lag": None,
+            "max_flush_lag": None,
+        }
+
+    @property
+    def max_size(self):
+        return getattr(settings, "PARKKIHUBI_PARKING_CHECK_BUFFER_SIZE", 100)
+
+    @property
+    def max_delay(self):
+        value = getattr(
+            settings, "PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_DELAY",
+            datetime.timedelta(seconds=5))
+        assert isinstance(value, datetime.timedelta)
+        return value.total_seconds()
+
+    @property
+    def max_retained(self):
+        return max(getattr(
+            settings, "PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_RETAINED", 10000),
+            self.max_size)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, parking_check):
+        with self._lock:
+            if self._pid != os.getpid():  # Forked, start from scratch
+                self._reset()
+            if not self._items:
+                self._oldest_added_at = time.monotonic()
+            self._items.append(parking_check)
+            self._drop_overflow()
+            is_full = len(self._items) >= self.max_size
+            self._ensure_flusher_is_running()
+        if is_full:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Write all buffered records to the database.
+
+        If the writing fails, the records are put back to the buffer.
+
+        :returns: Number of records written
+        """
+        with self._lock:
+            (items, self._items) = (self._items, [])
+            oldest_added_at = self._oldest_added_at
+            self._oldest_added_at = None
+        if not items:
+            return 0
+
+        try:
+            self._write(items)
+            written = len(items)
+        except (DataError, IntegrityError):
+            LOG.exception("Invalid data in %d parking checks", len(items))
+            written = self._write_one_by_one(items, oldest_added_at)
+            if written is None:
+                return 0
+        except DatabaseError:
+            LOG.exception("Failed to write %d parking checks", len(items))
+            self._put_back(items, oldest_added_at)
+            return 0
+
+        lag = time.monotonic() - oldest_added_at
+        with self._lock:
+            self._failures = 0
+            self._retry_at = None
+            self._update_stats(written, lag)
+        LOG.debug(
+            "Wrote %d parking checks, flush lag %.3f s", written, lag)
+        if lag > 2 * self.max_delay:
+            LOG.warning("Parking check flush lag is %.3f s", lag)
+        return written
+
+    def _write(self, items):
+        ParkingCheck.objects.bulk_create(items)
+
+    def _write_one_by_one(self, items, oldest_added_at):
+        """
+        Write given records one by one and drop the ones which fail.
+
+        If the writing fails for another reason than the data, the rest
+        of the records are put back to the buffer.
+
+        :returns: Number of records written, or None if put back
+        """
+        written = 0
+        for (index, item) in enumerate(items):
+            try:
+                self._write([item])
+                written += 1
+            except (DataError, IntegrityError):
+                LOG.exception("Dropped invalid parking check")
+                with self._lock:
+                    self.stats["lost"] += 1
+            except DatabaseError:
+                LOG.exception("Failed to write parking checks")
+                with self._lock:
+                    self.stats["written"] += written
+                self._put_back(items[index:], oldest_added_at)
+                return None
+        return written
+
+    def _put_back(self, items, oldest_added_at):
+        with self._lock:
+            self._items[:0] = items
+            self._oldest_added_at = oldest_added_at
+            self._drop_overflow()
+            self._failures += 1
+            retry_delay = min(
+                self.min_retry_delay * 2 ** (self._failures - 1),
+                self.max_retry_delay)
+            self._retry_at = time.monotonic() + retry_delay
+        LOG.warning("Retrying parking check write in %.1f s", retry_delay)
+
+    def _drop_overflow(self):
+        overflow = len(self._items) - self.max_retained
+        if overflow > 0:
+            del self._items[:overflow]
+            self.stats["lost"] += overflow
+            LOG.error("Dropped %d buffered parking checks", overflow)
+
+    def _update_stats(self, written, lag):
+        stats = self.stats
+        stats["flushes"] += 1
+        stats["written"] += written
+        stats["last_flush_lag"] = lag
+        stats["max_flush_lag"] = max(stats["max_flush_lag"] or 0.0, lag)
+
+    def stop(self):
+        """
+        Stop the background flushing and flush the remaining records.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        flusher = self._flusher
+        if flusher and flusher is not threading.current_thread():
+            flusher.join()
+        self._flusher = None
+        self._stopped.clear()
+        self.flush()
+
+    def _ensure_flusher_is_running(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name="parking-check-flusher",
+                daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._get_wait_time())
+            self._wakeup.clear()
+            if not self._stopped.is_set() and self._is_flush_due():
+                self.flush()
+                # Don't keep the connections of this thread open idle
+                connections.close_all()
+
+    def _get_wait_time(self):
+        now = time.monotonic()
+        oldest_added_at = self._oldest_added_at
+        if oldest_added_at is None:
+            return self.max_delay / 10.0
+        retry_at = self._retry_at
+        if retry_at is not None:
+            return max(retry_at - now, 0.0)
+        return max(self.max_delay - (now - oldest_added_at), 0.0)
+
+    def _is_flush_due(self):
+        now = time.monotonic()
+        oldest_added_at = self._oldest_added_at
+        if oldest_added_at is None:
+            return False
+        if self._retry_at is not None:
+            return now >= self._retry_at
+        return (
+            len(self._items) >= self.max_size
+            or now - oldest_added_at >= self.max_delay)
+
+
+default_buffer = ParkingCheckBuffer()
+
+atexit.register(default_buffer.stop)
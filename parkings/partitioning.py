@@ -0,0 +1,303 @@
+"""
+Monthly partitions of the parking and archived parking tables.
+
+The parking and archived parking tables are partitioned by range of
+time_start (see migration 0054).  The rows which existed when the
+tables were partitioned are in a "legacy" partition, the rows outside
+of the other partitions are in a default partition, and the rest are
+in monthly partitions.
+
+The monthly partitions of the parking table are created in advance by
+the create_parking_partitions management command.  When all parkings
+of a monthly partition have ended before the retention time, the
+partition can be archived as a whole by detaching it from the parking
+table and attaching it to the archived parking table, instead of
+copying and deleting the rows one by one.  The archived parking table
+only has the monthly partitions moved from the parking table.
+"""
+import collections
+import datetime
+import re
+
+from dateutil.relativedelta import relativedelta
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedParking, Parking, ParkingCheck
+
+Partition = collections.namedtuple(
+    "Partition", ["name", "start", "end", "is_default"])
+
+_PARTITIONS_SQL = """
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = %s::regclass
+"""
+
+_MIN_TIME = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+
+_BOUNDS_RE = re.compile(r"FROM \((MINVALUE|'[^']*')\) TO \((MAXVALUE|'[^']*')\)")
+
+
+def get_partitions(model):
+    """
+    Get the partitions of the table of given model.
+
+    The start and end of the partitions of the MINVALUE and MAXVALUE
+    bounds are None.
+
+    :rtype: list[Partition]
+    """
+    with _get_connection(model).cursor() as cursor:
+        cursor.execute(_PARTITIONS_SQL, [model._meta.db_table])
+        rows = cursor.fetchall()
+    partitions = []
+    for (name, bound) in rows:
+        if bound == "DEFAULT":
+            partitions.append(Partition(name, None, None, True))
+            continue
+        (start, end) = _BOUNDS_RE.search(bound).groups()
+        partitions.append(Partition(
+            name, _parse_bound(start), _parse_bound(end), False))
+    return sorted(partitions, key=(lambda x: (x.is_default, x.start or _MIN_TIME)))
+
+
+def get_month_partition_name(model, month_start):
+    return "{}_y{:04d}m{:02d}".format(
+        model._meta.db_table, month_start.year, month_start.month)
+
+
+def create_month_partitions(months, now=None):
+    """
+    Create the monthly partitions of the parking table.
+
+    Creates the partitions of the current month and given number of
+    months after it, except the ones which overlap with an existing
+    partition.  The parkings of the created months are moved from the
+    default partition to the new partitions.
+
+    :returns: Names of the created partitions
+    """
+    now = timezone.localtime(now or timezone.now(), datetime.timezone.utc)
+    first_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    created = []
+    for n in range(months + 1):
+        start = first_month + relativedelta(months=n)
+        end = start + relativedelta(months=1)
+        if not _overlapping_partitions(Parking, start, end):
+            name = get_month_partition_name(Parking, start)
+            _create_partition(Parking, name, start, end)
+            created.append(name)
+    return created
+
+
+def archive_partitions(ends_before, dry_run=False):
+    """
+    Archive whole partitions of parkings which ended before given time.
+
+    A monthly partition of the parking table is archived if all of its
+    parkings have ended before given time and the archived parking
+    table has no partition overlapping with it.  The partition is
+    detached from the parking table, the columns of the archived
+    parking table are added to it, and it is attached to the archived
+    parking table.
+
+    :returns: List of (partition name, parking count) pairs
+    """
+    archived = []
+    for partition in get_partitions(Parking):
+        if partition.is_default or partition.start is None:
+            continue  # Default and legacy partitions are archived by rows
+        if partition.end is None or partition.end > ends_before:
+            continue
+        if _overlapping_partitions(
+                ArchivedParking, partition.start, partition.end):
+            continue
+        count = _archive_partition(partition, ends_before, dry_run)
+        if count is not None:
+            archived.append((partition.name, count))
+    return archived
+
+
+def _archive_partition(partition, ends_before, dry_run):
+    connection = _get_connection(Parking)
+    quote = connection.ops.quote_name
+    partition_table = quote(partition.name)
+
+    # The partition is checked and prepared without locking the parking
+    # table.  The parkings of the partition have all ended, so no new
+    # parking checks will refer to them.
+    with connection.cursor() as cursor:
+        cursor.execute((
+            "SELECT EXISTS (SELECT 1 FROM {} WHERE time_end IS NULL"
+            " OR time_end >= %s)").format(partition_table), [ends_before])
+        if cursor.fetchone()[0]:
+            return None
+        cursor.execute("SELECT count(*) FROM {}".format(partition_table))
+        count = cursor.fetchone()[0]
+    if dry_run:
+        return count
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _clear_parking_check_references(cursor, partition_table, connection)
+    _add_bound_constraint(partition, connection)
+
+    # Only the detaching locks the parking table exclusively
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("ALTER TABLE {} DETACH PARTITION {}".format(
+            quote(Parking._meta.db_table), partition_table))
+    try:
+        _attach_to_archive(partition, connection)
+    except Exception:
+        _attach_partition(Parking, partition, partition.name, connection)
+        raise
+    return count
+
+
+def _add_bound_constraint(partition, connection):
+    """
+    Add a check constraint of the time range of given partition.
+
+    With the constraint, the partition can be attached to a partitioned
+    table without scanning it.  The constraint is validated in its own
+    transaction, which doesn't block the reads and writes of the table.
+    """
+    quote = connection.ops.quote_name
+    table = quote(partition.name)
+    constraint = quote(_get_bound_constraint_name(partition))
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}".format(
+            table, constraint))
+        cursor.execute((
+            "ALTER TABLE {} ADD CONSTRAINT {} CHECK (time_start IS NOT NULL"
+            " AND time_start >= %s AND time_start < %s) NOT VALID").format(
+                table, constraint), [partition.start, partition.end])
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("ALTER TABLE {} VALIDATE CONSTRAINT {}".format(
+            table, constraint))
+
+
+def _attach_to_archive(partition, connection):
+    quote = connection.ops.quote_name
+    partition_table = quote(partition.name)
+    archive_name = get_month_partition_name(ArchivedParking, partition.start)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _add_archive_columns(cursor, partition_table, connection)
+        cursor.execute("ALTER TABLE {} RENAME TO {}".format(
+            partition_table, quote(archive_name)))
+        _attach_partition(ArchivedParking, partition, archive_name, connection)
+        cursor.execute("ALTER TABLE {} DROP CONSTRAINT {}".format(
+            quote(archive_name), quote(_get_bound_constraint_name(partition))))
+        _drop_unattached_indexes(cursor, archive_name, connection)
+
+
+def _attach_partition(model, partition, table, connection):
+    quote = connection.ops.quote_name
+    bounds = [partition.start, partition.end]
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        _move_default_partition_rows(cursor, model, quote(table), bounds)
+        cursor.execute((
+            "ALTER TABLE {} ATTACH PARTITION {}"
+            " FOR VALUES FROM (%s) TO (%s)").format(
+                quote(model._meta.db_table), quote(table)), bounds)
+
+
+def _get_bound_constraint_name(partition):
+    return partition.name + "_bound"
+
+
+def _add_archive_columns(cursor, table, connection):
+    quote = connection.ops.quote_name
+    parking_columns = {x.column for x in Parking._meta.concrete_fields}
+    archived_at = timezone.now()
+    for field in ArchivedParking._meta.concrete_fields:
+        if field.column in parking_columns:
+            continue
+        sql = "ALTER TABLE {} ADD COLUMN {} {}".format(
+            table, quote(field.column), field.db_type(connection))
+        if field.null:
+            cursor.execute(sql)
+        else:
+            # Constant default doesn't rewrite the table
+            cursor.execute(sql + " NOT NULL DEFAULT %s", [archived_at])
+            cursor.execute("ALTER TABLE {} ALTER COLUMN {} DROP DEFAULT".format(
+                table, quote(field.column)))
+
+
+def _clear_parking_check_references(cursor, table, connection):
+    # Same as what the on_delete=SET_NULL of found_parking would do
+    quote = connection.ops.quote_name
+    column = quote(ParkingCheck._meta.get_field("found_parking").column)
+    cursor.execute(
+        "UPDATE {check_table} SET {column} = NULL"
+        " WHERE {column} IN (SELECT id FROM {table})".format(
+            check_table=quote(ParkingCheck._meta.db_table),
+            column=column,
+            table=table))
+
+
+def _create_partition(model, name, start, end):
+    connection = _get_connection(model)
+    quote = connection.ops.quote_name
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute((
+            "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        ).format(quote(name), quote(model._meta.db_table)))
+        _attach_partition(
+            model, Partition(name, start, end, False), name, connection)
+
+
+def _move_default_partition_rows(cursor, model, table, bounds):
+    """
+    Move rows of given time_start range from the default partition.
+
+    A partition cannot be attached if the default partition has rows
+    which would belong to it.
+    """
+    default = [x for x in get_partitions(model) if x.is_default]
+    if not default:
+        return
+    quote = _get_connection(model).ops.quote_name
+    columns = ", ".join(quote(x.column) for x in model._meta.concrete_fields)
+    cursor.execute((
+        "WITH moved AS ("
+        " DELETE FROM {default} WHERE time_start >= %s AND time_start < %s"
+        " RETURNING {columns})"
+        " INSERT INTO {table} ({columns}) SELECT {columns} FROM moved"
+    ).format(
+        default=quote(default[0].name), table=table, columns=columns), bounds)
+
+
+def _drop_unattached_indexes(cursor, table, connection):
+    """
+    Drop indexes of given partition not attached to the parent indexes.
+
+    These are the indexes of the parking table which the archived
+    parking table doesn't have.
+    """
+    cursor.execute(
+        "SELECT indexrelid::regclass::text FROM pg_index"
+        " WHERE indrelid = %s::regclass AND NOT EXISTS ("
+        "  SELECT 1 FROM pg_inherits WHERE inhrelid = indexrelid)",
+        [table])
+    for (index_name,) in cursor.fetchall():
+        cursor.execute("DROP INDEX {}".format(index_name))
+
+
+def _overlapping_partitions(model, start, end):
+    return [
+        x for x in get_partitions(model)
+        if not x.is_default
+        and (x.start is None or x.start < end)
+        and (x.end is None or x.end > start)]
+
+
+def _get_connection(model):
+    return connections[router.db_for_write(model)]
+
+
+def _parse_bound(value):
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return parse_datetime(value.strip("'"))
@@ -0,0 +1,177 @@
+"""
+In-process spatial index of payment zones and permit areas.
+
+The polygons of the payment zones and permit areas change only when
+they are imported or edited in the admin, but they are needed on every
+check of a parking.  This module keeps the polygons of each enforcement
+domain as prepared geometries in memory so that finding the zone or
+area of a location doesn't need a database query.
+
+The indexes are invalidated when a PaymentZone or PermitArea is saved
+or deleted.  The invalidation is propagated to other processes via a
+version stamp stored in the configured cache backend, which is polled
+at most once per PARKKIHUBI_SPATIAL_INDEX_CHECK_INTERVAL.  Propagation
+to other processes therefore requires a shared cache backend.  As a
+safety net each index is also rebuilt after it has been in use for
+PARKKIHUBI_SPATIAL_INDEX_MAX_AGE.
+"""
+import datetime
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import PaymentZone, PermitArea
+
+VERSION_CACHE_KEY = "parkings:spatial_index:version"
+
+# Models whose changes invalidate the indexes
+INDEXED_MODELS = (PaymentZone, PermitArea)
+
+
+class SpatialIndex:
+    """
+    Index of polygons which can be queried by a point.
+
+    Each polygon is stored as a prepared geometry together with its
+    extent.  The extents are checked first, since that is a lot cheaper
+    than the actual containment test.
+    """
+    def __init__(self, items):
+        """
+        Initialize the index from given items.
+
+        :param items: Iterable of (geometry, value) pairs.  The order of
+                      the items is preserved in the query results.
+        """
+        self._entries = [
+            (geom.extent, geom.prepared, value)
+            for (geom, value) in items]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def find(self, point):
+        """
+        Find the value of the first polygon that contains given point.
+        """
+        (x, y) = (point.x, point.y)
+        for ((xmin, ymin, xmax, ymax), prepared, value) in self._entries:
+            if xmin <= x <= xmax and ymin <= y <= ymax:
+                if prepared.contains(point):
+                    return value
+        return None
+
+
+def find_payment_zone(location, domain):
+    """
+    Find number of the payment zone of given location.
+
+    If the location is in several zones, the highest number is
+    returned, like the database query in `get_payment_zone` does.
+
+    :type location: django.contrib.gis.geos.Point|None
+    :type domain: parkings.models.EnforcementDomain
+    :rtype: int|None
+    """
+    if location is None:
+        return None
+    return _get_index(PaymentZone, domain).find(location)
+
+
+def find_permit_area(location, domain):
+    """
+    Find the permit area of given location.
+
+    :type location: django.contrib.gis.geos.Point|None
+    :type domain: parkings.models.EnforcementDomain
+    :rtype: parkings.models.PermitArea|None
+    """
+    if location is None:
+        return None
+    return _get_index(PermitArea, domain).find(location)
+
+
+def invalidate():
+    """
+    Invalidate the indexes in this and all other processes.
+    """
+    with _state.lock:
+        _state.clear()
+    cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+class _IndexState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.indexes = {}
+        self.version = None
+        self.checked_at = None
+        self.built_at = None
+
+
+_state = _IndexState()
+
+
+def _get_index(model, domain):
+    key = (model, domain.pk)
+    with _state.lock:
+        _check_version()
+        index = _state.indexes.get(key)
+        if index is None:
+            index = _state.indexes[key] = _build_index(model, domain)
+        return index
+
+
+def _check_version():
+    now = time.monotonic()
+    check_interval = _get_seconds_setting(
+        "PARKKIHUBI_SPATIAL_INDEX_CHECK_INTERVAL", 5)
+    max_age = _get_seconds_setting("PARKKIHUBI_SPATIAL_INDEX_MAX_AGE", 3600)
+
+    if _state.checked_at is not None:
+        if now - _state.built_at > max_age:
+            _state.clear()
+        elif now - _state.checked_at < check_interval:
+            return
+
+    version = cache.get(VERSION_CACHE_KEY)
+    if _state.checked_at is None or version != _state.version:
+        _state.indexes = {}
+        _state.version = version
+        _state.built_at = now
+    _state.checked_at = now
+
+
+def _build_index(model, domain):
+    if model is PaymentZone:
+        zones = PaymentZone.objects.filter(domain=domain).order_by("-number")
+        return SpatialIndex((x.geom, x.number) for x in zones)
+    else:
+        assert model is PermitArea
+        areas = PermitArea.objects.filter(domain=domain).order_by("identifier")
+        return SpatialIndex((x.geom, x) for x in areas)
+
+
+def _get_seconds_setting(name, default):
+    value = getattr(settings, name, None)
+    if value is None:
+        return default
+    assert isinstance(value, datetime.timedelta)
+    return value.total_seconds()
+
+
+@receiver(post_save, sender=PaymentZone)
+@receiver(post_delete, sender=PaymentZone)
+@receiver(post_save, sender=PermitArea)
+@receiver(post_delete, sender=PermitArea)
+def _invalidate_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate, using=kwargs.get("using"))
@@ -2,24 +2,29 @@
 
 import datetime
 import json
+import time
 
 import pytest
 from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.core.serializers.json import DjangoJSONEncoder
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
 
-from parkings.api.monitoring.region import WGS84_SRID
+from parkings import parking_check_buffer, spatial_index
+from parkings.api.enforcement.check_parking import (
+    evaluate_parking_check, evaluate_parking_checks)
 from parkings.factories import EnforcerFactory
 from parkings.factories.parking import create_payment_zone
 from parkings.factories.permit import create_permit_series
 from parkings.models import ParkingCheck, Permit, PermitArea
-from parkings.models.constants import GK25FIN_SRID
+from parkings.models.constants import GK25FIN_SRID, WGS84_SRID
 from parkings.tests.api.utils import check_required_fields
 
 from ...utils import approx
 
 list_url = reverse("enforcement:v1:check_parking")
+batch_url = reverse("enforcement:v1:check_parking_batch")
 
 
 PARKING_DATA = {
@@ -335,3 +340,230 @@ def test_enforcer_can_view_only_own_permit(enforcer_api_client, staff_user, enfo
     assert response.status_code == HTTP_200_OK
     assert response.data["allowed"] is True
     assert response.data["end_time"] == end_time
+
+
+@pytest.fixture(params=[
+    "single_query",
+    "stepwise",
+    "single_query+spatial_index",
+    "stepwise+spatial_index",
+])
+def check_parking_mode(request, settings):
+    modes = request.param.split("+")
+    settings.PARKKIHUBI_CHECK_PARKING_SINGLE_QUERY = "single_query" in modes
+    settings.PARKKIHUBI_CHECK_PARKING_SPATIAL_INDEX = "spatial_index" in modes
+    spatial_index.invalidate()
+    return request.param
+
+
+def test_evaluation_modes_find_valid_parking(
+        check_parking_mode, enforcer, enforcer_api_client, parking_factory):
+    zone = create_payment_zone(domain=enforcer.enforced_domain)
+    parking = parking_factory(
+        registration_number="ABC-123", zone=zone, domain=zone.domain)
+
+    response = enforcer_api_client.post(list_url, data=PARKING_DATA)
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data["allowed"] is True
+    assert response.data["end_time"] == parking.time_end
+    assert response.data["location"] == {
+        "payment_zone": 1, "permit_area": None}
+    assert ParkingCheck.objects.get().found_parking == parking
+
+
+def test_evaluation_modes_find_valid_permit(
+        check_parking_mode, enforcer_api_client, staff_user):
+    create_permit_area(enforcer_api_client)
+    end_time = timezone.now() + datetime.timedelta(days=2)
+    create_permit(
+        domain=enforcer_api_client.enforcer.enforced_domain,
+        end_time=end_time)
+
+    response = enforcer_api_client.post(list_url, data=PARKING_DATA)
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data["allowed"] is True
+    assert response.data["end_time"] == end_time
+    assert response.data["location"] == {
+        "payment_zone": None, "permit_area": "A"}
+    assert ParkingCheck.objects.get().found_parking is None
+
+
+def test_evaluation_modes_return_parking_within_grace_period(
+        check_parking_mode, enforcer, enforcer_api_client, parking_factory):
+    zone = create_payment_zone(domain=enforcer.enforced_domain)
+    now = timezone.now()
+    parking = parking_factory(
+        registration_number="ABC-123", zone=zone, domain=zone.domain,
+        time_start=(now - datetime.timedelta(hours=1)),
+        time_end=(now - datetime.timedelta(minutes=5)))
+
+    response = enforcer_api_client.post(
+        list_url, data=dict(PARKING_DATA, time=now))
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data["allowed"] is False
+    assert response.data["end_time"] == parking.time_end
+    assert ParkingCheck.objects.get().found_parking == parking
+
+
+def test_evaluation_modes_reject_parking_of_higher_zone(
+        check_parking_mode, enforcer, enforcer_api_client, parking_factory):
+    domain = enforcer.enforced_domain
+    create_payment_zone(domain=domain, number=1, code="1")
+    zone_2 = create_payment_zone(
+        domain=domain, number=2, code="2",
+        geom=create_area_geom(geom=GEOM_2))
+    parking_factory(registration_number="ABC-123", zone=zone_2, domain=domain)
+
+    response = enforcer_api_client.post(list_url, data=PARKING_DATA)
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data["allowed"] is False
+    assert response.data["location"]["payment_zone"] == 1
+
+
+def test_single_query_evaluation_does_one_query(
+        enforcer, parking_factory, django_assert_num_queries):
+    domain = enforcer.enforced_domain
+    zone = create_payment_zone(domain=domain)
+    parking = parking_factory(
+        registration_number="ABC-123", zone=zone, domain=domain)
+    location = Point(24.9, 60.2, srid=WGS84_SRID).transform(
+        GK25FIN_SRID, clone=True)
+
+    with django_assert_num_queries(1):
+        result = evaluate_parking_check(
+            "ABC-123", location, timezone.now(), domain)
+
+    assert result == (1, None, True, parking.id, parking.time_end)
+
+
+@pytest.fixture
+def buffered_checks(settings):
+    settings.PARKKIHUBI_PARKING_CHECK_BUFFERING = True
+    settings.PARKKIHUBI_PARKING_CHECK_BUFFER_SIZE = 3
+    settings.PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_DELAY = (
+        datetime.timedelta(hours=1))
+    yield parking_check_buffer.default_buffer
+    parking_check_buffer.default_buffer.stop()
+
+
+def test_buffered_checks_are_written_in_bulk(
+        buffered_checks, enforcer_api_client):
+    for _ in range(2):
+        response = enforcer_api_client.post(list_url, data=PARKING_DATA)
+        assert response.status_code == HTTP_200_OK
+
+    assert ParkingCheck.objects.count() == 0
+    assert len(buffered_checks) == 2
+
+    response = enforcer_api_client.post(list_url, data=PARKING_DATA)
+
+    assert response.status_code == HTTP_200_OK
+    # The full buffer is written by the background thread
+    deadline = time.monotonic() + 10
+    while ParkingCheck.objects.count() < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert ParkingCheck.objects.count() == 3
+    assert len(buffered_checks) == 0
+    assert buffered_checks.stats["last_flush_lag"] >= 0.0
+
+
+def test_buffered_checks_are_written_on_stop(
+        buffered_checks, enforcer_api_client):
+    response = enforcer_api_client.post(list_url, data={
+        "registration_number": "XYZ-555",
+        "location": {"longitude": 24.9, "latitude": 60.2},
+    })
+    assert ParkingCheck.objects.count() == 0
+    stopped_at = timezone.now()
+
+    buffered_checks.stop()
+
+    recorded_check = ParkingCheck.objects.get()
+    assert recorded_check.registration_number == "XYZ-555"
+    # The creation time is the time of the check, not of the write
+    assert recorded_check.created_at < stopped_at
+    assert recorded_check.result == json.loads(json.dumps(
+        response.data, cls=DjangoJSONEncoder))
+
+
+def test_batch_results_are_in_order_and_match_single_checks(
+        check_parking_mode, enforcer, enforcer_api_client, parking_factory):
+    domain = enforcer.enforced_domain
+    zone = create_payment_zone(domain=domain)
+    parking = parking_factory(
+        registration_number="ABC-123", zone=zone, domain=domain)
+    now = timezone.now()
+    checks = [
+        dict(PARKING_DATA, time=now),
+        dict(PARKING_DATA, registration_number="XYZ-555", time=now),
+        dict(PARKING_DATA, registration_number="abc123", time=now),
+    ]
+
+    response = enforcer_api_client.post(batch_url, data={"checks": checks})
+
+    assert response.status_code == HTTP_200_OK
+    results = response.data["results"]
+    assert [x["allowed"] for x in results] == [True, False, True]
+    assert results[0]["end_time"] == parking.time_end
+    for (check, result) in zip(checks, results):
+        single_response = enforcer_api_client.post(list_url, data=check)
+        assert single_response.data == result
+    recorded_checks = ParkingCheck.objects.order_by("id")[:len(checks)]
+    assert [x.registration_number for x in recorded_checks] == [
+        x["registration_number"] for x in checks]
+    assert [x.found_parking for x in recorded_checks] == [
+        parking, None, parking]
+
+
+def test_batch_evaluation_does_one_query(
+        enforcer, parking_factory, django_assert_num_queries):
+    domain = enforcer.enforced_domain
+    zone = create_payment_zone(domain=domain)
+    parking = parking_factory(
+        registration_number="ABC-123", zone=zone, domain=domain)
+    location = Point(24.9, 60.2, srid=WGS84_SRID).transform(
+        GK25FIN_SRID, clone=True)
+    now = timezone.now()
+    checks = [("ABC-123", location, now), ("XYZ-555", location, now)] * 5
+
+    with django_assert_num_queries(1):
+        results = evaluate_parking_checks(checks, domain)
+
+    assert results == [
+        (1, None, True, parking.id, parking.time_end),
+        (1, None, False, None, None),
+    ] * 5
+
+
+def test_batch_checks_are_recorded(enforcer_api_client):
+    data = {"checks": [PARKING_DATA, INVALID_PARKING_DATA, PARKING_DATA]}
+
+    response = enforcer_api_client.post(batch_url, data=data)
+
+    assert response.status_code == HTTP_200_OK
+    assert len(response.data["results"]) == 3
+    assert ParkingCheck.objects.count() == 3
+
+
+@pytest.mark.parametrize("checks", [[], [PARKING_DATA] * 3])
+def test_batch_size_is_validated(enforcer_api_client, settings, checks):
+    settings.PARKKIHUBI_CHECK_PARKING_BATCH_MAX_SIZE = 2
+
+    response = enforcer_api_client.post(batch_url, data={"checks": checks})
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+    assert "checks" in response.data
+    assert ParkingCheck.objects.count() == 0
+
+
+def test_batch_checks_are_validated(enforcer_api_client):
+    data = {"checks": [PARKING_DATA, {"registration_number": "ABC-123"}]}
+
+    response = enforcer_api_client.post(batch_url, data=data)
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+    assert ParkingCheck.objects.count() == 0
@@ -1,7 +1,11 @@
+import base64
+import json
 from datetime import datetime, timezone
 
 import pytest
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.status import (
     HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN)
@@ -214,6 +218,34 @@ def test_time_filtering(operator, enforcer_api_client, parking_factory, name, en
     check_response_objects(response, expected_parkings)
 
 
+@pytest.mark.parametrize('time,expected_count', [
+    ('2016-01-01T12:00:00Z', 2),  # Valid parkings
+    ('2016-01-01T12:10:00Z', 1),  # Last parking within grace duration
+    ('2016-01-01T13:00:00Z', 0),  # No parkings
+])
+def test_plate_lookup_query_count(enforcer_api_client, parking_factory, enforcer, time, expected_count):
+    parking_factory.create_batch(
+        2, registration_number='ABC-123', domain=enforcer.enforced_domain,
+        time_start=datetime(2016, 1, 1, 11, 0, 0, tzinfo=UTC),
+        time_end=datetime(2016, 1, 1, 12, 0, 0, tzinfo=UTC))
+
+    def get_parking_queries(url):
+        with CaptureQueriesContext(connection) as context:
+            data = get(enforcer_api_client, url)
+        parking_queries = [
+            x for x in context.captured_queries
+            if '"parkings_parking"' in x['sql']]
+        return (data, parking_queries)
+
+    (data, parking_queries) = get_parking_queries(list_url_for_abc + '&time=' + time)
+    assert len(data['results']) == data['count'] == expected_count
+    assert len(parking_queries) == 2  # Count and page
+
+    (data, parking_queries) = get_parking_queries(list_url_for_abc + '&time=' + time + '&count=false')
+    assert len(data['results']) == expected_count
+    assert len(parking_queries) == 1
+
+
 @pytest.mark.parametrize('parking_type', ALL_PARKING_KINDS)
 @override_settings(PARKKIHUBI_NONE_END_TIME_REPLACEMENT='2030-12-31T23:59:59Z')
 def test_null_time_end_is_replaced_correctly(parking_type, enforcer_api_client, parking, disc_parking, enforcer):
@@ -289,3 +321,77 @@ def test_endpoint_returns_parkings_with_same_zone_code_in_correct_domain(
     parking_data_2 = data_2['results'][0]
     assert parking_data_2['id'] == str(parking_2.id)
     assert parking_data_2['zone'] == 'Z'
+
+
+def test_cursor_pagination(enforcer_api_client, parking_factory, enforcer):
+    now = datetime.now(tz=UTC)
+    parkings = parking_factory.create_batch(
+        5, registration_number='ABC-123', domain=enforcer.enforced_domain,
+        time_start=now, time_end=None)
+    parkings += parking_factory.create_batch(
+        4, registration_number='ABC-123', domain=enforcer.enforced_domain,
+        time_start=now, time_end=datetime(2099, 1, 1, tzinfo=UTC))
+    expected_ids = (
+        sorted([str(x.id) for x in parkings[:5]], reverse=True) +
+        sorted([str(x.id) for x in parkings[5:]], reverse=True))
+
+    ids = []
+    url = list_url_for('ABC-123') + '&pagination=cursor&page_size=2'
+    while url:
+        data = get(enforcer_api_client, url)
+        assert set(data.keys()) == {'next', 'previous', 'results'}
+        ids.extend(x['id'] for x in data['results'])
+        url = data['next']
+
+    assert ids == expected_ids
+
+
+def test_cursor_pagination_orders_by_indexed_columns(
+        enforcer_api_client, parking_factory, enforcer):
+    parking_factory.create_batch(
+        3, registration_number='ABC-123', domain=enforcer.enforced_domain,
+        time_end=None)
+    data = get(enforcer_api_client, list_url_for('ABC-123') + '&pagination=cursor&page_size=1')
+
+    with CaptureQueriesContext(connection) as context:
+        get(enforcer_api_client, data['next'])
+
+    ordering_sql = 'ORDER BY "parkings_parking"."time_end" DESC, "parkings_parking"."id" DESC LIMIT 2'
+    (sql,) = [x['sql'] for x in context.captured_queries if x['sql'].endswith(ordering_sql)]
+    assert 'COALESCE' not in sql
+    assert '"parkings_parking"."time_end" IS NOT NULL' in sql
+
+
+def test_invalid_cursor(enforcer_api_client):
+    get(enforcer_api_client, list_url_for('ABC-123') + '&cursor=foo', status_code=404)
+
+
+@pytest.mark.parametrize('position', [
+    ['2020-01-01T00:00:00+00:00'],
+    ['foo', '2ec4ee40-9d2e-4b2c-9d3a-bc4c1ea71d6b'],
+    ['2020-01-01T00:00:00+00:00', 'foo'],
+    ['2020-01-01T00:00:00+00:00', None],
+    [{'a': 1}, [1]],
+    {'time_end': None},
+])
+def test_invalid_cursor_values(enforcer_api_client, position):
+    cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+    url = list_url_for('ABC-123') + '&cursor=' + cursor
+    get(enforcer_api_client, url, status_code=404)
+
+
+def test_pagination_without_count(enforcer_api_client, parking_factory, enforcer):
+    parking_factory.create_batch(
+        3, registration_number='ABC-123', domain=enforcer.enforced_domain)
+
+    data = get(enforcer_api_client, list_url_for('ABC-123') + '&count=false&page_size=2')
+    check_list_endpoint_base_fields(data)
+    assert data['count'] is None
+    assert len(data['results']) == 2
+    assert data['previous'] is None
+
+    data = get(enforcer_api_client, data['next'])
+    assert data['count'] is None
+    assert len(data['results']) == 1
+    assert data['next'] is None
+    assert data['previous'] is not None
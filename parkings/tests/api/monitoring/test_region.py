@@ -1,5 +1,8 @@
 import json
 
+from django.contrib.gis.geos import MultiPolygon
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 
@@ -75,3 +78,47 @@ def test_monitor_can_view_only_regions_in_their_domain(monitoring_api_client, re
     visible_region.save()
     result = monitoring_api_client.get(list_url)
     assert result.data['count'] == 1
+
+
+def test_get_regions_with_geometry_detail(monitoring_api_client, region_factory):
+    region = region_factory(domain=monitoring_api_client.monitor.domain)
+    region.geom = MultiPolygon(region.geom[0].buffer(10), srid=region.geom.srid)
+    region.save()
+
+    def get_coordinates(**params):
+        result = monitoring_api_client.get(list_url, params)
+        assert result.status_code == status.HTTP_200_OK
+        return result.data['features'][0]['geometry']['coordinates']
+
+    full = get_coordinates()
+    assert get_coordinates(geometry_detail='full') == full
+    low = get_coordinates(geometry_detail='low')
+    assert low == tuples_to_lists(region.geom_wgs84_low.coords)
+    assert len(low[0][0]) < len(full[0][0])
+
+    result = monitoring_api_client.get(list_url, {'geometry_detail': 'tiny'})
+    assert result.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'geometry_detail' in result.data
+
+
+def test_get_regions_uses_constant_number_of_queries(
+        monitoring_api_client, region_factory, parking_area_factory):
+    domain = monitoring_api_client.monitor.domain
+    regions = region_factory.create_batch(5, domain=domain)
+    areas = [parking_area_factory(geom=region.geom) for region in regions]
+
+    def count_queries(page_size):
+        with CaptureQueriesContext(connection) as context:
+            result = monitoring_api_client.get(list_url, {'page_size': page_size})
+        assert result.status_code == status.HTTP_200_OK
+        assert len(result.data['features']) == page_size
+        return len(context.captured_queries)
+
+    assert count_queries(1) == count_queries(5)
+
+    result = monitoring_api_client.get(list_url)
+    parking_areas_by_region = {
+        feature['id']: feature['properties']['parking_areas']
+        for feature in result.data['features']}
+    for (region, area) in zip(regions, areas):
+        assert area.id in parking_areas_by_region[str(region.id)]
@@ -1,4 +1,6 @@
+import pytest
 import pytz
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 
@@ -9,6 +11,13 @@ from ...utils import create_parkings_and_regions, intersects
 list_url = reverse('monitoring:v1:regionstatistics-list')
 
 
+@pytest.fixture(autouse=True, params=[False, True], ids=['counted', 'occupancy'])
+def count_source(request):
+    with override_settings(
+            PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY=request.param):
+        yield request.param
+
+
 def test_empty(monitoring_api_client):
     result = monitoring_api_client.get(list_url)
     assert result.data == {
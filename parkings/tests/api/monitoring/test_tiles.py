@@ -0,0 +1,235 @@
+import struct
+
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.status import (
+    HTTP_200_OK, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND)
+
+from parkings.api.monitoring.tiles import CONTENT_TYPE, render_tile
+from parkings.factories import (
+    ParkingAreaFactory, ParkingFactory, RegionFactory)
+from parkings.models import Region
+
+from ..utils import ALL_METHODS, check_method_status_codes
+
+TILE_KINDS = ['region', 'parkingarea', 'valid_parking']
+
+WEB_MERCATOR_HALF_SIZE = 20037508.342789244
+
+
+def tile_url(kind, z, x, y):
+    return reverse('monitoring:v1:{}-tile'.format(kind), kwargs={
+        'z': z, 'x': x, 'y': y})
+
+
+def get_tile_of(location, zoom=14):
+    """
+    Get (z, x, y) of the tile containing given location.
+    """
+    point = location.transform(3857, clone=True)
+    size = 2 * WEB_MERCATOR_HALF_SIZE / 2**zoom
+    x = int((point.x + WEB_MERCATOR_HALF_SIZE) // size)
+    y = int((WEB_MERCATOR_HALF_SIZE - point.y) // size)
+    return (zoom, x, y)
+
+
+def decode_tile(data):
+    """
+    Decode the features of a vector tile.
+
+    :returns: Dict of layer names to lists of feature attribute dicts
+    """
+    layers = {}
+    for (field, layer_data) in _iter_protobuf(data):
+        if field != 3:
+            continue
+        fields = list(_iter_protobuf(layer_data))
+        name = [x.decode() for (f, x) in fields if f == 1][0]
+        keys = [x.decode() for (f, x) in fields if f == 3]
+        values = [_decode_value(x) for (f, x) in fields if f == 4]
+        features = []
+        for (_f, feature_data) in [x for x in fields if x[0] == 2]:
+            tags = [
+                _decode_packed_varints(x)
+                for (f, x) in _iter_protobuf(feature_data) if f == 2]
+            tags = tags[0] if tags else []
+            features.append({
+                keys[tags[i]]: values[tags[i + 1]]
+                for i in range(0, len(tags), 2)})
+        layers[name] = features
+    return layers
+
+
+def _iter_protobuf(data):
+    pos = 0
+    while pos < len(data):
+        (key, pos) = _decode_varint(data, pos)
+        (field, wire_type) = (key >> 3, key & 7)
+        if wire_type == 0:
+            (value, pos) = _decode_varint(data, pos)
+        elif wire_type == 1:
+            (value, pos) = (data[pos:pos + 8], pos + 8)
+        elif wire_type == 2:
+            (length, pos) = _decode_varint(data, pos)
+            (value, pos) = (data[pos:pos + length], pos + length)
+        elif wire_type == 5:
+            (value, pos) = (data[pos:pos + 4], pos + 4)
+        else:
+            raise ValueError('Unsupported wire type {}'.format(wire_type))
+        yield (field, value)
+
+
+def _decode_varint(data, pos):
+    (result, shift) = (0, 0)
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return (result, pos)
+
+
+def _decode_packed_varints(data):
+    (values, pos) = ([], 0)
+    while pos < len(data):
+        (value, pos) = _decode_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def _decode_value(data):
+    ((field, value),) = _iter_protobuf(data)
+    if field == 1:
+        return value.decode()
+    elif field == 2:
+        return struct.unpack('<f', value)[0]
+    elif field == 3:
+        return struct.unpack('<d', value)[0]
+    elif field == 6:
+        return (value >> 1) ^ -(value & 1)
+    elif field == 7:
+        return bool(value)
+    return value
+
+
+def rect(x1, y1, x2, y2):
+    (x0, y0) = (25496000, 6673000)  # In the GK25FIN coordinates of Helsinki
+    return MultiPolygon(Polygon.from_bbox(
+        (x0 + x1, y0 + y1, x0 + x2, y0 + y2)), srid=3879)
+
+
+def create_parkings(domain, geom, count):
+    location = geom.centroid.transform(4326, clone=True)
+    for _ in range(count):
+        ParkingFactory(domain=domain, location=location)
+
+
+@pytest.mark.parametrize('kind', TILE_KINDS)
+def test_permission_checks(api_client, operator_api_client, kind):
+    url = tile_url(kind, 0, 0, 0)
+    check_method_status_codes(
+        api_client, [url], ALL_METHODS, HTTP_401_UNAUTHORIZED)
+    check_method_status_codes(
+        operator_api_client, [url], ALL_METHODS, HTTP_403_FORBIDDEN,
+        error_code='permission_denied')
+
+
+@pytest.mark.parametrize('kind', TILE_KINDS)
+def test_tile_of_data(monitoring_api_client, region, parking_area, parking, kind):
+    domain = monitoring_api_client.monitor.domain
+    parking_area.geom = region.geom
+    parking_area.domain = domain
+    parking_area.save()
+    region.domain = domain
+    region.save()
+    parking.location = region.geom.centroid.transform(4326, clone=True)
+    parking.domain = domain
+    parking.save()
+    obj = {'region': region, 'parkingarea': parking_area, 'valid_parking': parking}[kind]
+
+    tile = get_tile_of(parking.location)
+    result = monitoring_api_client.get(
+        tile_url(kind, *tile), {'time': parking.time_start.isoformat()})
+
+    assert result.status_code == HTTP_200_OK
+    assert result['Content-Type'] == CONTENT_TYPE
+    assert 'max-age=60' in result['Cache-Control']
+    assert 'private' in result['Cache-Control']
+    features = decode_tile(result.content)[kind.replace('parkingarea', 'parking_area')]
+    assert [x['id'] for x in features] == [str(obj.id)]
+    if kind != 'valid_parking':
+        assert features[0]['parking_count'] == 1
+
+
+@pytest.mark.parametrize('kind', ['region', 'parkingarea'])
+def test_tile_parking_counts(monitoring_api_client, kind):
+    domain = monitoring_api_client.monitor.domain
+    factory = {'region': RegionFactory, 'parkingarea': ParkingAreaFactory}[kind]
+    objs = [
+        factory(domain=domain, geom=rect(0, 0, 100, 100)),
+        factory(domain=domain, geom=rect(500, 0, 600, 100)),
+        factory(domain=domain, geom=rect(1000, 0, 1100, 100)),
+    ]
+    for (obj, count) in zip(objs, [2, 1, 0]):
+        create_parkings(domain, obj.geom, count)
+
+    tile = get_tile_of(objs[0].geom.centroid, zoom=10)
+    result = monitoring_api_client.get(tile_url(kind, *tile))
+
+    assert result.status_code == HTTP_200_OK
+    layer = kind.replace('parkingarea', 'parking_area')
+    counts = {x['id']: x['parking_count'] for x in decode_tile(result.content)[layer]}
+    assert counts == {str(objs[0].id): 2, str(objs[1].id): 1, str(objs[2].id): 0}
+
+
+@pytest.mark.parametrize('zoom', [0, 1, 4])
+@pytest.mark.parametrize('kind', TILE_KINDS)
+def test_low_zoom_tile(monitoring_api_client, kind, zoom):
+    domain = monitoring_api_client.monitor.domain
+    # Large enough to cover a few pixels of the tile even at zoom 0
+    geom = rect(-20000, -20000, 40000, 40000)
+    objs = {
+        'region': RegionFactory(domain=domain, geom=geom),
+        'parkingarea': ParkingAreaFactory(domain=domain, geom=geom),
+        'valid_parking': ParkingFactory(
+            domain=domain, location=geom.centroid.transform(4326, clone=True)),
+    }
+
+    tile = get_tile_of(objs['valid_parking'].location, zoom)
+    result = monitoring_api_client.get(tile_url(kind, *tile))
+
+    assert result.status_code == HTTP_200_OK
+    features = decode_tile(result.content)[kind.replace('parkingarea', 'parking_area')]
+    assert [x['id'] for x in features] == [str(objs[kind].id)]
+
+
+def test_render_tile_with_annotation_listed_first(monitoring_api_client):
+    domain = monitoring_api_client.monitor.domain
+    region = RegionFactory(domain=domain, name='Kamppi', geom=rect(0, 0, 100, 100))
+    create_parkings(domain, region.geom, 3)
+    regions = Region.objects.filter(pk=region.pk).with_parking_count(timezone.now())
+    attributes = [('count', 'parking_count'), ('name', 'name'), ('id', 'id')]
+
+    tile = render_tile(
+        regions, 'regions', 'geom', attributes,
+        *get_tile_of(region.geom.centroid, zoom=10))
+
+    assert decode_tile(tile) == {'regions': [
+        {'count': 3, 'name': 'Kamppi', 'id': str(region.id)}]}
+
+
+@pytest.mark.parametrize('kind', TILE_KINDS)
+def test_tile_without_data(monitoring_api_client, region, parking_area, parking, kind):
+    tile = get_tile_of(Point(-70.0, 40.0, srid=4326))
+    result = monitoring_api_client.get(tile_url(kind, *tile))
+    assert result.status_code == HTTP_200_OK
+    assert result.content == b''
+
+
+@pytest.mark.parametrize('z,x,y', [(0, 1, 0), (1, 0, 2), (23, 0, 0)])
+def test_invalid_tile(monitoring_api_client, z, x, y):
+    result = monitoring_api_client.get(tile_url('region', z, x, y))
+    assert result.status_code == HTTP_404_NOT_FOUND
@@ -1,4 +1,11 @@
+import csv
+import io
+import json
+from urllib.parse import urlencode
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.status import (
@@ -131,3 +138,86 @@ def test_monitor_can_view_only_parkings_from_their_domain(
     assert result_2.data['count'] == 1
     parking_feature_2 = result_2.data['features'][0]
     assert parking_feature_2['id'] == str(parking_2.id)
+
+
+def test_ndjson_export(monitoring_api_client, parking_factory):
+    domain = monitoring_api_client.monitor.domain
+    parkings = parking_factory.create_batch(3, domain=domain)
+    time = max(x.time_start for x in parkings)
+    valid = [x for x in parkings if x.time_end is None or x.time_end >= time]
+
+    result = monitoring_api_client.get(
+        list_url, data={'time': time.isoformat(), 'format': 'ndjson'})
+
+    assert result.status_code == 200
+    assert result['Content-Type'] == 'application/x-ndjson'
+    lines = b''.join(result.streaming_content).decode('utf-8').splitlines()
+    features = [json.loads(line) for line in lines]
+    assert len(features) == len(valid)
+    features_by_id = {x['id']: x for x in features}
+    for parking in valid:
+        check_parking_feature_shape(features_by_id[str(parking.id)])
+        check_parking_feature_matches_parking_object(
+            features_by_id[str(parking.id)], parking)
+
+
+def test_csv_export(monitoring_api_client, parking):
+    parking.domain = monitoring_api_client.monitor.domain
+    parking.save()
+
+    result = monitoring_api_client.get(
+        list_url, data={'time': parking.time_start.isoformat(), 'format': 'csv'})
+
+    assert result.status_code == 200
+    assert result['Content-Type'] == 'text/csv'
+    content = b''.join(result.streaming_content).decode('utf-8')
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert len(rows) == 1
+    assert rows[0]['id'] == str(parking.id)
+    assert float(rows[0]['longitude']) == parking.location.x
+    assert float(rows[0]['latitude']) == parking.location.y
+    assert rows[0]['registration_number'] == parking.registration_number
+    assert rows[0]['time_start'] == iso8601(parking.time_start)
+
+
+@pytest.mark.parametrize('export_format', ['ndjson', 'csv'])
+def test_export_requires_time(monitoring_api_client, export_format):
+    result = monitoring_api_client.get(list_url, data={'format': export_format})
+    assert result.status_code == 400
+    assert b'time' in result.content
+
+
+def test_export_uses_constant_number_of_queries(
+        monitoring_api_client, parking_factory):
+    domain = monitoring_api_client.monitor.domain
+    time = timezone.now()
+
+    def count_queries(parking_count):
+        parking_factory.create_batch(
+            parking_count, domain=domain, time_start=time, time_end=None)
+        with CaptureQueriesContext(connection) as context:
+            result = monitoring_api_client.get(
+                list_url, data={'time': time.isoformat(), 'format': 'ndjson'})
+            b''.join(result.streaming_content)
+        return len(context.captured_queries)
+
+    assert count_queries(1) == count_queries(10)
+
+
+def test_cursor_pagination(monitoring_api_client, parking_factory):
+    domain = monitoring_api_client.monitor.domain
+    time = timezone.now()
+    parkings = parking_factory.create_batch(
+        5, domain=domain, time_start=time, time_end=None)
+
+    ids = []
+    url = list_url + '?' + urlencode({
+        'time': time.isoformat(), 'cursor': '', 'page_size': 2})
+    while url:
+        result = monitoring_api_client.get(url)
+        assert result.status_code == 200
+        assert set(result.data.keys()) == {'type', 'next', 'previous', 'features'}
+        ids.extend(x['id'] for x in result.data['features'])
+        url = result.data['next']
+
+    assert ids == sorted(str(x.id) for x in parkings)
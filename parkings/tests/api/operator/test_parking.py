@@ -451,3 +451,62 @@ def test_zone_in_correct_domain_is_set_for_parking(operator_api_client, new_park
 
     assert new_parking_1.zone == zone_1
     assert new_parking_2.zone == zone_2
+
+
+def test_post_parkings_in_bulk(operator_api_client, operator, new_parking_data):
+    domain_1 = EnforcementDomain.get_default_domain()
+    domain_2 = EnforcementDomain.objects.create(code='ESP', name='Espoo')
+    zone_1 = create_payment_zone(code='3', number=3, domain=domain_1)
+    zone_2 = create_payment_zone(code='3', number=3, domain=domain_2)
+    parking_data_list = [
+        new_parking_data,
+        dict(new_parking_data, registration_number='ABC-123', domain='ESP'),
+        dict(new_parking_data, registration_number='XYZ-999', zone='3'),
+    ]
+
+    response_data = post(operator_api_client, list_url, parking_data_list)
+
+    assert len(response_data) == 3
+    for (parking_data, response_parking_data) in zip(parking_data_list, response_data):
+        check_response_parking_data(
+            dict(parking_data, zone=3), response_parking_data)
+        new_parking = Parking.objects.get(id=response_parking_data['id'])
+        check_parking_data_matches_parking_object(
+            dict(parking_data, zone=3), new_parking)
+        assert new_parking.operator == operator
+    parkings = [Parking.objects.get(id=x['id']) for x in response_data]
+    assert [x.zone for x in parkings] == [zone_1, zone_2, zone_1]
+    assert [x.normalized_reg_num for x in parkings] == [
+        'JLH247', 'ABC123', 'XYZ999']
+
+
+def test_post_parkings_in_bulk_validates_all_items(operator_api_client, new_parking_data):
+    create_payment_zone(code='3', number=3, domain=EnforcementDomain.get_default_domain())
+    parking_data_list = [
+        new_parking_data,
+        dict(new_parking_data, zone='4'),
+        dict(new_parking_data, time_end='2016-12-10T20:00:00Z'),
+        'not a parking',
+    ]
+
+    response = operator_api_client.post(list_url, parking_data_list)
+
+    assert response.status_code == 400
+    assert response.data[0] == {}
+    assert set(response.data[1]) == {'zone'}
+    assert set(response.data[2]) == {'non_field_errors'}
+    assert set(response.data[3]) == {'non_field_errors'}
+    assert Parking.objects.count() == 0
+
+
+@pytest.mark.parametrize('count', [0, 3])
+def test_post_parkings_in_bulk_checks_list_size(
+        operator_api_client, new_parking_data, settings, count):
+    settings.PARKKIHUBI_OPERATOR_PARKING_BATCH_MAX_SIZE = 2
+    create_payment_zone(code='3', number=3, domain=EnforcementDomain.get_default_domain())
+
+    response = operator_api_client.post(list_url, [new_parking_data] * count)
+
+    assert response.status_code == 400
+    assert 'non_field_errors' in response.data
+    assert Parking.objects.count() == 0
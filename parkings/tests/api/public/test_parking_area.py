@@ -74,3 +74,18 @@ def test_bounding_box_filter(api_client, parking_area_factory):
 
     data = get(api_client, list_url + '?in_bbox=80,80,85,85')
     assert data['count'] == 0
+
+
+def test_get_list_with_geometry_detail(api_client, parking_area):
+    parking_area.geom = MultiPolygon(
+        parking_area.geom[0].buffer(10), srid=parking_area.geom.srid)
+    parking_area.save()
+
+    full = get(api_client, list_url)['features'][0]['geometry']
+    medium = get(api_client, list_url + '?geometry_detail=medium')['features'][0]['geometry']
+    low = get(api_client, list_url + '?geometry_detail=low')['features'][0]['geometry']
+    assert full['type'] == medium['type'] == low['type'] == 'MultiPolygon'
+    assert len(low['coordinates'][0][0]) < len(full['coordinates'][0][0])
+    assert len(low['coordinates'][0][0]) <= len(medium['coordinates'][0][0])
+
+    get(api_client, list_url + '?geometry_detail=tiny', status_code=400)
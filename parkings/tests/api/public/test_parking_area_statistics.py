@@ -1,8 +1,13 @@
 from unittest.mock import patch
 
+import pytest
+from dateutil.parser import parse as parse_datetime
 from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.cache import cache
 from django.urls import reverse
+from django.utils import timezone
 
+from parkings.api.public.parking_area_statistics import SNAPSHOT_CACHE_KEY
 from parkings.models import Parking
 
 from ..utils import (
@@ -12,6 +17,13 @@ from ..utils import (
 list_url = reverse('public:v1:parkingareastatistics-list')
 
 
+@pytest.fixture(autouse=True)
+def clear_snapshot():
+    cache.delete(SNAPSHOT_CACHE_KEY)
+    yield
+    cache.delete(SNAPSHOT_CACHE_KEY)
+
+
 def get_detail_url(obj):
     return reverse('public:v1:parkingareastatistics-detail', kwargs={'pk': obj.pk})
 
@@ -24,7 +36,9 @@ def test_disallowed_methods(api_client, parking_area):
 
 def test_list_endpoint_base_fields(api_client):
     stats_data = get(api_client, list_url)
+    timestamp = stats_data.pop('timestamp')
     check_list_endpoint_base_fields(stats_data)
+    assert parse_datetime(timestamp) <= timezone.now()
 
 
 def test_get_list_check_data(api_client, parking_factory, parking_area_factory, history_parking_factory):
@@ -71,10 +85,36 @@ def test_get_detail_check_data(api_client, parking_factory, parking_area):
     with patch.object(Parking, 'get_closest_area', return_value=parking_area):
         parking_factory()
 
+    # Served from the snapshot until it expires
+    stats_data = get(api_client, get_detail_url(parking_area))
+    assert stats_data['current_parking_count'] == 0
+
+    cache.delete(SNAPSHOT_CACHE_KEY)
     stats_data = get(api_client, get_detail_url(parking_area))
     assert stats_data['current_parking_count'] == 4
 
 
+def test_statistics_are_served_from_snapshot(
+        api_client, parking_area_factory, django_assert_num_queries):
+    parking_area_factory.create_batch(3)
+    data = get(api_client, list_url)
+    assert data['count'] == 3
+
+    with django_assert_num_queries(0):
+        assert get(api_client, list_url) == data
+        assert get(api_client, list_url + '?page_size=2')['count'] == 3
+
+
+def test_get_detail_of_unknown_area(api_client, parking_area_factory):
+    area = parking_area_factory()
+    get(api_client, list_url)  # Take the snapshot
+    area.delete()
+
+    get(api_client, get_detail_url(area), status_code=200)
+    cache.delete(SNAPSHOT_CACHE_KEY)
+    get(api_client, get_detail_url(area), status_code=404)
+
+
 def test_bounding_box_filter(api_client, parking_area_factory):
     polygon_1 = Polygon([[10, 40], [20, 40], [20, 50], [10, 50], [10, 40]], srid=4326).transform(3879, clone=True)
     polygon_2 = Polygon([[30, 50], [40, 50], [40, 60], [30, 60], [30, 50]], srid=4326).transform(3879, clone=True)
@@ -25,3 +25,11 @@ register(MonitorFactory)
 def set_faker_random_seed():
     from parkings.factories.faker import fake
     fake.seed(777)
+
+
+@pytest.fixture
+def region_occupancy(settings):
+    """
+    Enable the upkeep and use of the region occupancy.
+    """
+    settings.PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY = True
@@ -1,14 +1,14 @@
 import datetime
 
 import pytest
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.test import override_settings
 from django.utils import timezone
 
 from parkings.factories import (
     CompleteHistoryParkingFactory, CompleteParkingFactory)
 from parkings.management.commands import archive_parkings
-from parkings.models import ArchivedParking, Parking
+from parkings.models import ArchivedParking, Parking, ParkingArchiveSlice
 from parkings.tests.utils import call_mgmt_cmd_with_output
 
 admin_timezone_override = override_settings(ADMIN_TIME_ZONE=None)
@@ -148,3 +148,59 @@ def test_archive_parkings_mgmt_cmd_dry_run(dry_run_enabled, expected_line):
     else:
         assert still_alive_parkings.count() == 0
         assert ArchivedParking.objects.count() == 10
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('workers', [1, 2])
+def test_archive_parkings_mgmt_cmd_with_workers(workers):
+    for age_in_days in [40, 50, 80, 200]:
+        time_end = timezone.now() - datetime.timedelta(days=age_in_days)
+        create_ended_parkings(5, time_end=time_end)
+    create_ongoing_parkings(5)
+
+    (result, stdout, stderr) = call_mgmt_cmd_with_output(
+        archive_parkings.Command, '-m1', '-v0', '--workers', workers)
+
+    assert "Archived 20 parkings" in stdout
+    assert ArchivedParking.objects.count() == 20
+    assert Parking.objects.count() == 5
+    slices = ParkingArchiveSlice.objects.all()
+    assert slices.incomplete().count() == 0
+    assert sum(x.archived_count for x in slices) == 20
+
+
+@pytest.mark.django_db
+def test_archive_parkings_mgmt_cmd_resume():
+    for age_in_days in [50, 80]:
+        time_end = timezone.now() - datetime.timedelta(days=age_in_days)
+        create_ended_parkings(5, time_end=time_end)
+    end_time = timezone.now() - datetime.timedelta(days=30)
+    slices = ParkingArchiveSlice.objects.create_run(
+        end_time, datetime.timedelta(days=7))
+    assert slices.count() > 1
+    # Simulate an interrupted run with only the first slice archived
+    assert slices.first().archive() == 5
+
+    (result, stdout, stderr) = call_mgmt_cmd_with_output(
+        archive_parkings.Command, '-v0', '--resume')
+
+    assert "Archived 5 parkings" in stdout
+    assert ArchivedParking.objects.count() == 10
+    assert Parking.objects.count() == 0
+    assert ParkingArchiveSlice.objects.last_run().incomplete().count() == 0
+
+    (result, stdout, stderr) = call_mgmt_cmd_with_output(
+        archive_parkings.Command, '-v0', '--resume')
+
+    assert "Nothing to resume" in stdout
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('args', [
+    ['--workers', '2', '--limit', '10', '-m1'],
+    ['--resume', '--dry-run'],
+    ['--workers', '2'],
+])
+def test_archive_parkings_mgmt_cmd_invalid_slice_args(args):
+    with pytest.raises(CommandError):
+        call_command(archive_parkings.Command(), *args)
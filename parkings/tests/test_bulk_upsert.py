@@ -0,0 +1,107 @@
+import os
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import MultiPolygon, Polygon
+
+from parkings.importers import PermitAreaImporter
+from parkings.importers.bulk_upsert import (
+    CREATED, UNCHANGED, UPDATED, BulkUpsert, UpsertResult)
+from parkings.models import EnforcementDomain, ParkingArea, PaymentZone
+
+mydir = os.path.dirname(__file__)
+permit_areas = os.path.join(mydir, 'geojson_permit_areas_importer_data.geojson')
+
+
+def rect(x1, y1, x2, y2, srid=None):
+    return MultiPolygon(Polygon.from_bbox(
+        (25496000 + x1, 6673000 + y1, 25496000 + x2, 6673000 + y2)),
+        srid=srid)
+
+
+def zone_values(domain, code, geom, name='Zone'):
+    return {
+        'domain_id': domain.pk,
+        'code': code,
+        'number': code,
+        'name': name,
+        'geom': geom,
+    }
+
+
+def make_zone_upsert():
+    return BulkUpsert(
+        PaymentZone, ['domain_id', 'code'], ['number', 'name', 'geom'])
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_creates_updates_and_skips():
+    domain = EnforcementDomain.get_default_domain()
+    upsert = make_zone_upsert()
+    assert upsert.add(zone_values(domain, '1', rect(0, 0, 10, 10))) == CREATED
+    assert upsert.add(zone_values(domain, '2', rect(0, 0, 20, 20))) == CREATED
+    assert upsert.save() == UpsertResult(created=2, updated=0, unchanged=0)
+    assert PaymentZone.objects.count() == 2
+    zone2 = PaymentZone.objects.get(code='2')
+
+    upsert = make_zone_upsert()
+    # Numbers are compared after converting them to the field type
+    assert upsert.add(
+        zone_values(domain, 1, rect(0, 0, 10, 10, srid=3879))) == UNCHANGED
+    assert upsert.add(zone_values(domain, '2', rect(0, 0, 30, 30))) == UPDATED
+    assert upsert.add(zone_values(domain, '3', rect(0, 0, 5, 5))) == CREATED
+    assert upsert.save() == UpsertResult(created=1, updated=1, unchanged=1)
+
+    assert PaymentZone.objects.count() == 3
+    updated = PaymentZone.objects.get(code='2')
+    assert updated.pk == zone2.pk
+    assert updated.geom.equals(rect(0, 0, 30, 30, srid=3879))
+    assert updated.modified_at > zone2.modified_at
+    assert set(upsert.get_pks()) == {(domain.pk, '1'), (domain.pk, '2'),
+                                     (domain.pk, '3')}
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_diff_compares_update_fields_only():
+    domain = EnforcementDomain.get_default_domain()
+    area = ParkingArea.objects.create(
+        origin_id='A1', domain=domain, geom=rect(0, 0, 10, 10, srid=3879),
+        capacity_estimate=5, name='Area')
+    upsert = BulkUpsert(
+        ParkingArea, ['origin_id'], ['geom', 'capacity_estimate'])
+    values = {
+        'origin_id': 'A1',
+        'domain_id': domain.pk,
+        'geom': rect(0, 0, 10, 10),
+        'capacity_estimate': 5,
+        'name': 'Other name',
+    }
+    assert upsert.diff(values) == UNCHANGED
+    assert upsert.diff(dict(values, capacity_estimate=6)) == UPDATED
+    assert upsert.diff(dict(values, origin_id='A2')) == CREATED
+
+    # Diffing doesn't add anything
+    assert upsert.save() == UpsertResult(created=0, updated=0, unchanged=0)
+
+    upsert.add(dict(values, geom=rect(0, 0, 15, 10)))
+    upsert.save()
+    area.refresh_from_db()
+    assert area.name == 'Area'
+    assert area.geom.equals(rect(0, 0, 15, 10, srid=3879))
+    assert area.geom_wgs84.equals_exact(
+        rect(0, 0, 15, 10, srid=3879).transform(4326, clone=True), 1e-9)
+
+
+@pytest.mark.django_db
+def test_geojson_permit_area_import_twice():
+    user = get_user_model().objects.create(username='TEST_USER')
+    importer = PermitAreaImporter()
+
+    first = importer._save_permit_areas(
+        importer.read_and_parse(permit_areas), user.username)
+    second = importer._save_permit_areas(
+        importer.read_and_parse(permit_areas), user.username)
+
+    assert first == UpsertResult(created=1, updated=0, unchanged=0)
+    assert second == UpsertResult(created=0, updated=0, unchanged=1)
+    assert user.allowed_permit_areas.count() == 1
@@ -2,8 +2,12 @@ import re
 
 import pytest
 from dateutil.parser import parse as parse_date
+from django.core.management import CommandError
 
+from parkings.factories import (
+    ParkingAreaFactory, ParkingFactory, RegionFactory)
 from parkings.management.commands import fill_parking_regions
+from parkings.models import Parking, Region
 
 from .utils import (
     call_mgmt_cmd_with_output, create_parkings_and_regions, intersects,
@@ -11,7 +15,7 @@ from .utils import (
 
 
 @pytest.mark.django_db
-def test_fill_parking_regions_mgmt_cmd():
+def test_fill_parking_regions_mgmt_cmd(region_occupancy):
     (parkings, regions) = create_parkings_and_regions()
 
     # Clear the regions
@@ -40,21 +44,32 @@ def test_fill_parking_regions_mgmt_cmd():
         else:
             assert parking.region is None
 
+    # Check that the region occupancy was updated
+    for parking in parkings:
+        if parking.region:
+            regions_qs = Region.objects.filter(pk=parking.region.pk)
+            time = parking.time_start
+            assert (
+                regions_qs.with_occupancy_count(time).get().parking_count ==
+                regions_qs.with_parking_count(time).get().parking_count)
+
     # Check the outputted lines
+    lines = stdout.splitlines()
     block_count = len(parkings) // target_block_size
-    for (n, line) in enumerate(stdout.splitlines(), 1):
+    filled_count = 0
+    for (n, line) in enumerate(lines, 1):
         match = re.match(
-            r'^Processing block +(\d+)/ *(\d+), size +(\d+), ([^.]*)(\.+)$',
+            r'^Processed block +(\d+)/ *(\d+), ([^:]*): (\d+) regions$',
             line)
         assert match, 'Invalid output line {}: {!r}'.format(n, line)
         assert match.group(1) == str(n)
         assert match.group(2) == str(block_count)
-        assert 0 <= int(match.group(3)) <= len(parkings)
-        (start_str, end_str) = match.group(4).split('--')
+        (start_str, end_str) = match.group(3).split('--')
         block_start = parse_date(start_str)
         block_end = parse_date(end_str)
         assert block_start <= block_end
-        assert len(match.group(5)) == len(regions) // 10
+        filled_count += int(match.group(4))
+    assert filled_count == len([x for x in parkings if x.region])
     assert stderr == ''
 
     # Check that the command doesn't do anything if all parkings with a
@@ -73,6 +88,73 @@ def test_fill_parking_regions_mgmt_cmd():
     assert stderr == ''
 
 
+def clear_regions_and_areas(parkings):
+    Parking.objects.filter(pk__in=[x.pk for x in parkings]).update(
+        region=None, parking_area=None)
+
+
+@pytest.mark.django_db
+def test_fill_parking_regions_mgmt_cmd_with_domain(enforcement_domain):
+    (parkings, regions) = create_parkings_and_regions(
+        parking_count=10, region_count=5)
+    other_region = RegionFactory(domain=enforcement_domain)
+    other_parking = ParkingFactory(domain=enforcement_domain)
+    other_parking.location = other_region.geom.centroid.transform(
+        other_parking.location.srid, clone=True)
+    other_parking.save()
+    assert other_parking.region == other_region
+    clear_regions_and_areas(parkings + [other_parking])
+
+    call_the_command('--domain', enforcement_domain.code)
+
+    other_parking.refresh_from_db()
+    assert other_parking.region == other_region
+    assert all(x.region is None for x in Parking.objects.exclude(
+        pk=other_parking.pk))
+
+
+@pytest.mark.django_db
+def test_fill_parking_regions_mgmt_cmd_with_parking_areas():
+    (parkings, regions) = create_parkings_and_regions(
+        parking_count=10, region_count=5)
+    areas = [
+        ParkingAreaFactory(geom=region.geom, domain=region.domain)
+        for region in regions]
+    expected = {}
+    for parking in Parking.objects.all():
+        parking.save()
+        expected[parking.pk] = (parking.region_id, parking.parking_area_id)
+    assert any(area_id for (_region_id, area_id) in expected.values())
+    assert {area_id for (_, area_id) in expected.values()} <= (
+        {x.id for x in areas} | {None})
+    clear_regions_and_areas(parkings)
+
+    (stdout, stderr) = call_the_command('--parking-areas')
+
+    assert 'parking areas' in stdout.splitlines()[0]
+    assert {
+        x.pk: (x.region_id, x.parking_area_id)
+        for x in Parking.objects.all()} == expected
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fill_parking_regions_mgmt_cmd_with_workers():
+    (parkings, regions) = create_parkings_and_regions(
+        parking_count=20, region_count=5)
+    expected = {x.pk: x.region_id for x in Parking.objects.all()}
+    clear_regions_and_areas(parkings)
+
+    call_the_command('4', '--workers', '2')
+
+    assert {x.pk: x.region_id for x in Parking.objects.all()} == expected
+
+
+@pytest.mark.django_db
+def test_fill_parking_regions_mgmt_cmd_with_unknown_domain():
+    with pytest.raises(CommandError):
+        call_the_command('--domain', 'UNKNOWN')
+
+
 def call_the_command(*args, **kwargs):
     (result, stdout, stderr) = call_mgmt_cmd_with_output(
         fill_parking_regions.Command, *args, **kwargs)
@@ -0,0 +1,83 @@
+import io
+import json
+import os
+
+import pytest
+from django.contrib.gis.geos import GEOSGeometry
+
+from parkings.utils.geojson import iter_features, make_geometry
+
+mydir = os.path.dirname(__file__)
+geojson_files = [
+    os.path.join(mydir, 'geojson_payment_zones_importer_data.geojson'),
+    os.path.join(mydir, 'geojson_permit_areas_importer_data.geojson'),
+]
+
+
+@pytest.mark.parametrize('filename', geojson_files)
+@pytest.mark.parametrize('chunk_size', [1, 7, 65536])
+def test_iter_features_matches_json_load(filename, chunk_size):
+    with open(filename, 'rt', encoding='utf-8') as file:
+        expected = json.load(file)['features']
+    with open(filename, 'rt', encoding='utf-8') as file:
+        features = list(iter_features(file, chunk_size=chunk_size))
+    assert features == expected
+
+
+def test_iter_features_skips_other_members():
+    text = (
+        ' { "type" : "FeatureCollection", "count": 12345,'
+        ' "bbox": [1.5e3, 2], "features" : [ {"a": 1} , {"b": [3.25]} ],'
+        ' "tail": "ignored"}')
+    features = iter_features(io.StringIO(text), chunk_size=2)
+    assert list(features) == [{'a': 1}, {'b': [3.25]}]
+
+
+def test_iter_features_is_incremental():
+    class UnreadableRest(io.StringIO):
+        def read(self, size=-1):
+            assert self.tell() < len(head), 'Read past the first feature'
+            return super().read(size)
+
+    head = '{"features": [{"id": 1}, '
+    file = UnreadableRest(head + 'x' * 1000)
+    features = iter_features(file, chunk_size=4)
+    assert next(features) == {'id': 1}
+
+
+@pytest.mark.parametrize('text, error', [
+    ('', 'Unexpected end of GeoJSON document'),
+    ('[]', 'Expecting "{" at 0'),
+    ('{}', 'No "features" array in the GeoJSON document'),
+    ('{"type": "Feature"}', 'No "features" array in the GeoJSON document'),
+    ('{"features": [{}', 'Unexpected end of GeoJSON document'),
+    ('{"features": [{} {}]}', 'Expecting "," or "]" at 17'),
+    ('{"features": [{"a": tru]}', 'Invalid GeoJSON'),
+])
+def test_iter_features_invalid(text, error):
+    with pytest.raises(ValueError) as excinfo:
+        list(iter_features(io.StringIO(text), chunk_size=3))
+    assert str(excinfo.value).startswith(error)
+
+
+@pytest.mark.parametrize('geometry', [
+    {'type': 'Polygon', 'coordinates': [
+        [[0, 0], [10, 0], [10, 10], [0, 0]],
+        [[1, 1], [2, 1], [2, 2], [1, 1]]]},
+    {'type': 'MultiPolygon', 'coordinates': [
+        [[[0, 0], [1.5, 0], [1.5, 1], [0, 0]]],
+        [[[5, 5], [6, 5], [6, 6.25], [5, 5]]]]},
+    {'type': 'Polygon', 'coordinates': [  # 3D is converted via GeoJSON
+        [[0, 0, 1], [10, 0, 1], [10, 10, 1], [0, 0, 1]]]},
+    {'type': 'Point', 'coordinates': [24.9, 60.2]},
+])
+def test_make_geometry(geometry):
+    expected = GEOSGeometry(json.dumps(geometry))
+
+    result = make_geometry(geometry)
+
+    assert result.geom_type == expected.geom_type
+    assert result.equals_exact(expected, 0)
+    assert result.hasz == expected.hasz
+    assert result.srid == 4326
+    assert make_geometry(geometry, srid=3879).srid == 3879
@@ -0,0 +1,140 @@
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+
+from parkings.factories import (
+    ParkingAreaFactory, ParkingFactory, RegionFactory)
+from parkings.geometry_changes import (
+    GeometryChange, GeometryChangeTracker, get_changed_areas,
+    get_geometry_changes, reassign_parking_areas, reassign_regions)
+from parkings.models import EnforcementDomain, Parking, ParkingArea, Region
+
+# Origin of the test geometries in the GK25FIN coordinates of Helsinki
+(X0, Y0) = (25496000, 6673000)
+
+
+def rect(x1, y1, x2, y2):
+    return MultiPolygon(Polygon.from_bbox(
+        (X0 + x1, Y0 + y1, X0 + x2, Y0 + y2)), srid=3879)
+
+
+def point(x, y):
+    return Point(X0 + x, Y0 + y, srid=3879).transform(4326, clone=True)
+
+
+def create_parking(domain, x, y):
+    parking = ParkingFactory(domain=domain)
+    parking.location = point(x, y)
+    parking.save()
+    return parking
+
+
+def test_get_geometry_changes():
+    old = {
+        'unchanged': (1, rect(0, 0, 10, 10)),
+        'modified': (1, rect(0, 0, 10, 10)),
+        'removed': (1, rect(0, 0, 10, 10)),
+        'moved': (1, rect(0, 0, 10, 10)),
+    }
+    new = {
+        'unchanged': (1, rect(0, 0, 10, 10)),
+        'modified': (1, rect(0, 0, 20, 10)),
+        'added': (2, rect(5, 5, 10, 10)),
+        'moved': (2, rect(0, 0, 10, 10)),
+    }
+
+    changes = get_geometry_changes(old, new)
+
+    assert changes == [
+        GeometryChange(2, None, new['added'][1]),
+        GeometryChange(1, old['modified'][1], new['modified'][1]),
+        GeometryChange(1, old['moved'][1], None),
+        GeometryChange(2, None, new['moved'][1]),
+        GeometryChange(1, old['removed'][1], None),
+    ]
+
+
+def test_get_changed_areas():
+    changes = [
+        GeometryChange(1, rect(0, 0, 10, 10), rect(0, 0, 20, 10)),
+        GeometryChange(1, rect(0, 0, 10, 10), rect(0, 0, 10, 10)),
+        GeometryChange(2, None, rect(0, 0, 5, 5)),
+    ]
+
+    areas = get_changed_areas(changes)
+
+    assert set(areas) == {1, 2}
+    assert areas[1].srid == 3879
+    assert areas[1].area == pytest.approx(100)
+    assert areas[1].equals(rect(10, 0, 20, 10))
+    assert areas[2].area == pytest.approx(25)
+
+    buffered = get_changed_areas(changes, buffer_distance=1)
+    assert buffered[1].contains(Point(X0 + 9.5, Y0 + 5, srid=3879))
+    assert not areas[1].contains(Point(X0 + 9.5, Y0 + 5, srid=3879))
+
+
+@pytest.mark.django_db
+def test_reassign_regions(region_occupancy):
+    domain = EnforcementDomain.get_default_domain()
+    region = RegionFactory(domain=domain, geom=rect(0, 0, 100, 100))
+    kept = create_parking(domain, 25, 50)
+    moved = create_parking(domain, 75, 50)
+    outside = create_parking(domain, 500, 50)
+    assert kept.region == region
+    assert moved.region == region
+    assert outside.region is None
+    time = moved.time_start
+    assert get_occupancy_count(region, time) == 2
+    # Stale region outside the changed area should not be touched
+    Parking.objects.filter(pk=outside.pk).update(region=region)
+
+    with GeometryChangeTracker(Region) as tracker:
+        region.geom = rect(0, 0, 50, 100)
+        region.save()
+        new_region = RegionFactory(domain=domain, geom=rect(50, 0, 100, 100))
+    assert len(tracker.changes) == 2
+
+    assert reassign_regions(tracker.changes) == 1
+
+    assert Parking.objects.get(pk=kept.pk).region == region
+    assert Parking.objects.get(pk=moved.pk).region == new_region
+    assert Parking.objects.get(pk=outside.pk).region == region
+    assert get_occupancy_count(region, time) == 1
+    assert get_occupancy_count(new_region, time) == 1
+
+
+@pytest.mark.django_db
+def test_reassign_regions_without_changes():
+    domain = EnforcementDomain.get_default_domain()
+    RegionFactory(domain=domain, geom=rect(0, 0, 100, 100))
+    create_parking(domain, 25, 50)
+
+    with GeometryChangeTracker(Region) as tracker:
+        pass
+
+    assert tracker.changes == []
+    assert reassign_regions(tracker.changes) == 0
+
+
+@pytest.mark.django_db
+def test_reassign_parking_areas():
+    domain = EnforcementDomain.get_default_domain()
+    area = ParkingAreaFactory(domain=domain, geom=rect(0, 0, 10, 10))
+    near = create_parking(domain, 20, 5)
+    far = create_parking(domain, 200, 5)
+    Parking.objects.filter(pk__in=[near.pk, far.pk]).update(
+        parking_area=None)
+
+    with GeometryChangeTracker(ParkingArea) as tracker:
+        area.geom = rect(0, 0, 15, 10)
+        area.save()
+
+    # The near parking is 5 meters from the changed area
+    assert reassign_parking_areas(tracker.changes) == 1
+    assert Parking.objects.get(pk=near.pk).parking_area == area
+    assert Parking.objects.get(pk=far.pk).parking_area is None
+
+
+def get_occupancy_count(region, time):
+    regions = Region.objects.filter(pk=region.pk)
+    return regions.with_occupancy_count(time).get().parking_count
@@ -1,12 +1,17 @@
 import datetime
 
 import pytest
-from django.contrib.gis.geos import Point
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 
+from parkings.factories.gis import generate_location
 from parkings.factories.parking import create_payment_zone
-from parkings.models import Operator, Parking, ParkingCheck, ParkingTerminal
+from parkings.models import (
+    ArchivedParking, EnforcementDomain, Operator, Parking, ParkingCheck,
+    ParkingTerminal, Region, RegionOccupancy, enforcement_domain)
 
 UTC = datetime.timezone.utc
 
@@ -173,3 +178,273 @@ def test_normalize_reg_num_function(reg_num, result):
 def test_zone_casted_code(code, result):
     zone = create_payment_zone(code=code)
     assert zone.casted_code == result
+
+
+@pytest.mark.django_db(transaction=True)
+def test_default_domain_is_cached(django_assert_num_queries):
+    domain = EnforcementDomain.get_default_domain()
+
+    with django_assert_num_queries(0):
+        assert EnforcementDomain.get_default_domain() == domain
+        assert EnforcementDomain.get_by_code(domain.code) == domain
+
+
+@pytest.mark.django_db(transaction=True)
+def test_domain_cache_is_invalidated_on_save_and_delete():
+    domain = EnforcementDomain.objects.create(code='TST', name='Test')
+    assert EnforcementDomain.get_by_code('TST').name == 'Test'
+
+    domain.name = 'Changed'
+    domain.save()
+    assert EnforcementDomain.get_by_code('TST').name == 'Changed'
+
+    domain.delete()
+    with pytest.raises(EnforcementDomain.DoesNotExist):
+        EnforcementDomain.get_by_code('TST')
+
+
+@pytest.mark.django_db
+def test_domain_created_in_rolled_back_transaction_is_not_cached():
+    domain = EnforcementDomain.get_default_domain()
+    assert EnforcementDomain.get_default_domain() == domain
+
+    # The test transaction is never committed, so nothing is cached
+    assert domain.code not in enforcement_domain._domains_by_code
+
+
+def make_parking(operator, zone, **kwargs):
+    kwargs.setdefault('location', generate_location())
+    kwargs.setdefault('registration_number', 'ABC-123')
+    return Parking(
+        operator=operator,
+        time_end=now() + datetime.timedelta(days=1),
+        time_start=now(),
+        zone=zone,
+        **kwargs
+    )
+
+
+@pytest.mark.django_db
+def test_create_in_bulk_resolves_fields_like_save(
+        admin_user, region_factory, parking_area_factory):
+    operator = Operator.objects.get_or_create(user=admin_user)[0]
+    domain = EnforcementDomain.get_default_domain()
+    zone = create_payment_zone(domain=domain)
+    region = region_factory(domain=domain)
+    area = parking_area_factory(domain=domain)
+    terminal = ParkingTerminal.objects.create(
+        number='T-1', name="Test terminal", location=generate_location())
+    locations = [generate_location(), None, None]
+
+    def make_parkings():
+        return [
+            make_parking(operator, zone, registration_number='abc 123',
+                         location=locations[0]),
+            make_parking(operator, zone, terminal_number='T-1',
+                         location=locations[1]),
+            make_parking(operator, zone, location=locations[2]),
+        ]
+
+    saved = make_parkings()
+    for parking in saved:
+        parking.save()
+    created = Parking.create_in_bulk(make_parkings())
+
+    fields = [
+        'domain_id', 'terminal_id', 'location', 'region_id',
+        'parking_area_id', 'normalized_reg_num']
+    for (saved_parking, created_parking) in zip(saved, created):
+        created_parking.refresh_from_db()
+        for field in fields:
+            assert (getattr(created_parking, field) ==
+                    getattr(saved_parking, field)), field
+    assert created[0].region == region
+    assert created[0].parking_area == area
+    assert created[0].normalized_reg_num == 'ABC123'
+    assert created[1].terminal == terminal
+    assert created[1].location == terminal.location
+    assert created[2].region is None
+    assert created[2].parking_area is None
+
+
+@pytest.mark.django_db
+def test_create_in_bulk_uses_constant_number_of_queries(
+        admin_user, region_factory):
+    operator = Operator.objects.get_or_create(user=admin_user)[0]
+    domain = EnforcementDomain.get_default_domain()
+    zone = create_payment_zone(domain=domain)
+    region = region_factory(domain=domain)
+    location = region.geom.centroid.transform(4326, clone=True)
+    ParkingTerminal.objects.create(
+        number='T-1', name="Test terminal", domain=domain)
+
+    def count_queries(parking_count):
+        parkings = [
+            make_parking(operator, zone, domain=domain, location=location,
+                         terminal_number='T-1')
+            for _ in range(parking_count)]
+        with CaptureQueriesContext(connection) as context:
+            Parking.create_in_bulk(parkings)
+        return len(context.captured_queries)
+
+    assert count_queries(1) == count_queries(20)
+    assert Parking.objects.count() == 21
+    assert Parking.objects.filter(region=region).count() == 21
+
+
+@pytest.mark.django_db
+def test_valid_at_matches_start_and_end_conditions(parking_factory):
+    t = now()
+    hour = datetime.timedelta(hours=1)
+    time_ranges = [
+        (t - hour, t + hour),
+        (t - hour, None),
+        (t, t),
+        (t - hour, t),
+        (t, t + hour),
+        (t + hour, None),
+        (t - 2 * hour, t - hour),
+        (t + hour, t - hour),  # Ends before it starts
+    ]
+    parkings = [
+        parking_factory(time_start=time_start, time_end=time_end)
+        for (time_start, time_end) in time_ranges]
+
+    valid = set(Parking.objects.valid_at(t))
+
+    assert valid == set(Parking.objects.starts_before(t).ends_after(t))
+    assert valid == set(parkings[:5])
+
+
+def get_occupancy_count(region, time):
+    regions = Region.objects.filter(pk=region.pk)
+    return regions.with_occupancy_count(time).get().parking_count
+
+
+@pytest.mark.django_db
+def test_region_occupancy_follows_parking_changes(
+        admin_user, region_factory, region_occupancy):
+    operator = Operator.objects.get_or_create(user=admin_user)[0]
+    domain = EnforcementDomain.get_default_domain()
+    zone = create_payment_zone(domain=domain)
+    region = region_factory(domain=domain)
+    location = region.geom.centroid.transform(4326, clone=True)
+    t = now()
+    hour = datetime.timedelta(hours=1)
+    microsecond = datetime.timedelta(microseconds=1)
+
+    parking = make_parking(
+        operator, zone, location=location, time_start=t, time_end=t + hour)
+    parking.save()
+    assert parking.region == region
+    assert get_occupancy_count(region, t - microsecond) == 0
+    assert get_occupancy_count(region, t) == 1
+    assert get_occupancy_count(region, t + hour) == 1
+    assert get_occupancy_count(region, t + hour + microsecond) == 0
+
+    parking.time_end = t + 2 * hour
+    parking.save()
+    assert get_occupancy_count(region, t + hour + microsecond) == 1
+    assert get_occupancy_count(region, t + 2 * hour + microsecond) == 0
+
+    other = make_parking(
+        operator, zone, location=location, time_start=t, time_end=None)
+    other.save()
+    assert get_occupancy_count(region, t) == 2
+    assert get_occupancy_count(region, t + 10 * hour) == 1
+
+    # Archived parkings are still counted
+    Parking.objects.get(pk=parking.pk).archive()
+    assert ArchivedParking.objects.filter(pk=parking.pk).exists()
+    assert get_occupancy_count(region, t) == 2
+
+    Parking.objects.get(pk=other.pk).delete()
+    assert get_occupancy_count(region, t) == 1
+    assert get_occupancy_count(region, t + 10 * hour) == 0
+
+
+@pytest.mark.django_db
+def test_region_occupancy_rebuild_matches_incremental_updates(
+        admin_user, region_factory, region_occupancy):
+    operator = Operator.objects.get_or_create(user=admin_user)[0]
+    domain = EnforcementDomain.get_default_domain()
+    zone = create_payment_zone(domain=domain)
+    region = region_factory(domain=domain)
+    location = region.geom.centroid.transform(4326, clone=True)
+    t = now()
+    hour = datetime.timedelta(hours=1)
+    time_ranges = [
+        (t, t + hour),
+        (t, t + 2 * hour),
+        (t + hour, None),
+        (t + hour, t + hour),
+        (t + 2 * hour, t),  # Ends before it starts
+    ]
+    parkings = Parking.create_in_bulk([
+        make_parking(operator, zone, location=location,
+                     time_start=time_start, time_end=time_end)
+        for (time_start, time_end) in time_ranges])
+    parkings[0].delete()
+    parkings[1].archive()
+    parkings[2].time_end = t + 3 * hour
+    parkings[2].save()
+
+    times = set(RegionOccupancy.objects.values_list('time', flat=True))
+    incremental_counts = {x: get_occupancy_count(region, x) for x in times}
+    RegionOccupancy.objects.rebuild()
+
+    microsecond = datetime.timedelta(microseconds=1)
+    assert RegionOccupancy.objects.count() == 5
+    assert times.issuperset(
+        RegionOccupancy.objects.values_list('time', flat=True))
+    assert incremental_counts == {
+        x: get_occupancy_count(region, x) for x in times}
+    assert [get_occupancy_count(region, x) for x in [
+        t, t + hour, t + hour + microsecond, t + 2 * hour + microsecond,
+        t + 3 * hour + microsecond]] == [1, 3, 2, 1, 0]
+
+
+@pytest.mark.django_db
+def test_region_occupancy_rebuild_is_done_per_region(
+        admin_user, region_factory, region_occupancy):
+    operator = Operator.objects.get_or_create(user=admin_user)[0]
+    domain = EnforcementDomain.get_default_domain()
+    zone = create_payment_zone(domain=domain)
+    regions = [
+        region_factory(domain=domain, geom=MultiPolygon(Polygon.from_bbox(
+            (25496000 + x, 6673000, 25496100 + x, 6673100)), srid=3879))
+        for x in [0, 1000]]
+    t = now()
+    hour = datetime.timedelta(hours=1)
+    for (n, region) in enumerate(regions, 1):
+        location = region.geom.centroid.transform(4326, clone=True)
+        Parking.create_in_bulk([
+            make_parking(operator, zone, location=location,
+                         time_start=t, time_end=t + hour)
+            for _ in range(n)])
+    RegionOccupancy.objects.filter(region=regions[0]).update(parking_count=5)
+
+    with CaptureQueriesContext(connection) as context:
+        assert RegionOccupancy.objects.rebuild() == 4
+
+    assert not any("LOCK TABLE" in x["sql"] for x in context.captured_queries)
+    assert [get_occupancy_count(x, t) for x in regions] == [1, 2]
+    assert [get_occupancy_count(x, t + 2 * hour) for x in regions] == [0, 0]
+
+
+@pytest.mark.django_db
+def test_region_occupancy_is_not_maintained_by_default(
+        admin_user, region_factory):
+    operator = Operator.objects.get_or_create(user=admin_user)[0]
+    domain = EnforcementDomain.get_default_domain()
+    zone = create_payment_zone(domain=domain)
+    region = region_factory(domain=domain)
+    location = region.geom.centroid.transform(4326, clone=True)
+
+    parking = make_parking(operator, zone, location=location)
+    parking.save()
+    Parking.create_in_bulk([make_parking(operator, zone, location=location)])
+    parking.delete()
+
+    assert Parking.objects.get().region == region
+    assert not RegionOccupancy.objects.exists()
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+from django.db import DatabaseError, IntegrityError
+
+from parkings.parking_check_buffer import ParkingCheckBuffer
+
+
+class FakeWriteBuffer(ParkingCheckBuffer):
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.written = []
+        self.writer_threads = set()
+
+    def _write(self, items):
+        self.writer_threads.add(threading.current_thread())
+        if self.failures:
+            self.failures -= 1
+            raise DatabaseError("Database is down")
+        self.written.extend(items)
+
+
+@pytest.fixture
+def buffer_settings(settings):
+    settings.PARKKIHUBI_PARKING_CHECK_BUFFER_SIZE = 3
+    settings.PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_RETAINED = 5
+    return settings
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_full_buffer_is_written_by_flusher_thread(buffer_settings):
+    buffer = FakeWriteBuffer()
+    try:
+        for n in range(3):
+            buffer.add(n)
+        wait_for(lambda: len(buffer.written) == 3)
+    finally:
+        buffer.stop()
+
+    assert buffer.written == [0, 1, 2]
+    assert threading.current_thread() not in buffer.writer_threads
+    assert buffer.stats["flushes"] == 1
+    assert buffer.stats["written"] == 3
+
+
+def test_failed_write_is_retained_and_retried(buffer_settings):
+    buffer = FakeWriteBuffer(failures=1)
+    buffer.min_retry_delay = 0.05
+    try:
+        for n in range(3):
+            buffer.add(n)
+        wait_for(lambda: buffer.written)
+    finally:
+        buffer.stop()
+
+    assert buffer.written == [0, 1, 2]
+    assert buffer.stats["lost"] == 0
+    assert buffer.stats["written"] == 3
+
+
+def test_oldest_records_beyond_max_retained_are_dropped(buffer_settings):
+    buffer = FakeWriteBuffer(failures=1)
+    buffer.add(0)
+    buffer.add(1)
+    buffer._stopped.set()  # Flush only explicitly
+
+    assert buffer.flush() == 0
+    assert len(buffer) == 2
+    for n in range(2, 6):
+        buffer.add(n)
+
+    assert len(buffer) == 5
+    assert buffer.stats["lost"] == 1
+    assert buffer.flush() == 5
+    assert buffer.written == [1, 2, 3, 4, 5]
+
+
+class InvalidItemBuffer(FakeWriteBuffer):
+    def _write(self, items):
+        if 'invalid' in items:
+            raise IntegrityError("Invalid item")
+        super()._write(items)
+
+
+def test_invalid_records_are_dropped_one_by_one(buffer_settings):
+    buffer = InvalidItemBuffer()
+    buffer._stopped.set()  # Flush only explicitly
+    for item in [0, 'invalid', 2]:
+        buffer.add(item)
+
+    assert buffer.flush() == 2
+
+    assert buffer.written == [0, 2]
+    assert len(buffer) == 0
+    assert buffer.stats["lost"] == 1
+    assert buffer.stats["written"] == 2
@@ -0,0 +1,134 @@
+import datetime
+
+import pytest
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+
+from parkings import partitioning
+from parkings.factories import ParkingCheckFactory, ParkingFactory
+from parkings.management.commands import create_parking_partitions
+from parkings.models import ArchivedParking, Parking
+from parkings.partitioning import (
+    archive_partitions, create_month_partitions, get_partitions)
+from parkings.tests.utils import call_mgmt_cmd_with_output
+
+UTC = datetime.timezone.utc
+
+JANUARY_2099 = datetime.datetime(2099, 1, 1, tzinfo=UTC)
+FEBRUARY_2099 = datetime.datetime(2099, 2, 1, tzinfo=UTC)
+MARCH_2099 = datetime.datetime(2099, 3, 1, tzinfo=UTC)
+
+
+def create_january_parkings(count, **kwargs):
+    time_start = JANUARY_2099 + datetime.timedelta(days=1)
+    kwargs.setdefault('time_end', time_start + datetime.timedelta(hours=2))
+    return ParkingFactory.create_batch(count, time_start=time_start, **kwargs)
+
+
+def get_row_count(table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM {}'.format(table))
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_tables_are_partitioned():
+    for model in [Parking, ArchivedParking]:
+        partitions = get_partitions(model)
+        assert [x.is_default for x in partitions] == [False, True]
+        legacy = partitions[0]
+        assert legacy.name == model._meta.db_table + '_legacy'
+        assert legacy.start is None
+        assert legacy.end is not None
+
+
+@pytest.mark.django_db
+def test_create_month_partitions():
+    create_january_parkings(3)
+
+    created = create_month_partitions(1, now=JANUARY_2099)
+
+    assert created == ['parkings_parking_y2099m01', 'parkings_parking_y2099m02']
+    by_name = {x.name: x for x in get_partitions(Parking)}
+    assert by_name['parkings_parking_y2099m01'].start == JANUARY_2099
+    assert by_name['parkings_parking_y2099m01'].end == FEBRUARY_2099
+    assert by_name['parkings_parking_y2099m02'].end == MARCH_2099
+    # The parkings were moved from the default partition
+    assert get_row_count('parkings_parking_y2099m01') == 3
+    assert get_row_count('parkings_parking_default') == 0
+    assert Parking.objects.count() == 3
+
+    assert create_month_partitions(1, now=JANUARY_2099) == []
+
+
+@pytest.mark.django_db
+def test_create_parking_partitions_mgmt_cmd():
+    (result, stdout, stderr) = call_mgmt_cmd_with_output(
+        create_parking_partitions.Command, '--months', '2')
+    (result, stdout2, stderr) = call_mgmt_cmd_with_output(
+        create_parking_partitions.Command, '--months', '2')
+
+    assert "Created partition parkings_parking_y" in stdout
+    assert stdout2 == "All partitions already exist\n"
+
+
+@pytest.mark.django_db
+def test_archive_partitions():
+    parkings = create_january_parkings(3)
+    check = ParkingCheckFactory(found_parking=parkings[0])
+    create_month_partitions(1, now=JANUARY_2099)
+
+    assert archive_partitions(MARCH_2099, dry_run=True) == [
+        ('parkings_parking_y2099m01', 3)]
+    assert Parking.objects.count() == 3
+
+    with CaptureQueriesContext(connection) as context:
+        assert archive_partitions(MARCH_2099) == [
+            ('parkings_parking_y2099m01', 3)]
+
+    assert not any('LOCK TABLE' in x['sql'] for x in context.captured_queries)
+    assert Parking.objects.count() == 0
+    archived = ArchivedParking.objects.order_by('id')
+    assert [x.id for x in archived] == sorted(x.id for x in parkings)
+    for archived_parking in archived:
+        assert archived_parking.archived_at is not None
+        assert archived_parking.sanitized_at is None
+    archived_partitions = [x.name for x in get_partitions(ArchivedParking)]
+    assert 'parkings_archivedparking_y2099m01' in archived_partitions
+    assert 'parkings_parking_y2099m01' not in [
+        x.name for x in get_partitions(Parking)]
+    check.refresh_from_db()
+    assert check.found_parking is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('case', ['ongoing', 'ends_late'])
+def test_archive_partitions_skips_partitions_with_recent_parkings(case):
+    create_january_parkings(2)
+    if case == 'ongoing':
+        create_january_parkings(1, time_end=None)
+    else:
+        create_january_parkings(1, time_end=MARCH_2099)
+    create_month_partitions(1, now=JANUARY_2099)
+
+    assert archive_partitions(MARCH_2099) == []
+    assert Parking.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_archive_partitions_reattaches_partition_on_failure(monkeypatch):
+    create_january_parkings(3)
+    create_month_partitions(1, now=JANUARY_2099)
+
+    def fail(*args, **kwargs):
+        raise DatabaseError('Failed')
+
+    monkeypatch.setattr(partitioning, '_add_archive_columns', fail)
+
+    with pytest.raises(DatabaseError):
+        archive_partitions(MARCH_2099)
+
+    assert 'parkings_parking_y2099m01' in [
+        x.name for x in get_partitions(Parking)]
+    assert Parking.objects.count() == 3
+    assert ArchivedParking.objects.count() == 0
@@ -0,0 +1,48 @@
+import datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from parkings.factories import ParkingFactory
+from parkings.models import Parking
+from parkings.utils.querysets import make_batches
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('batch_size', [1, 3, 4, 10, 11])
+def test_make_batches(batch_size):
+    now = timezone.now()
+    parkings = []
+    for n in range(10):
+        # Some of the parkings have the same end time
+        time_end = now - datetime.timedelta(hours=(n // 2))
+        parkings.append(ParkingFactory(time_end=time_end))
+    expected_ids = [
+        x.id for x in sorted(parkings, key=(lambda x: (x.time_end, x.id)))]
+
+    with CaptureQueriesContext(connection) as context:
+        batches = list(make_batches(Parking.objects.all(), batch_size, 'time_end'))
+    assert len(context.captured_queries) == 1
+
+    ids_by_batch = [[x.id for x in batch] for batch in batches]
+    assert [len(x) for x in ids_by_batch] == [
+        min(batch_size, 10 - i) for i in range(0, 10, batch_size)]
+    assert sum(ids_by_batch, []) == expected_ids
+
+
+@pytest.mark.django_db
+def test_make_batches_without_items():
+    assert list(make_batches(Parking.objects.all(), 5, 'time_end')) == []
+
+
+@pytest.mark.django_db
+def test_make_batches_with_null_values():
+    ParkingFactory(time_end=None)
+    ParkingFactory(time_end=timezone.now())
+
+    with pytest.raises(ValueError) as excinfo:
+        list(make_batches(Parking.objects.all(), 5, 'time_end'))
+
+    assert 'Found NULL values in order-by field (time_end)' in str(excinfo.value)
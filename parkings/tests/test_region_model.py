@@ -2,6 +2,7 @@ import pytest
 from django.contrib.gis.geos import MultiPolygon, Polygon
 
 from parkings.models import ParkingArea, Region
+from parkings.models.constants import WGS84_SRID
 
 
 def test_str():
@@ -71,3 +72,38 @@ def test_calculate_capacity_estimate():
 
     # And finally, check the result of the calculation is correct
     assert reg.calculate_capacity_estimate() == 12
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', [Region, ParkingArea])
+def test_wgs84_geometries_are_updated_on_save(model, region_factory, parking_area_factory):
+    factory = region_factory if model is Region else parking_area_factory
+    obj = model.objects.get(pk=factory().pk)
+    assert obj.geom_wgs84.equals_exact(obj.geom.transform(WGS84_SRID, clone=True), 1e-9)
+    for detail in ['medium', 'low']:
+        simplified = obj.get_wgs84_geometry(detail)
+        assert simplified.srid == WGS84_SRID
+        assert simplified.geom_type == 'MultiPolygon'
+        assert simplified.num_coords <= obj.geom_wgs84.num_coords
+
+    obj.geom = MultiPolygon(obj.geom[0].buffer(10), srid=obj.geom.srid)
+    obj.save(update_fields=['geom'])
+    assert obj.get_wgs84_geometry().equals_exact(obj.geom.transform(WGS84_SRID, clone=True), 1e-9)
+    obj.refresh_from_db()
+    assert obj.geom_wgs84.equals_exact(obj.geom.transform(WGS84_SRID, clone=True), 1e-9)
+    assert obj.geom_wgs84_low.num_coords < obj.geom_wgs84.num_coords
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model', [Region, ParkingArea])
+def test_wgs84_geometries_are_updated_by_queryset_update(
+        model, region_factory, parking_area_factory):
+    factory = region_factory if model is Region else parking_area_factory
+    obj = factory()
+    geom = MultiPolygon(obj.geom[0].buffer(10), srid=obj.geom.srid)
+
+    model.objects.filter(pk=obj.pk).update(geom=geom)
+
+    obj.refresh_from_db()
+    assert obj.geom_wgs84.equals_exact(geom.transform(WGS84_SRID, clone=True), 1e-9)
+    assert obj.geom_wgs84_low.num_coords < obj.geom_wgs84.num_coords
@@ -10,6 +10,7 @@ from parkings.factories import ArchivedParkingFactory
 from parkings.management.commands import sanitize_parkings
 from parkings.models import ArchivedParking
 from parkings.tests.utils import call_mgmt_cmd_with_output
+from parkings.utils.sanitizing import reset_sanitizing_session
 
 
 @pytest.mark.django_db
@@ -56,3 +57,47 @@ def test_sanitize_parkings_mgmt_cmd_confirm(choice, stdout_result):
     with mock.patch.object(builtins, 'input', lambda _: choice):
         (result, stdout, stderr) = call_mgmt_cmd_with_output(sanitize_parkings.Command, '--confirm')
         assert stdout.rstrip() == stdout_result
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('workers', [None, 2])
+def test_sanitize_parkings_mgmt_cmd_in_batches(workers):
+    parkings = ArchivedParkingFactory.create_batch(10)
+    parkings += ArchivedParkingFactory.create_batch(5, registration_number='ABC-123')
+    options = ['--workers', workers] if workers else []
+
+    (result, stdout, stderr) = call_mgmt_cmd_with_output(
+        sanitize_parkings.Command, '--batch-size', '4', *options)
+
+    assert stdout.splitlines() == [
+        "  ...sanitized 4 / 15 parkings",
+        "  ...sanitized 8 / 15 parkings",
+        "  ...sanitized 12 / 15 parkings",
+        "Sanitized 15 parkings.",
+    ]
+    sanitized = {x.id: x for x in ArchivedParking.objects.all()}
+    for parking in parkings:
+        sanitized_parking = sanitized[parking.id]
+        assert sanitized_parking.sanitized_at is not None
+        assert sanitized_parking.modified_at == parking.modified_at
+        assert sanitized_parking.registration_number.startswith('!')
+    same_reg_nums = {sanitized[x.id].registration_number for x in parkings[10:]}
+    assert len(same_reg_nums) == 1
+
+
+@pytest.mark.django_db
+def test_sanitize_in_bulk_matches_sanitize():
+    (parking1, parking2) = ArchivedParkingFactory.create_batch(
+        2, registration_number='XYZ-987')
+    reset_sanitizing_session(b'secret')
+    ArchivedParking.objects.get(pk=parking1.pk).sanitize()
+
+    reset_sanitizing_session(b'secret')
+    count = ArchivedParking.sanitize_in_bulk(
+        ArchivedParking.objects.filter(pk=parking2.pk))
+
+    assert count == 1
+    (sanitized1, sanitized2) = [
+        ArchivedParking.objects.get(pk=x.pk) for x in [parking1, parking2]]
+    assert sanitized1.registration_number == sanitized2.registration_number
+    assert sanitized1.normalized_reg_num == sanitized2.normalized_reg_num
@@ -0,0 +1,99 @@
+import datetime
+
+import pytest
+from django.contrib.gis.geos import Point
+
+from parkings import spatial_index
+from parkings.factories import EnforcementDomainFactory
+from parkings.factories.parking import create_payment_zone
+from parkings.models import PaymentZone, PermitArea
+from parkings.models.constants import GK25FIN_SRID, WGS84_SRID
+from parkings.tests.api.enforcement.test_check_parking import (
+    GEOM_2, create_area_geom)
+
+INSIDE = Point(24.9, 60.2, srid=WGS84_SRID).transform(GK25FIN_SRID, clone=True)
+OUTSIDE = Point(24.9, 60.4, srid=WGS84_SRID).transform(GK25FIN_SRID, clone=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_spatial_index():
+    spatial_index.invalidate()
+
+
+@pytest.fixture
+def domain():
+    return EnforcementDomainFactory()
+
+
+def create_permit_area(domain, identifier, geom=None):
+    return PermitArea.objects.create(
+        domain=domain, identifier=identifier, name=identifier,
+        geom=(geom or create_area_geom()))
+
+
+@pytest.mark.django_db
+def test_find_payment_zone_returns_highest_number(domain):
+    create_payment_zone(domain=domain, number=1, code="1")
+    create_payment_zone(domain=domain, number=3, code="3")
+    create_payment_zone(
+        domain=domain, number=5, code="5",
+        geom=create_area_geom(geom=GEOM_2))
+
+    assert spatial_index.find_payment_zone(INSIDE, domain) == 3
+    assert spatial_index.find_payment_zone(OUTSIDE, domain) is None
+    assert spatial_index.find_payment_zone(None, domain) is None
+
+
+@pytest.mark.django_db
+def test_find_payment_zone_is_domain_specific(domain):
+    create_payment_zone(domain=domain, number=2, code="2")
+    other_domain = EnforcementDomainFactory()
+
+    assert spatial_index.find_payment_zone(INSIDE, other_domain) is None
+    assert spatial_index.find_payment_zone(INSIDE, domain) == 2
+
+
+@pytest.mark.django_db
+def test_find_permit_area_returns_first_by_identifier(domain):
+    create_permit_area(domain, "B")
+    area_a = create_permit_area(domain, "A")
+
+    assert spatial_index.find_permit_area(INSIDE, domain) == area_a
+    assert spatial_index.find_permit_area(OUTSIDE, domain) is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_index_is_invalidated_on_save_and_delete(
+        domain, django_assert_num_queries):
+    zone = create_payment_zone(domain=domain, number=1, code="1")
+    assert spatial_index.find_payment_zone(INSIDE, domain) == 1
+
+    with django_assert_num_queries(0):
+        assert spatial_index.find_payment_zone(INSIDE, domain) == 1
+
+    zone.number = 4
+    zone.save()
+    assert spatial_index.find_payment_zone(INSIDE, domain) == 4
+
+    zone.delete()
+    assert spatial_index.find_payment_zone(INSIDE, domain) is None
+
+    area = create_permit_area(domain, "A")
+    assert spatial_index.find_permit_area(INSIDE, domain) == area
+
+    area.geom = create_area_geom(geom=GEOM_2)
+    area.save()
+    assert spatial_index.find_permit_area(INSIDE, domain) is None
+
+
+@pytest.mark.django_db
+def test_index_is_rebuilt_when_shared_version_changes(domain, settings):
+    settings.PARKKIHUBI_SPATIAL_INDEX_CHECK_INTERVAL = datetime.timedelta(0)
+    create_payment_zone(domain=domain, number=1, code="1")
+    assert spatial_index.find_payment_zone(INSIDE, domain) == 1
+
+    # Simulate a change done in another process
+    PaymentZone.objects.filter(domain=domain).update(number=7)
+    spatial_index.cache.set(spatial_index.VERSION_CACHE_KEY, "changed")
+
+    assert spatial_index.find_payment_zone(INSIDE, domain) == 7
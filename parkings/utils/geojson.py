@@ -0,0 +1,184 @@
+"""
+Streaming parsing of GeoJSON files.
+
+A GeoJSON FeatureCollection is parsed one feature at a time, so that
+the memory needed for parsing is bounded by the size of the largest
+feature instead of the whole document.  The geometries of the features
+are converted to GEOS via WKB built from the coordinates, instead of
+serializing them back to JSON for GEOS to parse.
+"""
+import json
+import re
+import struct
+
+from django.contrib.gis.geos import GEOSGeometry
+
+WGS84_SRID = 4326
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+_WKB_POLYGON = 3
+_WKB_MULTIPOLYGON = 6
+
+
+def iter_features(file, chunk_size=65536):
+    """
+    Iterate the features of a GeoJSON FeatureCollection.
+
+    The members of the top level object other than "features" are
+    skipped.
+
+    :param file: File-like object opened in text mode
+    :param chunk_size: Number of characters to read at a time
+    :returns: Iterator of the features as dicts
+    :raises ValueError: if the document is not valid JSON or not an
+      object with a "features" array
+    """
+    reader = _StreamReader(file, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        raise ValueError('No "features" array in the GeoJSON document')
+    while True:
+        key = reader.decode_value()
+        reader.expect(':')
+        if key == 'features':
+            yield from _iter_array_items(reader)
+            return
+        reader.decode_value()  # Skip the value
+        if reader.next_char() != ',':
+            raise ValueError('No "features" array in the GeoJSON document')
+
+
+def make_geometry(geometry, srid=WGS84_SRID):
+    """
+    Make a GEOS geometry from a GeoJSON geometry object.
+
+    Polygons and multipolygons with 2D coordinates are converted via
+    WKB, other geometries via GeoJSON.
+
+    :type geometry: dict
+    :rtype: django.contrib.gis.geos.GEOSGeometry
+    """
+    try:
+        wkb = _make_wkb(geometry)
+    except (KeyError, TypeError, ValueError, struct.error):
+        wkb = None
+    if wkb is None:
+        result = GEOSGeometry(json.dumps(geometry))
+        result.srid = srid
+        return result
+    return GEOSGeometry(memoryview(wkb), srid=srid)
+
+
+def _iter_array_items(reader):
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.next_char()
+        return
+    while True:
+        yield reader.decode_value()
+        separator = reader.next_char()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(
+                'Expecting "," or "]" at {}'.format(reader.position - 1))
+
+
+class _StreamReader:
+    """
+    Reader of consecutive JSON values from a text stream.
+
+    The values are decoded from a buffer, which is extended from the
+    stream when the value continues past its end, and from which the
+    already decoded part is dropped.
+    """
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.offset = 0  # Position of the buffer start in the stream
+        self.eof = False
+
+    @property
+    def position(self):
+        return self.offset + self.pos
+
+    def peek(self):
+        self._skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError('Unexpected end of GeoJSON document')
+        return self.buffer[self.pos]
+
+    def next_char(self):
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def expect(self, char):
+        if self.next_char() != char:
+            raise ValueError('Expecting "{}" at {}'.format(
+                char, self.position - 1))
+
+    def decode_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                (value, end) = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as error:
+                if self.eof:
+                    raise ValueError('Invalid GeoJSON: {}'.format(error))
+                self._read(len(self.buffer) - self.pos)
+                continue
+            # A number at the end of the buffer may continue in the stream
+            if end < len(self.buffer) or self.eof:
+                self.pos = end
+                return value
+            self._read()
+
+    def _skip_whitespace(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self._read()
+
+    def _read(self, min_size=0):
+        """
+        Read more data to the buffer.
+
+        At least min_size characters are read, if available, so that
+        the buffer grows geometrically while decoding a large value.
+        """
+        if self.pos > 0:
+            self.offset += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        data = self.file.read(max(self.chunk_size, min_size))
+        if not data:
+            self.eof = True
+        self.buffer += data
+
+
+def _make_wkb(geometry):
+    geom_type = geometry['type']
+    coordinates = geometry['coordinates']
+    if geom_type == 'Polygon':
+        return _polygon_wkb(coordinates)
+    elif geom_type == 'MultiPolygon':
+        return b''.join(
+            [struct.pack('<BII', 1, _WKB_MULTIPOLYGON, len(coordinates))]
+            + [_polygon_wkb(polygon) for polygon in coordinates])
+    return None
+
+
+def _polygon_wkb(rings):
+    parts = [struct.pack('<BII', 1, _WKB_POLYGON, len(rings))]
+    for ring in rings:
+        flat = [value for point in ring for value in point]
+        if len(flat) != 2 * len(ring):
+            raise ValueError('Only 2D coordinates are supported')
+        parts.append(struct.pack('<I%dd' % len(flat), len(ring), *flat))
+    return b''.join(parts)
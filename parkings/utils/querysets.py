@@ -1,8 +1,28 @@
+from django.db import connections
 from django.db.models import Q
 
 
 def make_batches(queryset, batch_size, order_by_field):
-    if queryset.filter(**{order_by_field: None}).exists():
+    """
+    Split a queryset to batches ordered by given field and pk.
+
+    The cut points of the batches, i.e. the (field value, pk) pairs of
+    every batch_size'th item and the last item, are found with a single
+    query, which numbers the items with a window function.  The batches
+    are then yielded as querysets filtered to the range between two
+    consecutive cut points.
+
+    Items added to the queryset after the cut points are found are
+    included to a batch only if they are within the range of the
+    batches.
+
+    :type queryset: django.db.models.QuerySet
+    :type batch_size: int
+    :type order_by_field: str
+    :rtype: Iterable[django.db.models.QuerySet]
+    """
+    cut_points = _get_cut_points(queryset, batch_size, order_by_field)
+    if cut_points and cut_points[-1][0] is None:  # NULLs are sorted last
         raise ValueError(
             "Found NULL values in order-by field ({f}) for {qs}".format(
                 f=order_by_field, qs=queryset.values("pk").query
@@ -10,21 +30,40 @@ def make_batches(queryset, batch_size, order_by_field):
         )
 
     ordered_qs = queryset.order_by(order_by_field, "pk")
-    window = ordered_qs
-    found_last_batch = False
-    while not found_last_batch:
-        last_item_slice = window[(batch_size - 1):batch_size]
-        last = last_item_slice.values("pk", order_by_field).first()
-        if not last:  # If there was less than batch_size items left
-            last = window.values("pk", order_by_field).last()
-            found_last_batch = True
-            if not last:
-                break
-        (cut_value, cut_pk) = (last[order_by_field], last["pk"])
-        items_before_q = _items_before(cut_value, cut_pk, order_by_field)
-        batch = window.filter(items_before_q)
+    previous_cut = None
+    for (cut_value, cut_pk) in cut_points:
+        batch = ordered_qs.filter(
+            _items_before(cut_value, cut_pk, order_by_field))
+        if previous_cut:
+            batch = batch.filter(_items_after(*previous_cut, order_by_field))
         yield batch
-        window = ordered_qs.exclude(items_before_q)
+        previous_cut = (cut_value, cut_pk)
+
+
+_CUT_POINTS_SQL = """
+SELECT value, pk FROM (
+    SELECT
+        items.value,
+        items.pk,
+        row_number() OVER (ORDER BY items.value, items.pk) AS row_number,
+        count(*) OVER () AS total
+    FROM ({items}) AS items (value, pk)
+) AS numbered
+WHERE row_number %% {batch_size} = 0 OR row_number = total
+ORDER BY row_number
+"""
+
+
+def _get_cut_points(queryset, batch_size, field_name):
+    """
+    Get the (field value, pk) pairs of the last item of each batch.
+    """
+    items = queryset.order_by().values_list(field_name, "pk")
+    (items_sql, items_params) = items.query.sql_with_params()
+    sql = _CUT_POINTS_SQL.format(items=items_sql, batch_size=int(batch_size))
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, items_params)
+        return [tuple(row) for row in cursor.fetchall()]
 
 
 def _items_before(cut_value, cut_pk, field_name):
@@ -51,3 +90,22 @@ def _items_before(cut_value, cut_pk, field_name):
         "pk__lte": cut_pk,  # pk <= cut_pk
     })
     return q0 & (q1 | q2)
+
+
+def _items_after(cut_value, cut_pk, field_name):
+    """
+    Generate a Q term for filtering values after certain cut point.
+
+    This is the negation of the _items_before term, i.e.
+
+        X > cut_value OR (X = cut_value AND pk > cut_pk)
+
+    with the optimization term X >= cut_value.
+    """
+    q0 = Q(**{field_name + "__gte": cut_value})  # field value >= cut_value
+    q1 = Q(**{field_name + "__gt": cut_value})  # field value > cut_value
+    q2 = Q(**{
+        field_name: cut_value,  # field value = cut_value
+        "pk__gt": cut_pk,  # pk > cut_pk
+    })
+    return q0 & (q1 | q2)
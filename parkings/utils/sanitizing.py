@@ -6,8 +6,12 @@ N_LETTERS = len(LETTERS)
 N_DIGITS = len(DIGITS)
 
 
-def reset_sanitizing_session():
-    session.reset()
+def reset_sanitizing_session(secret_key=None):
+    session.reset(secret_key)
+
+
+def get_sanitizing_secret():
+    return session.get_secret()
 
 
 def sanitize_registration_number(value, prefix='!'):
@@ -225,6 +225,30 @@ PARKKIHUBI_OPERATOR_API_ENABLED = env.bool('PARKKIHUBI_OPERATOR_API_ENABLED', Tr
 PARKKIHUBI_ENFORCEMENT_API_ENABLED = (
     env.bool('PARKKIHUBI_ENFORCEMENT_API_ENABLED', True))
 PARKKIHUBI_PERMITS_PRUNABLE_AFTER = timedelta(days=3)
+PARKKIHUBI_CHECK_PARKING_SINGLE_QUERY = env.bool(
+    'PARKKIHUBI_CHECK_PARKING_SINGLE_QUERY', True)
+PARKKIHUBI_CHECK_PARKING_SPATIAL_INDEX = env.bool(
+    'PARKKIHUBI_CHECK_PARKING_SPATIAL_INDEX', False)
+PARKKIHUBI_CHECK_PARKING_BATCH_MAX_SIZE = env.int(
+    'PARKKIHUBI_CHECK_PARKING_BATCH_MAX_SIZE', 100)
+PARKKIHUBI_OPERATOR_PARKING_BATCH_MAX_SIZE = env.int(
+    'PARKKIHUBI_OPERATOR_PARKING_BATCH_MAX_SIZE', 1000)
+PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY = env.bool(
+    'PARKKIHUBI_REGION_STATISTICS_FROM_OCCUPANCY', False)
+PARKKIHUBI_MONITORING_TILE_MAX_AGE = env.int(
+    'PARKKIHUBI_MONITORING_TILE_MAX_AGE', 60)
+PARKKIHUBI_PUBLIC_STATISTICS_SNAPSHOT_INTERVAL = timedelta(
+    seconds=env.float('PARKKIHUBI_PUBLIC_STATISTICS_SNAPSHOT_INTERVAL', 60.0))
+PARKKIHUBI_SPATIAL_INDEX_CHECK_INTERVAL = timedelta(seconds=5)
+PARKKIHUBI_SPATIAL_INDEX_MAX_AGE = timedelta(hours=1)
+PARKKIHUBI_PARKING_CHECK_BUFFERING = env.bool(
+    'PARKKIHUBI_PARKING_CHECK_BUFFERING', False)
+PARKKIHUBI_PARKING_CHECK_BUFFER_SIZE = env.int(
+    'PARKKIHUBI_PARKING_CHECK_BUFFER_SIZE', 100)
+PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_DELAY = timedelta(
+    seconds=env.float('PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_DELAY', 5.0))
+PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_RETAINED = env.int(
+    'PARKKIHUBI_PARKING_CHECK_BUFFER_MAX_RETAINED', 10000)
 DEFAULT_ENFORCEMENT_DOMAIN = ('Helsinki', 'HKI')
 PARKKIHUBI_REGISTRATION_NUMBERS_REMOVABLE_AFTER = timedelta(hours=24)
 
@@ -3,6 +3,9 @@ import time
 
 from django.db import transaction
 
+from parkings.geometry_changes import (
+    GeometryChangeTracker, reassign_parking_areas)
+from parkings.importers.bulk_upsert import UPDATED, BulkUpsert
 from parkings.models import EnforcementDomain, ParkingArea
 
 from .wfs_importer import WfsImporter
@@ -14,28 +17,27 @@ class ParkingAreaImporter(WfsImporter):
     """
     Imports parking area data from kartta.hel.fi.
 
-    It should be possible to parallelize this a lot, for instance the wfs in
-    _download might be able to use maxfeatures and startindex, while parsing and
-    saving can be multithreaded.
-    (see getfeature method in
-    https://github.com/geopython/OWSLib/blob/master/owslib/feature/wfs200.py)
-    However this only takes a few seconds currently and will probably be ran
-    at most daily so such optimization is probably premature at this point.
+    The areas can be downloaded in pages concurrently, see WfsImporter.
     """
     wfs_typename = 'avoindata:liikennemerkkipilotti_pysakointipaikat'
+    wfs_sort_property = 'alue_id'
 
-    def __init__(self, overwrite=False):
+    def __init__(self, overwrite=False, **kwargs):
+        super().__init__(**kwargs)
         self.overwrite = overwrite
         self.refusals = 0
         self.overwrites = 0
         self.created = 0
+        self.unchanged = 0
 
     def import_areas(self):
         start = time.time()
 
         area_dicts = self.download_and_parse()
 
-        self._save_areas(area_dicts)
+        with GeometryChangeTracker(ParkingArea) as tracker:
+            self._save_areas(area_dicts)
+        reassigned = reassign_parking_areas(tracker.changes)
 
         if self.refusals:
             logger.warning(
@@ -48,6 +50,12 @@ class ParkingAreaImporter(WfsImporter):
             )
         if self.created:
             logger.info('Created %s new parking areas.' % self.created)
+        if self.unchanged:
+            logger.info('%s parking areas were unchanged.' % self.unchanged)
+        if reassigned:
+            logger.info(
+                'Reassigned parking areas of %s parkings.' % reassigned
+            )
         if (self.created + self.refusals + self.overwrites) == 0:
             logger.info('Nothing to do.')
 
@@ -62,47 +70,24 @@ class ParkingAreaImporter(WfsImporter):
     @transaction.atomic
     def _save_areas(self, area_dicts):
         logger.info('Saving areas.')
-        for index, area_dict in enumerate(area_dicts):
-            """
-            get_or_create could be used here, but due to not wanting to
-            overwrite data as well as a None check needed this is split into
-            two methods instead
-            """
-            try:
-                parking_area = ParkingArea.objects.get(
-                    origin_id=area_dict['origin_id'],
-                )
-                self._update_parking_area(area_dict, parking_area)
-            except ParkingArea.DoesNotExist:
-                parking_area = self._create_parking_area(area_dict)
-
-            parking_area.save()
-
-    def _create_parking_area(self, area_dict):
-        parking_area = ParkingArea(
-            domain=EnforcementDomain.get_default_domain(),
-            origin_id=area_dict['origin_id'],
-            geom=area_dict['geom'],
-            capacity_estimate=area_dict['capacity_estimate'],
-        )
-        self.created += 1
-        return parking_area
-
-    def _update_parking_area(self, area_dict, parking_area):
-        new_area = area_dict['geom']
-        new_capacity = area_dict['capacity_estimate']
-
-        capacity_differs = parking_area.capacity_estimate != new_capacity
-        area_differs = parking_area.geom.wkt != new_area.wkt
-
-        if area_differs or capacity_differs:
-            if self.overwrite:
-                parking_area.geom = new_area
-                parking_area.capacity_estimate = new_capacity
-                self.overwrites += 1
-            else:
+        domain = EnforcementDomain.get_default_domain()
+        upsert = BulkUpsert(
+            ParkingArea, ['origin_id'], ['geom', 'capacity_estimate'])
+        for area_dict in area_dicts:
+            values = {
+                'origin_id': area_dict['origin_id'],
+                'domain_id': domain.pk,
+                'geom': area_dict['geom'],
+                'capacity_estimate': area_dict['capacity_estimate'],
+            }
+            if not self.overwrite and upsert.diff(values) == UPDATED:
                 self.refusals += 1
-        return parking_area
+                continue
+            upsert.add(values)
+        result = upsert.save()
+        self.created += result.created
+        self.overwrites += result.updated
+        self.unchanged += result.unchanged
 
     def _parse_member(self, member):
         """
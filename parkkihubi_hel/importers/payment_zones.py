@@ -2,6 +2,7 @@ import logging
 
 from django.db import transaction
 
+from parkings.importers.bulk_upsert import BulkUpsert
 from parkings.models import EnforcementDomain, PaymentZone
 
 from .wfs_importer import WfsImporter
@@ -14,27 +15,30 @@ class PaymentZoneImporter(WfsImporter):
     Imports paymentzones data from kartta.hel.fi.
     """
     wfs_typename = 'Pysakoinnin_maksuvyohykkeet_alue'
+    wfs_sort_property = 'vyohykkeen_nro'
 
     def import_payment_zones(self):
         payment_zone_dicts = self.download_and_parse()
-        count = self._save_payment_zones(payment_zone_dicts)
-        logger.info('Created or updated {} payment zones'.format(count))
+        result = self._save_payment_zones(payment_zone_dicts)
+        logger.info(
+            'Created {}, updated {} and left unchanged {} payment zones'
+            .format(*result))
 
     @transaction.atomic
     def _save_payment_zones(self, payment_zone_dicts):
         logger.info('Saving payment zones.')
-        count = 0
-        payment_zone_ids = []
+        domain = EnforcementDomain.get_default_domain()
+        upsert = BulkUpsert(
+            PaymentZone, ['domain_id', 'code'], ['number', 'name', 'geom'])
         for payment_dict in payment_zone_dicts:
-            payment_zone, _ = PaymentZone.objects.update_or_create(
-                domain=EnforcementDomain.get_default_domain(),
-                code=payment_dict['number'],
-                number=payment_dict['number'],
-                defaults=payment_dict)
-            payment_zone_ids.append(payment_zone.pk)
-            count += 1
+            upsert.add(dict(
+                payment_dict,
+                domain_id=domain.pk,
+                code=payment_dict['number']))
+        result = upsert.save()
+        payment_zone_ids = upsert.get_pks().values()
         PaymentZone.objects.exclude(pk__in=payment_zone_ids).delete()
-        return count
+        return result
 
     def _parse_member(self, member):
         data = member.find(
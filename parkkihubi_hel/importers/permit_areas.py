@@ -3,6 +3,7 @@ import logging
 from django.contrib.auth import get_user_model
 from django.db import transaction
 
+from parkings.importers.bulk_upsert import BulkUpsert
 from parkings.models import EnforcementDomain, PermitArea
 
 from .wfs_importer import WfsImporter
@@ -15,32 +16,33 @@ class PermitAreaImporter(WfsImporter):
     Imports permit area data from kartta.hel.fi.
     """
     wfs_typename = 'Asukas_ja_yrityspysakointivyohykkeet_alue'
+    wfs_sort_property = 'asukaspysakointitunnus'
 
     def import_permit_areas(self, allowed_user=None):
         permit_area_dicts = self.download_and_parse()
-        count = self._save_permit_areas(permit_area_dicts, allowed_user)
-        logger.info('Created or updated {} permit areas'.format(count))
+        result = self._save_permit_areas(permit_area_dicts, allowed_user)
+        logger.info(
+            'Created {}, updated {} and left unchanged {} permit areas'
+            .format(*result))
 
     @transaction.atomic
     def _save_permit_areas(self, permit_areas_dict, allowed_user=None):
         logger.info('Saving permit areas.')
-        count = 0
-        permit_area_ids = []
         if allowed_user is not None:
             user = get_user_model().objects.filter(username=allowed_user).get()
         else:
             user = None
+        domain = EnforcementDomain.get_default_domain()
+        upsert = BulkUpsert(
+            PermitArea, ['domain_id', 'identifier'], ['name', 'geom'])
         for area_dict in permit_areas_dict:
-            permit_area, _ = PermitArea.objects.update_or_create(
-                domain=EnforcementDomain.get_default_domain(),
-                identifier=area_dict['identifier'],
-                defaults=area_dict)
-            if user is not None:
-                permit_area.allowed_users.add(user)
-            permit_area_ids.append(permit_area.pk)
-            count += 1
+            upsert.add(dict(area_dict, domain_id=domain.pk))
+        result = upsert.save()
+        permit_area_ids = list(upsert.get_pks().values())
+        if user is not None:
+            user.allowed_permit_areas.add(*permit_area_ids)
         PermitArea.objects.exclude(pk__in=permit_area_ids).delete()
-        return count
+        return result
 
     def _parse_member(self, member):
         data = member.find(
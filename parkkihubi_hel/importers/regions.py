@@ -3,6 +3,7 @@ import sys
 from django.contrib.gis.gdal import DataSource
 from django.contrib.gis.utils import LayerMapping
 
+from parkings.geometry_changes import GeometryChangeTracker, reassign_regions
 from parkings.models import Region
 
 
@@ -41,11 +42,16 @@ class ShapeFileToRegionImporter(object):
             layer=self._get_layer_index(layer_name),
             encoding=self.encoding)
         silent = (self.output_stream is None)
-        layer_mapping.save(
-            strict=True,
-            stream=self.output_stream,
-            silent=silent,
-            verbose=(not silent and self.verbose))
+        with GeometryChangeTracker(Region) as tracker:
+            layer_mapping.save(
+                strict=True,
+                stream=self.output_stream,
+                silent=silent,
+                verbose=(not silent and self.verbose))
+        reassigned = reassign_regions(tracker.changes)
+        if not silent and reassigned:
+            self.output_stream.write(
+                'Reassigned regions of {} parkings\n'.format(reassigned))
 
     def _get_layer_index(self, name):
         layer_names = self.get_layer_names()
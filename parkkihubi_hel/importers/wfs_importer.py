@@ -1,5 +1,8 @@
 import abc
+import io
+import itertools
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from django.contrib.gis.geos import MultiPolygon, Point, Polygon
 from lxml import etree
@@ -8,6 +11,18 @@ from owslib.wfs import WebFeatureService
 logger = logging.getLogger(__name__)
 
 
+def add_download_arguments(parser):
+    """
+    Add the download options of WfsImporter to a command argument parser.
+    """
+    parser.add_argument(
+        '--page-size', type=int, default=None, metavar='N',
+        help="Download the features in pages of N features")
+    parser.add_argument(
+        '--workers', '-w', type=int, default=4, metavar='N',
+        help="Download N pages concurrently (default: %(default)s)")
+
+
 class WfsImporter(metaclass=abc.ABCMeta):
     wfs_url = 'https://kartta.hel.fi/ws/geoserver/avoindata/wfs'
     ns = {
@@ -16,27 +31,109 @@ class WfsImporter(metaclass=abc.ABCMeta):
         'gml': 'http://www.opengis.net/gml/3.2',
     }
 
+    def __init__(self, page_size=None, workers=4):
+        """
+        Initialize the importer.
+
+        :param page_size:
+          Number of features to download with a single request, or None
+          to download all features with one request
+        :param workers: Number of pages to download concurrently
+        """
+        self.page_size = page_size
+        self.workers = workers
+
     @property
     @abc.abstractmethod
     def wfs_typename(self):
         pass
 
+    @property
+    @abc.abstractmethod
+    def wfs_sort_property(self):
+        """
+        Name of a unique property of the features.
+
+        The paged downloads are sorted by this property, since the
+        server doesn't guarantee the same order of the features for
+        each page otherwise.
+        """
+
     def download_and_parse(self):
-        response = self._download()
-        return self._parse_response(response)
+        for content in self._download():
+            yield from self._parse_response(content)
 
     def _download(self):
+        """
+        Download the features from the server.
+
+        In the paged mode the pages are downloaded concurrently in
+        windows of the number of workers, until a page has less than
+        page_size features.  The features are sorted by
+        wfs_sort_property, so that the pages don't overlap.
+
+        :returns: Iterator of the response bodies in order
+        """
         logger.info('Getting data from the server.')
 
         wfs = WebFeatureService(url=self.wfs_url, version='2.0.0')
-        response = wfs.getfeature(typename=self.wfs_typename)
+        if not self.page_size:
+            yield self._download_page(wfs)
+            return
+
+        def download_page(start_index):
+            return self._download_page(wfs, start_index)
+
+        window = self.page_size * max(self.workers, 1)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for window_start in itertools.count(0, window):
+                start_indexes = range(
+                    window_start, window_start + window, self.page_size)
+                for content in executor.map(download_page, start_indexes):
+                    yield content
+                    if self._get_number_returned(content) < self.page_size:
+                        return
+
+    def _download_page(self, wfs, start_index=None):
+        if start_index is not None:
+            logger.info('Getting features from index %s.', start_index)
+            response = wfs.getfeature(
+                typename=self.wfs_typename,
+                maxfeatures=self.page_size,
+                startindex=start_index,
+                sortby=[self.wfs_sort_property])
+        else:
+            response = wfs.getfeature(typename=self.wfs_typename)
         return response.read()
 
+    def _get_number_returned(self, content):
+        (_event, root) = next(etree.iterparse(
+            io.BytesIO(content), events=('start',)))
+        number_returned = root.get('numberReturned')
+        if number_returned is None:
+            return len(etree.fromstring(content).findall('wfs:member', self.ns))
+        return int(number_returned)
+
     def _parse_response(self, content):
+        """
+        Parse the features of a response.
+
+        The members of the feature collection are parsed one at a time
+        and cleared after parsing, so that the whole document tree is
+        never built.
+        """
         logger.info('Parsing Data.')
-        root = etree.fromstring(content)
-        for member in root.findall('wfs:member', self.ns):
+        member_tag = '{{{}}}member'.format(self.ns['wfs'])
+        events = etree.iterparse(
+            io.BytesIO(content), events=('end',), tag=member_tag)
+        for (_event, member) in events:
+            parent = member.getparent()
+            if parent.getparent() is not None:
+                continue  # Not a member of the top level collection
             yield self._parse_member(member)
+            member.clear()
+            while member.getprevious() is not None:
+                del parent[0]
 
     @abc.abstractmethod
     def _parse_member(self, member):
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from ...importers import ParkingAreaImporter
+from ...importers.wfs_importer import add_download_arguments
 
 
 class Command(BaseCommand):
@@ -15,8 +16,11 @@ class Command(BaseCommand):
             help=('Overwrite existing data. You may want to manually '
                   'inspect the data before doing this. Use with care!'),
         )
+        add_download_arguments(parser)
 
     def handle(self, *args, **options):
         ParkingAreaImporter(
             overwrite=options['overwrite'],
+            page_size=options['page_size'],
+            workers=options['workers'],
         ).import_areas()
@@ -1,10 +1,17 @@
 from django.core.management.base import BaseCommand
 
 from ...importers import PaymentZoneImporter
+from ...importers.wfs_importer import add_download_arguments
 
 
 class Command(BaseCommand):
     help = 'Uses the PaymentZoneImporter to import payment zones.'
 
+    def add_arguments(self, parser):
+        add_download_arguments(parser)
+
     def handle(self, *args, **options):
-        PaymentZoneImporter().import_payment_zones()
+        PaymentZoneImporter(
+            page_size=options['page_size'],
+            workers=options['workers'],
+        ).import_payment_zones()
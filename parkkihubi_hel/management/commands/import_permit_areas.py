@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from ...importers import PermitAreaImporter
+from ...importers.wfs_importer import add_download_arguments
 
 
 class Command(BaseCommand):
@@ -8,6 +9,10 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('allowed_user', nargs='?', type=str, default=None)
+        add_download_arguments(parser)
 
     def handle(self, *args, allowed_user=None, **options):
-        PermitAreaImporter().import_permit_areas(allowed_user)
+        PermitAreaImporter(
+            page_size=options['page_size'],
+            workers=options['workers'],
+        ).import_permit_areas(allowed_user)
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from ..importers import ParkingAreaImporter
+from .wfs_stub_server import make_feature_collection, stub_wfs_server
+
+mydir = os.path.dirname(__file__)
+
+area_ids = [str(x) for x in range(1, 8)]
+
+
+@pytest.fixture
+def wfs_server():
+    with stub_wfs_server(make_parking_area_collection()) as server:
+        yield server
+
+
+def make_parking_area_collection():
+    return make_feature_collection(
+        'parking_area_importer_data.xml', area_ids,
+        './avoindata:liikennemerkkipilotti_pysakointipaikat/avoindata:alue_id')
+
+
+def get_feature_requests(server):
+    return [x for x in server.requests if x.get('request') == 'GetFeature']
+
+
+def test_download_and_parse_without_paging(wfs_server):
+    importer = ParkingAreaImporter()
+    importer.wfs_url = wfs_server.url
+
+    areas = list(importer.download_and_parse())
+
+    assert [x['origin_id'] for x in areas] == area_ids
+    assert areas[0]['capacity_estimate'] == 2
+    requests = get_feature_requests(wfs_server)
+    assert len(requests) == 1
+    assert 'count' not in requests[0]
+    assert 'sortby' not in requests[0]
+
+
+@pytest.mark.parametrize('page_size, workers, expected_starts', [
+    (3, 2, [0, 3, 6, 9]),
+    (2, 4, [0, 2, 4, 6]),
+    (7, 1, [0, 7]),
+    (10, 3, [0, 10, 20]),
+])
+def test_download_and_parse_with_paging(
+        wfs_server, page_size, workers, expected_starts):
+    importer = ParkingAreaImporter(page_size=page_size, workers=workers)
+    importer.wfs_url = wfs_server.url
+
+    areas = list(importer.download_and_parse())
+
+    assert [x['origin_id'] for x in areas] == area_ids
+    requests = get_feature_requests(wfs_server)
+    assert sorted(int(x.get('startindex', 0)) for x in requests) == expected_starts
+    assert all(x['count'] == str(page_size) for x in requests)
+    assert all(x['sortby'] == 'alue_id' for x in requests)
+
+
+def test_paged_download_is_sorted():
+    collection = make_parking_area_collection()
+    with stub_wfs_server(collection, shuffle=True) as server:
+        importer = ParkingAreaImporter(page_size=2, workers=2)
+        importer.wfs_url = server.url
+
+        areas = list(importer.download_and_parse())
+
+    assert [x['origin_id'] for x in areas] == area_ids
+
+
+def test_parse_response_skips_nested_members():
+    with open(os.path.join(mydir, 'parking_area_importer_data.xml'), 'rb') as fp:
+        content = fp.read()
+    nested = content.replace(
+        b'</wfs:FeatureCollection>',
+        b'<wfs:additionalObjects><wfs:SimpleFeatureCollection>'
+        b'<wfs:member/></wfs:SimpleFeatureCollection></wfs:additionalObjects>'
+        b'</wfs:FeatureCollection>')
+    importer = ParkingAreaImporter()
+
+    areas = list(importer._parse_response(nested))
+
+    assert [x['origin_id'] for x in areas] == ['3508']
@@ -0,0 +1,113 @@
+import copy
+import os
+import random
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from lxml import etree
+
+mydir = os.path.dirname(__file__)
+
+CAPABILITIES_URL = 'https://kartta.hel.fi/ws/geoserver/avoindata/wfs'
+
+WFS_NS = 'http://www.opengis.net/wfs/2.0'
+
+
+class StubWfsServer(ThreadingHTTPServer):
+    """
+    Local WFS server serving the features of a fixture file.
+
+    The GetFeature requests support paging with the startIndex and
+    count parameters and sorting with the sortBy parameter.  Unsorted
+    features are returned in a random order, if shuffle is set.  The
+    query parameters of the requests are recorded to the requests list.
+    """
+    def __init__(self, feature_collection, shuffle=False):
+        super().__init__(('127.0.0.1', 0), _StubWfsRequestHandler)
+        self.url = 'http://127.0.0.1:{}/wfs'.format(self.server_address[1])
+        with open(os.path.join(mydir, 'wfs_capabilities_response.xml'),
+                  'rb') as fp:
+            self.capabilities = fp.read().replace(
+                CAPABILITIES_URL.encode(), self.url.encode())
+        self.feature_collection = feature_collection
+        self.shuffle = shuffle
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get_features(self, start_index, count, sort_by=None):
+        root = copy.deepcopy(self.feature_collection)
+        members = root.findall('{{{}}}member'.format(WFS_NS))
+        for member in members:
+            root.remove(member)
+        if sort_by:
+            members.sort(key=lambda x: _get_property(x, sort_by))
+        elif self.shuffle:
+            random.shuffle(members)
+        end_index = len(members) if count is None else start_index + count
+        root.extend(members[start_index:end_index])
+        root.set('numberMatched', str(len(members)))
+        root.set('numberReturned', str(len(root)))
+        return etree.tostring(root)
+
+
+class _StubWfsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        params = {
+            key.lower(): value
+            for (key, value) in parse_qsl(urlsplit(self.path).query)}
+        with self.server.lock:
+            self.server.requests.append(params)
+        if params.get('request') == 'GetCapabilities':
+            body = self.server.capabilities
+        else:
+            count = params.get('count')
+            body = self.server.get_features(
+                int(params.get('startindex', 0)),
+                int(count) if count is not None else None,
+                params.get('sortby'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _get_property(member, name):
+    (value,) = member.xpath('.//*[local-name() = $name]', name=name)
+    return value.text
+
+
+def make_feature_collection(member_file, member_ids, id_path):
+    """
+    Make a feature collection by copying the member of a fixture file.
+
+    :param member_file: Name of the fixture file with a single member
+    :param member_ids: Identifiers of the members to make
+    :param id_path: Path to the identifier element of the member
+    """
+    with open(os.path.join(mydir, member_file), 'rb') as fp:
+        root = etree.fromstring(fp.read())
+    (member,) = root.findall('{{{}}}member'.format(WFS_NS))
+    root.remove(member)
+    for member_id in member_ids:
+        new_member = copy.deepcopy(member)
+        new_member.find(id_path, root.nsmap).text = member_id
+        root.append(new_member)
+    return root
+
+
+@contextmanager
+def stub_wfs_server(feature_collection, shuffle=False):
+    server = StubWfsServer(feature_collection, shuffle=shuffle)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -15,6 +15,14 @@ achieved e.g. with:
       --env DEBUG=0 \
       --disable-logging \
       --processes 10
+
+With the --batch option the same checks are also done in batches of
+BATCH_SIZE checks via the check_parking/batch endpoint and the time per
+check is compared to that of the single checks.
+
+With the --compare-evaluators option no server is needed.  Instead the
+single query evaluation of the checks is compared to the stepwise
+evaluation by running both in-process against the configured database.
 """
 
 import json
@@ -26,6 +34,7 @@ import time
 import requests
 
 url = 'http://127.0.0.1:8000/enforcement/v1/check_parking/'
+batch_url = 'http://127.0.0.1:8000/enforcement/v1/check_parking/batch/'
 
 headers = {
     'Content-type': 'application/json',
@@ -112,16 +121,26 @@ expected_alloweds = [
 ALL_COMBINATIONS_REPEATS = 3
 ALLOWED_COMBINATIONS_REPEATS = 50
 PROCESS_COUNT = 8
+BATCH_SIZE = 50
 
 
 def main(argv=sys.argv):
     verbose = ('-v' in argv[1:] or '--verbose' in argv[1:])
+    if '--compare-evaluators' in argv[1:]:
+        compare_evaluators()
+        return
     set_authorization()
     measurements = measure_perfomance()
     results = process_measurements(measurements)
 
     print_results(results, verbose)
 
+    if '--batch' in argv[1:]:
+        batch_measurements = measure_batch_performance()
+        batch_results = process_batch_measurements(batch_measurements)
+        print()
+        print_batch_results(results, batch_results)
+
 
 def set_authorization():
     global headers
@@ -131,13 +150,18 @@ def set_authorization():
         headers[header] = headers[header].format(auth_token=auth_token)
 
 
-def get_auth_token():
+def setup_django():
     import django
-    from django.contrib.auth import get_user_model
 
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'parkkihubi.settings')
     django.setup()
 
+
+def get_auth_token():
+    from django.contrib.auth import get_user_model
+
+    setup_django()
+
     first_admin_with_auth_token = (
         get_user_model().objects
         .filter(is_superuser=True)
@@ -150,6 +174,51 @@ def get_auth_token():
     return first_admin_with_auth_token.auth_token
 
 
+def compare_evaluators():
+    setup_django()
+
+    from dateutil.parser import parse as parse_timestamp
+
+    from parkings.api.enforcement.check_parking import (
+        evaluate_parking_check, evaluate_parking_check_stepwise,
+        get_location)
+    from parkings.models import EnforcementDomain
+
+    domain = EnforcementDomain.get_default_domain()
+    evaluators = [
+        ('Stepwise (before)', evaluate_parking_check_stepwise),
+        ('Single query (after)', evaluate_parking_check),
+    ]
+    input_params_list = list(build_input_params())
+    checks = [
+        (reg_nr, get_location({'location': {
+            'longitude': coords[0], 'latitude': coords[1]}})[1],
+         parse_timestamp(timestamp))
+        for (timestamp, reg_nr, coords) in input_params_list]
+
+    all_times = {}
+    mismatches = 0
+    for (reg_nr, location, timestamp) in checks:
+        results = []
+        for (name, evaluate) in evaluators:
+            start_time = time.time()
+            results.append(evaluate(reg_nr, location, timestamp, domain))
+            took = 1000.0 * (time.time() - start_time)
+            all_times.setdefault(name, []).append(took)
+        if results[0] != results[1]:
+            mismatches += 1
+
+    for (name, _evaluate) in evaluators:
+        print('{} evaluation of {} checks:'.format(name, len(checks)))
+        print_time_stat_figures(all_times[name])
+        print()
+
+    if mismatches:
+        print('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+        print('Evaluators disagreed on {} checks'.format(mismatches))
+        print('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+
+
 def measure_perfomance():
     input_params_list = list(build_input_params())
     input_data_items = convert_params_to_post_data(input_params_list)
@@ -208,6 +277,61 @@ def execute_queries(pool, input_data_items):
     return (results, end_time - start_time)
 
 
+def measure_batch_performance():
+    input_params_list = list(build_input_params())
+    batches = [
+        input_params_list[i:(i + BATCH_SIZE)]
+        for i in range(0, len(input_params_list), BATCH_SIZE)]
+    input_data_items = [build_batch_post_data(batch) for batch in batches]
+
+    with multiprocessing.Pool(processes=PROCESS_COUNT) as pool:
+        results = []
+        start_time = time.time()
+        for post_data in input_data_items:
+            results.append(pool.apply_async(measure_batch, (post_data,)))
+        for result in results:
+            result.wait()
+        total_time = time.time() - start_time
+
+    return (batches, results, total_time)
+
+
+def build_batch_post_data(batch):
+    checks = [
+        json.loads(build_post_data(*input_params).decode('utf-8'))
+        for input_params in batch]
+    post_params = {'checks': checks}
+    return json.dumps(post_params, separators=(',', ':')).encode('utf-8')
+
+
+def process_batch_measurements(measurements):
+    (batches, results, total_time) = measurements
+
+    times = []
+    alloweds = []
+    failed_checks = 0
+
+    for (batch, result) in zip(batches, results):
+        (response, took) = result.get()
+        times.extend([took / len(batch)] * len(batch))
+        if response.status_code != 200:
+            failed_checks += len(batch)
+            continue
+        check_results = response.json()['results']
+        for (input_params, check_result) in zip(batch, check_results):
+            (timestamp, reg_nr, coords) = input_params
+            params = (reg_nr, timestamp, location_by_coords[coords])
+            if check_result.get('allowed') and params not in alloweds:
+                alloweds.append(params)
+
+    return {
+        'times': times,
+        'total_time': 1000.0 * total_time,
+        'alloweds': alloweds,
+        'failed_checks': failed_checks,
+    }
+
+
 def process_measurements(measurements):
     (input_params_list, results, total_time) = measurements
 
@@ -253,6 +377,14 @@ def process_measurements(measurements):
 
 
 def measure_single(post_data):
+    return measure_post(url, post_data)
+
+
+def measure_batch(post_data):
+    return measure_post(batch_url, post_data)
+
+
+def measure_post(url, post_data):
     start_time = time.time()
     response = requests.post(url, headers=headers, data=post_data)
     end_time = time.time()
@@ -284,6 +416,38 @@ def print_results(results, verbose=False):
     print_fluctuating_responses(results)
 
 
+def print_batch_results(results, batch_results):
+    single_count = sum(len(times) for times in results['times'].values())
+    batch_count = len(batch_results['times'])
+    single_per_check = results['total_time'] / single_count
+    batch_per_check = batch_results['total_time'] / batch_count
+
+    print('Batches of {} checks via the batch endpoint:'.format(BATCH_SIZE))
+    print_time_stat_figures(batch_results['times'])
+    print((
+        '\n'
+        '  Single checks: {:7.3f} ms/check\n'
+        '  Batch checks:  {:7.3f} ms/check\n'
+        '  => {:.1f}x speedup\n'
+        '     **************').format(
+            single_per_check, batch_per_check,
+            single_per_check / batch_per_check))
+
+    if batch_results['failed_checks']:
+        print()
+        print('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+        print('Failed batch checks: {}'.format(batch_results['failed_checks']))
+        print('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+
+    disagreements = set(results['alloweds']) ^ set(batch_results['alloweds'])
+    if disagreements:
+        print()
+        print('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+        print('Single and batch checks disagreed on:\n{}'.format(
+            '\n'.join(map(str, sorted(disagreements)))))
+        print('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+
+
 def print_responses(results):
     print('Responses:')
     for (params, response_data) in sorted(results['responses'].items()):
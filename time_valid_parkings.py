@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# flake8: noqa: T201
+"""
+Measure performance of finding parkings valid at given time.
+
+Creates a synthetic table of parkings to the configured database, with
+the same time_start and time_end indexes as the parking table has, and
+compares the query plans and timings of the old "time_start <= t AND
+(time_end >= t OR time_end IS NULL)" condition to the valid time range
+condition used by ParkingQuerySet.valid_at.
+
+With the --plate-lookups option the lookup of the valid parkings of a
+registration number, as done by check_parking, is measured instead.
+It is first done with the single column normalized_reg_num index and
+then with the covering (domain, normalized_reg_num, time_end) index,
+which allows index-only scans.
+
+Usage:
+
+    python time_valid_parkings.py [--rows N] [--keep] [--plate-lookups]
+
+Generating the default 20 million rows takes a few minutes and about
+4 GB of disk.  The table is dropped afterwards unless --keep is given,
+in which case the next run reuses it.
+"""
+
+import argparse
+import os
+import time
+
+TABLE = 'benchmark_valid_parkings'
+
+VALID_TIME_RANGE_SQL = (
+    "CASE WHEN (time_end < (time_start)) THEN ('empty')::tstzrange"
+    " ELSE TSTZRANGE(time_start, time_end, '[]') END")
+
+CONDITIONS = [
+    ('Separate time_start and time_end conditions (before)',
+     "time_start <= %(t)s AND (time_end >= %(t)s OR time_end IS NULL)"),
+    ('Valid time range condition (after)',
+     VALID_TIME_RANGE_SQL + " @> %(t)s::timestamptz"),
+]
+
+TIMESTAMPS = [
+    '2019-03-01T02:00:00+00:00',  # Night time, few valid parkings
+    '2021-06-15T10:00:00+00:00',  # Middle of the data, busy hour
+    '2023-12-31T12:00:00+00:00',  # End of the data
+]
+
+REPEATS = 5
+
+PLATE_COUNT = 500000
+PLATE_LOOKUP_SQL = (
+    "SELECT id, zone_id, time_end FROM {table}"
+    " WHERE normalized_reg_num = %(reg_num)s AND domain_id = 1"
+    " AND time_start <= %(t)s AND (time_end >= %(t)s OR time_end IS NULL)")
+PLATE_LOOKUP_COUNT = 200
+COVERING_INDEX = 'benchmark_valid_parkings_reg_num_covering'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=20000000)
+    parser.add_argument('--keep', action='store_true')
+    parser.add_argument('--plate-lookups', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        create_table(cursor, args.rows)
+        try:
+            if args.plate_lookups:
+                measure_plate_lookups(cursor)
+                return
+            for timestamp in TIMESTAMPS:
+                print('=' * 72)
+                print('Parkings valid at {}'.format(timestamp))
+                print('=' * 72)
+                for (name, condition) in CONDITIONS:
+                    print()
+                    print('{}:'.format(name))
+                    print_plan(cursor, condition, timestamp)
+                    print_time_stat_figures(
+                        measure(cursor, condition, timestamp))
+                print()
+        finally:
+            if not args.keep:
+                cursor.execute('DROP TABLE {}'.format(TABLE))
+
+
+def setup_django():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'parkkihubi.settings')
+    django.setup()
+
+
+def create_table(cursor, rows):
+    cursor.execute('SELECT to_regclass(%s)', [TABLE])
+    if cursor.fetchone()[0]:
+        cursor.execute('SELECT count(*) FROM {}'.format(TABLE))
+        if cursor.fetchone()[0] == rows:
+            print('Reusing the existing {} rows'.format(rows))
+            return
+        cursor.execute('DROP TABLE {}'.format(TABLE))
+
+    print('Generating {} rows...'.format(rows))
+    start_time = time.time()
+    cursor.execute((
+        'CREATE UNLOGGED TABLE {table} AS'
+        ' SELECT'
+        '  n AS id,'
+        '  (n %% 3) + 1 AS domain_id,'
+        "  'X' || (random() * {plate_count})::integer AS normalized_reg_num,"
+        '  (random() * 5)::integer + 1 AS zone_id,'
+        '  ts AS time_start,'
+        '  CASE'
+        '   WHEN random() < 0.02 THEN NULL'
+        "   ELSE ts + random() * interval '8 hours'"
+        '  END AS time_end'
+        ' FROM ('
+        '  SELECT'
+        '   n,'
+        "   timestamptz '2019-01-01T00:00:00Z'"
+        "   + random() * interval '5 years' AS ts"
+        '  FROM generate_series(1, %s) AS n'
+        ' ) AS generated'
+    ).format(table=TABLE, plate_count=PLATE_COUNT), [rows])
+    cursor.execute(
+        'CREATE INDEX ON {table} (normalized_reg_num)'.format(table=TABLE))
+    cursor.execute(
+        'CREATE INDEX ON {table} (time_start)'.format(table=TABLE))
+    cursor.execute(
+        'CREATE INDEX ON {table} (time_end)'.format(table=TABLE))
+    cursor.execute('CREATE INDEX ON {table} USING gist (({expr}))'.format(
+        table=TABLE, expr=VALID_TIME_RANGE_SQL))
+    # Vacuum to set the visibility map, which index-only scans need
+    cursor.execute('VACUUM ANALYZE {table}'.format(table=TABLE))
+    print('Done in {:.1f} s'.format(time.time() - start_time))
+
+
+def measure_plate_lookups(cursor):
+    sql = PLATE_LOOKUP_SQL.format(table=TABLE)
+    cursor.execute('DROP INDEX IF EXISTS {}'.format(COVERING_INDEX))
+    for name in ['Single column index (before)', 'Covering index (after)']:
+        if name.startswith('Covering'):
+            cursor.execute((
+                'CREATE INDEX {index} ON {table}'
+                ' (domain_id, normalized_reg_num, time_end)'
+                ' INCLUDE (id, zone_id, time_start)'
+            ).format(index=COVERING_INDEX, table=TABLE))
+            cursor.execute('VACUUM ANALYZE {table}'.format(table=TABLE))
+        print('=' * 72)
+        print('Plate lookups with {}'.format(name))
+        print('=' * 72)
+        params = {'reg_num': 'X1234', 't': TIMESTAMPS[1]}
+        cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+        for (line,) in cursor.fetchall():
+            print('  ' + line)
+        times = []
+        for n in range(PLATE_LOOKUP_COUNT):
+            params = {
+                'reg_num': 'X{}'.format(n * PLATE_COUNT // PLATE_LOOKUP_COUNT),
+                't': TIMESTAMPS[n % len(TIMESTAMPS)],
+            }
+            start_time = time.time()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            times.append(1000.0 * (time.time() - start_time))
+        print_time_stat_figures(times)
+        print()
+    cursor.execute('DROP INDEX {}'.format(COVERING_INDEX))
+
+
+def print_plan(cursor, condition, timestamp):
+    cursor.execute(
+        'EXPLAIN (ANALYZE, BUFFERS) SELECT count(*) FROM {table}'
+        ' WHERE {condition}'.format(table=TABLE, condition=condition),
+        {'t': timestamp})
+    for (line,) in cursor.fetchall():
+        print('  ' + line)
+
+
+def measure(cursor, condition, timestamp):
+    times = []
+    for _ in range(REPEATS):
+        start_time = time.time()
+        cursor.execute(
+            'SELECT count(*) FROM {table} WHERE {condition}'.format(
+                table=TABLE, condition=condition),
+            {'t': timestamp})
+        cursor.fetchall()
+        times.append(1000.0 * (time.time() - start_time))
+    return times
+
+
+def print_time_stat_figures(all_times):
+    print('  Minimum time: {:.3f} ms'.format(min(all_times)))
+    print('  Mean time:    {:.3f} ms'.format(sum(all_times) / len(all_times)))
+    print('  Maximum time: {:.3f} ms'.format(max(all_times)))
+
+
+if __name__ == '__main__':
+    main()